@@ -19,12 +19,20 @@
 from __future__ import absolute_import
 
 import sys
+import math
+import heapq
+import operator
 
 import bigml.api
 
 from bigml.anomaly import Anomaly
-from bigml.io import UnicodeWriter
+from bigml.util import cast
 
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
@@ -32,9 +40,20 @@ import bigmler.checkpoint as c
 from bigmler.tst_reader import TstReader as TestReader
 from bigmler.resources import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resources import create_batch_anomaly_score
+from bigmler.columnar import output_writer, format_file_name
 
 # symbol used in failing anomaly score predictions
 NO_ANOMALY_SCORE = "NaN"
+# number of test rows pushed through the iforest at once in batch mode
+BATCH_SIZE = 1000
+# comparisons that can be applied to a whole column of numeric values
+NUMERIC_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "=": operator.eq,
+    "!=": operator.ne}
 
 
 def use_prediction_headers(prediction_headers, output, test_reader,
@@ -118,6 +137,239 @@ def anomaly_score_to_row(anomaly_score_resource):
     return [anomaly_score_resource['object']['core']]
 
 
+class BatchAnomaly(object):
+    """Batch scorer for local anomaly detectors
+
+       The trees in the iforest are compiled into flat arrays: the
+       predicates of each node (deduplicated across the forest), the
+       position of its first child and its number of children. For a chunk
+       of rows, each distinct predicate is evaluated once for all the rows
+       (as a numpy comparison for numeric fields) and then all the rows are
+       pushed through all the trees at the same time, one level at a time,
+       to get the depths used in the Anomaly.anomaly_score method.
+
+    """
+    def __init__(self, local_anomaly):
+        """Compiles the iforest of an Anomaly object
+
+        """
+        self.local_anomaly = local_anomaly
+        self.predicates = []
+        predicate_index = {}
+        nodes_predicates = []
+        first_child = []
+        children_count = []
+        self.roots = []
+        for tree in local_anomaly.iforest:
+            self.roots.append(len(nodes_predicates))
+            nodes_predicates.append(None)
+            first_child.append(0)
+            children_count.append(0)
+            node_index = len(nodes_predicates) - 1
+            pending = [(tree, node_index)]
+            # breadth-first layout, so that siblings are contiguous
+            while pending:
+                node, node_index = pending.pop(0)
+                indexes = []
+                for predicate in node.predicates.predicates:
+                    if predicate is True:
+                        continue
+                    key = (predicate.operator, predicate.missing,
+                           predicate.field, repr(predicate.value),
+                           predicate.term)
+                    if key not in predicate_index:
+                        predicate_index[key] = len(self.predicates)
+                        self.predicates.append(predicate)
+                    indexes.append(predicate_index[key])
+                nodes_predicates[node_index] = indexes
+                first_child[node_index] = len(nodes_predicates)
+                children_count[node_index] = len(node.children)
+                for child in node.children:
+                    nodes_predicates.append(None)
+                    first_child.append(0)
+                    children_count.append(0)
+                    pending.append((child, len(nodes_predicates) - 1))
+        # nodes' predicates are padded with an always true column
+        width = max([len(indexes) for indexes in nodes_predicates] + [1])
+        self.nodes_predicates = numpy.array(
+            [indexes + [len(self.predicates)] * (width - len(indexes))
+             for indexes in nodes_predicates], dtype=int)
+        self.first_child = numpy.array(first_child, dtype=int)
+        self.children_count = numpy.array(children_count, dtype=int)
+        self.max_children = max(children_count + [0])
+        self.roots = numpy.array(self.roots, dtype=int)
+
+    def prepare(self, input_data, by_name=True):
+        """Cleans the input data as the Anomaly.anomaly_score method does.
+           Returns None when the values cannot be cast to their field types.
+
+        """
+        local = self.local_anomaly
+        input_data = local.filter_input_data(input_data, by_name=by_name)
+        try:
+            cast(input_data, local.fields)
+        except ValueError:
+            return None
+        return input_data
+
+    def _numeric_column(self, field_id, rows, columns):
+        """Values of a numeric field as an array, with NaN for missings, or
+           None if any of them is not a number
+
+        """
+        if field_id not in columns:
+            values = []
+            for input_data in rows:
+                value = input_data.get(field_id)
+                if value is None:
+                    value = float('nan')
+                elif isinstance(value, bool) or \
+                        not isinstance(value, (int, long, float)):
+                    values = None
+                    break
+                values.append(value)
+            columns[field_id] = None if values is None else \
+                numpy.array(values, dtype=float)
+        return columns[field_id]
+
+    def evaluate(self, rows):
+        """Matrix with the result of every predicate for every row. The
+           last column is the always true padding predicate.
+
+        """
+        fields = self.local_anomaly.fields
+        matrix = numpy.ones((len(rows), len(self.predicates) + 1),
+                            dtype=bool)
+        columns = {}
+        missings = {}
+        with numpy.errstate(invalid="ignore"):
+            for index, predicate in enumerate(self.predicates):
+                values = None
+                if predicate.term is None and \
+                        predicate.operator in NUMERIC_OPERATORS and \
+                        isinstance(predicate.value, (int, long, float)) and \
+                        not isinstance(predicate.value, bool):
+                    values = self._numeric_column(predicate.field, rows,
+                                                  columns)
+                if values is None:
+                    matrix[:, index] = [predicate.apply(input_data, fields)
+                                        for input_data in rows]
+                    continue
+                if predicate.field not in missings:
+                    missings[predicate.field] = numpy.isnan(values)
+                matrix[:, index] = numpy.where(
+                    missings[predicate.field], predicate.missing,
+                    NUMERIC_OPERATORS[predicate.operator](values,
+                                                          predicate.value))
+        return matrix
+
+    def depths(self, rows):
+        """Matrix of the depth reached by each row in each tree
+
+        """
+        matrix = self.evaluate(rows)
+        row_indexes = numpy.arange(len(rows))[:, None, None]
+
+        def nodes_apply(nodes):
+            """Whether the predicates of the nodes hold for their rows"""
+            return matrix[row_indexes,
+                          self.nodes_predicates[nodes]].all(axis=2)
+
+        current = numpy.tile(self.roots, (len(rows), 1))
+        # root node: if predicates are met, depth becomes 1, otherwise is 0
+        depths = nodes_apply(current).astype(int)
+        active = (depths > 0) & (self.children_count[current] > 0)
+        while active.any():
+            moved = numpy.zeros(current.shape, dtype=bool)
+            next_nodes = current.copy()
+            for child in range(self.max_children):
+                candidates = active & ~moved & \
+                    (child < self.children_count[current])
+                if not candidates.any():
+                    break
+                children = numpy.where(candidates,
+                                       self.first_child[current] + child, 0)
+                chosen = candidates & nodes_apply(children)
+                next_nodes[chosen] = children[chosen]
+                moved |= chosen
+            current = next_nodes
+            depths += moved
+            active = moved & (self.children_count[current] > 0)
+        return depths
+
+    def anomaly_scores(self, input_data_list, by_name=True):
+        """Returns the anomaly score for each input data in the list, or
+           NO_ANOMALY_SCORE for the rows that cannot be scored
+
+        """
+        rows = [self.prepare(input_data, by_name=by_name)
+                for input_data in input_data_list]
+        valid = [input_data for input_data in rows if input_data is not None]
+        scores = []
+        if valid:
+            trees = float(len(self.roots))
+            expected_mean_depth = self.local_anomaly.expected_mean_depth
+            scores = [math.pow(2, - (depth_sum / trees) / expected_mean_depth)
+                      for depth_sum in
+                      self.depths(valid).sum(axis=1).tolist()]
+        scores.reverse()
+        return [NO_ANOMALY_SCORE if input_data is None else scores.pop()
+                for input_data in rows]
+
+
+def scored_rows(local_anomaly, test_reader):
+    """Yields the anomaly score and the input data of each test row.
+       Rows are scored in chunks when numpy is available.
+
+    """
+    if not NUMPY or local_anomaly.iforest is None:
+        for input_data in test_reader:
+            input_data_dict = test_reader.dict(input_data, filtering=False)
+            try:
+                score = local_anomaly.anomaly_score(
+                    input_data_dict, by_name=False)
+            except Exception:
+                score = NO_ANOMALY_SCORE
+            yield score, input_data
+        return
+    batch_anomaly = BatchAnomaly(local_anomaly)
+    input_data_list = []
+    for input_data in test_reader:
+        input_data_list.append(input_data)
+        if len(input_data_list) == BATCH_SIZE:
+            for row in zip(batch_anomaly.anomaly_scores(
+                    [test_reader.dict(row, filtering=False)
+                     for row in input_data_list],
+                    by_name=False), input_data_list):
+                yield row
+            input_data_list = []
+    if input_data_list:
+        for row in zip(batch_anomaly.anomaly_scores(
+                [test_reader.dict(row, filtering=False)
+                 for row in input_data_list],
+                by_name=False), input_data_list):
+            yield row
+
+
+def top_scored_rows(rows, top_k):
+    """Keeps the `top_k` rows with the highest anomaly scores in a bounded
+       heap and returns them sorted by decreasing score. Ties keep the
+       earliest rows.
+
+    """
+    heap = []
+    for index, (score, input_data) in enumerate(rows):
+        if score == NO_ANOMALY_SCORE:
+            continue
+        item = (score, -index, input_data)
+        if len(heap) < top_k:
+            heapq.heappush(heap, item)
+        elif item[0:2] > heap[0][0:2]:
+            heapq.heapreplace(heap, item)
+    return [(score, input_data) for score, _, input_data
+            in sorted(heap, key=lambda item: item[0:2], reverse=True)]
+
+
 def local_anomaly_score(anomalies, test_reader, output, args,
                         exclude=None):
     """Get local anomaly detector and issue anomaly score prediction
@@ -125,15 +377,11 @@ def local_anomaly_score(anomalies, test_reader, output, args,
     """
     # Only one anomaly detector at present
     local_anomaly = Anomaly(anomalies[0], api=args.retrieve_api_)
-    test_set_header = test_reader.has_headers()
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        try:
-            anomaly_score_info = {'score': local_anomaly.anomaly_score(
-                input_data_dict, by_name=test_set_header)}
-        except Exception:
-            anomaly_score_info = {'score': NO_ANOMALY_SCORE}
-        write_anomaly_score(anomaly_score_info['score'], output,
+    rows = scored_rows(local_anomaly, test_reader)
+    if args.top_k_scores:
+        rows = top_scored_rows(rows, args.top_k_scores)
+    for score, input_data in rows:
+        write_anomaly_score(score, output,
                             args.prediction_info, input_data, exclude)
 
 
@@ -143,11 +391,12 @@ def anomaly_score(anomalies, fields, args, session_file=None):
     """
     test_set = args.test_set
     test_set_header = args.test_header
-    output = args.predictions
+    output = format_file_name(args.predictions, args)
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, headers=args.prediction_header,
+                       lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args)
@@ -182,8 +431,9 @@ def remote_anomaly_score(anomaly, test_dataset, batch_anomaly_score_args, args,
             anomaly_id, test_dataset, batch_anomaly_score_args,
             args, api, session_file=session_file, path=path, log=log)
     if not args.no_csv:
-        file_name = api.download_batch_anomaly_score(batch_anomaly_score,
-                                                     prediction_file)
+        file_name = u.download_to_sink(api.download_batch_anomaly_score,
+                                       batch_anomaly_score, prediction_file,
+                                       sink=args.output_sink)
         if file_name is None:
             sys.exit("Failed downloading CSV.")
 
@@ -34,6 +34,7 @@ from bigmler.defaults import DEFAULTS_FILE
 from bigmler.reports import clear_reports, upload_reports
 from bigmler.command import get_context
 from bigmler.dispatcher import SESSIONS_LOG, clear_log_files, get_test_dataset
+from bigmler.association_set import association_set
 
 COMMAND_LOG = u".bigmler_association"
 DIRS_LOG = u".bigmler_association_dir_stack"
@@ -211,12 +212,8 @@ def compute_output(api, args):
                 session_file=session_file, path=path, log=log)
             """
         else:
-            sys.exit("Local prediction of association sets is currently"
-                     " not supported.")
-            """
             association_set(associations, fields, args,
                             session_file=session_file)
-            """
     u.print_generated_files(path, log_file=session_file,
                             verbosity=args.verbosity)
     if args.reports:
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Association set auxiliary functions
+
+"""
+from __future__ import absolute_import
+
+
+import sys
+import math
+
+from bigml.association import Association, NO_ITEMS
+from bigml.util import cast
+
+import bigmler.utils as u
+
+from bigmler.tst_reader import TstReader as TestReader
+from bigmler.resources import NORMAL_FORMAT, FULL_FORMAT
+from bigmler.columnar import output_writer, format_file_name
+
+# number of consequent items in each association set
+DEFAULT_K = 10
+# rule attributes used for each --score-by value
+SCORE_METRICS = {
+    "confidence": "confidence",
+    "coverage": "lhs_cover",
+    "leverage": "leverage",
+    "lift": "lift",
+    "support": "support"}
+
+
+def use_prediction_headers(prediction_headers, output, test_reader,
+                           fields, args):
+    """Uses header information from the test file in the prediction output
+
+       If --prediction-header is set, adds a headers row to the association
+       sets file.
+       If --prediction-fields is used, retrieves the fields to exclude
+       from the test input in the --prediction-info full format, that includes
+       them all by default.
+
+    """
+    exclude = []
+    headers = []
+    for rank in range(1, args.association_set_k + 1):
+        headers.extend(["item %s" % rank, "score %s" % rank])
+
+    if (args.prediction_info == FULL_FORMAT or
+            args.prediction_fields is not None):
+        # Try to retrieve headers from the test file
+        if test_reader.has_headers():
+            input_headers = test_reader.raw_headers
+        else:
+            # if no headers are found in the test file we assume it has the
+            # same input_field structure
+            input_headers = [fields[field]['name'] for field in
+                             fields.fields_columns]
+
+        if args.prediction_fields is not None:
+            prediction_fields = map(str.strip,
+                                    args.prediction_fields.split(','))
+            # Filter input_headers adding only those chosen by the user
+            number_of_headers = len(input_headers)
+            for index in range(0, number_of_headers):
+                if not input_headers[index] in prediction_fields:
+                    exclude.append(index)
+        exclude = sorted(list(set(exclude)), reverse=True)
+        for index in exclude:
+            del input_headers[index]
+        input_headers.extend(headers)
+        headers = input_headers
+    if prediction_headers:
+        output.writerow(headers)
+    return exclude
+
+
+def write_association_set(association_set_resource, output=sys.stdout,
+                          prediction_info=NORMAL_FORMAT, input_data=None,
+                          exclude=None, k=DEFAULT_K):
+    """Writes the final association set to the required output
+
+       The format of the output depends on the `prediction_info` value.
+       There's a brief format, that writes only the predicted items,
+       and a full data format that writes first the input data
+       used to predict followed by the items. Each item is described
+       and followed by its score, and rows are padded up to `k` items.
+
+    """
+
+    row = []
+    # input data is added if prediction format is BRIEF or FULL
+    if prediction_info != NORMAL_FORMAT:
+        if input_data is None:
+            input_data = []
+        row = input_data
+        if exclude:
+            for index in exclude:
+                del row[index]
+    for prediction in association_set_resource:
+        row.extend([prediction['item']['description'],
+                    prediction['score']])
+    row.extend([None, None] * (k - len(association_set_resource)))
+    try:
+        output.writerow(row)
+    except AttributeError:
+        try:
+            output.write(row)
+        except AttributeError:
+            raise AttributeError("You should provide a writeable object")
+
+
+class BatchAssociation(object):
+    """Local association sets computed with an inverted items index
+
+       The items of the association are indexed by field (and by category
+       for categorical fields) to find the items in each input row without
+       checking all of them, and the rules are indexed by the items in their
+       antecedent. The rules that share an item with the row and their
+       number of shared items are found in a single pass over the row
+       items. The association sets are then scored as in the
+       Association.association_set method, using the cosine similarity
+       between the row items and each rule antecedent.
+
+    """
+    def __init__(self, local_association, score_by=None):
+        """Builds the items and rules indexes from an Association object
+
+        """
+        self.local_association = local_association
+        score_by = score_by or local_association.search_strategy
+        self.metric = SCORE_METRICS.get(score_by, score_by)
+        self.field_items = {}
+        self.category_items = {}
+        self.missing_items = {}
+        for item in local_association.items:
+            field_id = item.field_id
+            if item.name is None:
+                self.missing_items.setdefault(field_id, []).append(item.index)
+                continue
+            if item.field_info['optype'] == 'categorical' and \
+                    not item.complement:
+                self.category_items.setdefault(field_id, {}).setdefault(
+                    item.name, []).append(item.index)
+            else:
+                self.field_items.setdefault(field_id, []).append(item)
+        self.field_ids = set(self.field_items.keys()) | \
+            set(self.category_items.keys()) | set(self.missing_items.keys())
+        self.rules_by_item = {}
+        self.scores = []
+        self.lhs_norms = []
+        for position, rule in enumerate(local_association.rules):
+            for index in rule.lhs:
+                self.rules_by_item.setdefault(index, []).append(position)
+            score = getattr(rule, self.metric)
+            # support and coverage are given as [ratio, instances]
+            if isinstance(score, list):
+                score = score[0]
+            self.scores.append(score)
+            self.lhs_norms.append(math.sqrt(len(rule.lhs)))
+
+    def row_items(self, input_data):
+        """Indexes of the items found in the input data
+
+        """
+        items = []
+        for field_id in self.field_ids:
+            value = input_data.get(field_id)
+            if value is None:
+                items.extend(self.missing_items.get(field_id, []))
+                continue
+            items.extend(self.category_items.get(field_id, {}).get(value,
+                                                                   []))
+            for item in self.field_items.get(field_id, []):
+                if item.matches(value):
+                    items.append(item.index)
+        return items
+
+    def association_set(self, input_data, k=DEFAULT_K, by_name=True):
+        """Returns the `k` best scored consequents for the input data, in the
+           format of the Association.association_set method
+
+        """
+        local = self.local_association
+        input_data = local.filter_input_data(input_data, by_name=by_name)
+        cast(input_data, local.fields)
+        items = self.row_items(input_data)
+        items_set = set(items)
+        shared = {}
+        for index in items:
+            for position in self.rules_by_item.get(index, []):
+                shared[position] = shared.get(position, 0) + 1
+        items_norm = math.sqrt(len(items))
+        predictions = {}
+        # rules are added in their original order, as scores are summed
+        for position in sorted(shared):
+            rule = local.rules[position]
+            rhs_item = local.items[rule.rhs[0]]
+            if local.fields[rhs_item.field_id]['optype'] in NO_ITEMS:
+                if rhs_item.field_id in input_data:
+                    continue
+            elif rule.rhs[0] in items_set:
+                continue
+            cosine = shared[position] / float(items_norm *
+                                              self.lhs_norms[position])
+            rhs = tuple(rule.rhs)
+            if rhs not in predictions:
+                predictions[rhs] = {"score": 0, "rules": []}
+            predictions[rhs]["score"] += cosine * self.scores[position]
+            predictions[rhs]["rules"].append(rule.rule_id)
+        predictions = sorted(predictions.items(),
+                             key=lambda x: x[1]["score"], reverse=True)[:k]
+        association_set = []
+        for rhs, prediction in predictions:
+            item = local.items[rhs[0]]
+            prediction["item"] = item.to_json()
+            prediction["item"]["description"] = item.describe()
+            for key in ["bin_start", "bin_end"]:
+                del prediction["item"][key]
+            association_set.append(prediction)
+        return association_set
+
+
+def local_association_set(associations, test_reader, output, args,
+                          exclude=None):
+    """Get local association and compute the association set of each row
+
+    """
+    # Only one association at present
+    local_association = Association(associations[0],
+                                    api=args.retrieve_api_)
+    batch_association = BatchAssociation(local_association,
+                                         score_by=args.score_by)
+    for input_data in test_reader:
+        input_data_dict = test_reader.dict(input_data, filtering=False)
+        try:
+            association_set_info = batch_association.association_set(
+                input_data_dict, k=args.association_set_k,
+                by_name=False)
+        except ValueError:
+            association_set_info = []
+        write_association_set(association_set_info, output,
+                              args.prediction_info, input_data, exclude,
+                              k=args.association_set_k)
+
+
+def association_set(associations, fields, args, session_file=None):
+    """Computes an association set for each entry in the `test_set`.
+
+    """
+    test_set = args.test_set
+    test_set_header = args.test_header
+    output = format_file_name(args.predictions, args)
+    test_reader = TestReader(test_set, test_set_header, fields,
+                             None,
+                             test_separator=args.test_separator)
+    with output_writer(output, args, headers=args.prediction_header,
+                       lineterminator="\n") as output:
+        # columns to exclude if input_data is added to the prediction field
+        exclude = use_prediction_headers(
+            args.prediction_header, output, test_reader, fields, args)
+
+        # Local association sets: Association sets are computed locally
+        # using the association rules
+        message = u.dated("Creating local association sets.\n")
+        u.log_message(message, log_file=session_file, console=args.verbosity)
+        local_association_set(associations, test_reader, output, args,
+                              exclude=exclude)
+    test_reader.close()
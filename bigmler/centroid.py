@@ -20,6 +20,7 @@ from __future__ import absolute_import
 
 
 import sys
+import math
 
 import bigml.api
 
@@ -28,14 +29,23 @@ import bigmler.checkpoint as c
 
 
 from bigml.cluster import Cluster
-from bigml.io import UnicodeWriter
+from bigml.util import cast
+
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
 
 from bigmler.tst_reader import TstReader as TestReader
 from bigmler.resources import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resources import create_batch_centroid
+from bigmler.columnar import output_writer, format_file_name
 
 # symbol used in failing centroid predictions
 NO_CENTROID = "-"
+# number of test rows assigned to centroids at once in batch mode
+BATCH_SIZE = 1000
 
 
 def use_prediction_headers(prediction_headers, output, test_reader,
@@ -119,6 +129,152 @@ def centroid_to_row(centroid_resource):
     return [centroid_resource['object']['centroid_name']]
 
 
+class BatchCluster(object):
+    """Batch nearest centroid assignment for local clusters
+
+       The centroids are stored as arrays: scaled numeric centers, category
+       codes and term incidence matrices for text and items fields. A chunk
+       of input rows is encoded in the same way and the squared distances
+       from every row to every centroid are accumulated field by field as
+       numpy arrays, so that the nearest centroid is an argmin per row. The
+       distances follow the definition in the Centroid.distance2 method.
+
+    """
+    def __init__(self, local_cluster):
+        """Builds the centroid arrays from a Cluster object
+
+        """
+        self.local_cluster = local_cluster
+        centroids = local_cluster.centroids
+        self.names = [centroid.name for centroid in centroids]
+        self.ids = [centroid.centroid_id for centroid in centroids]
+        field_ids = []
+        for centroid in centroids:
+            for field_id in centroid.center:
+                if field_id not in field_ids:
+                    field_ids.append(field_id)
+        self.numeric_fields = []
+        self.categorical_fields = []
+        self.terms_fields = []
+        for field_id in field_ids:
+            values = [centroid.center.get(field_id) for centroid in centroids]
+            defined = [value for value in values if value is not None]
+            scale = local_cluster.scales[field_id]
+            # centroids that lack the field add no distance for it
+            present = numpy.array([value is not None for value in values])
+            if isinstance(defined[0], list):
+                positions = {}
+                for terms in defined:
+                    for term in terms:
+                        positions.setdefault(term, len(positions))
+                incidence = numpy.zeros((len(values), len(positions)))
+                for index, terms in enumerate(values):
+                    for term in terms or []:
+                        incidence[index, positions[term]] += 1
+                self.terms_fields.append((field_id, scale, present,
+                                          positions, incidence))
+            elif isinstance(defined[0], basestring):
+                positions = {}
+                codes = numpy.array(
+                    [positions.setdefault(value, len(positions))
+                     if value is not None else -1 for value in values])
+                self.categorical_fields.append((field_id, scale, present,
+                                                positions, codes))
+            else:
+                centers = numpy.array(
+                    [value if value is not None else 0.0 for value in values],
+                    dtype=float) * scale
+                self.numeric_fields.append((field_id, scale, present,
+                                            centers))
+
+    def prepare(self, input_data, by_name=True):
+        """Cleans the input data as the Cluster.centroid method does.
+           Returns None for rows whose numeric values are missing, when no
+           default numeric value is set for the cluster, or cannot be cast.
+
+        """
+        local = self.local_cluster
+        input_data = local.filter_input_data(input_data, by_name=by_name)
+        try:
+            local.fill_numeric_defaults(input_data,
+                                        local.default_numeric_value)
+            cast(input_data, local.fields)
+        except ValueError:
+            return None
+        unique_terms = local.get_unique_terms(input_data)
+        for field_id, _, _, _ in self.numeric_fields:
+            if not isinstance(input_data.get(field_id), (int, long, float)):
+                return None
+        return input_data, unique_terms
+
+    def distances2(self, prepared_rows):
+        """Matrix of squared distances from each prepared row to each
+           centroid
+
+        """
+        distances2 = numpy.zeros((len(prepared_rows), len(self.names)))
+        for field_id, scale, present, centers in self.numeric_fields:
+            values = numpy.array([input_data[field_id] for input_data, _
+                                  in prepared_rows], dtype=float) * scale
+            distances2 += numpy.where(
+                present, (values[:, None] - centers[None, :]) ** 2, 0.0)
+        for field_id, scale, present, positions, codes in \
+                self.categorical_fields:
+            values = numpy.array([positions.get(input_data.get(field_id), -2)
+                                  for input_data, _ in prepared_rows])
+            distances2 += numpy.where(
+                present & (values[:, None] != codes[None, :]),
+                scale ** 2, 0.0)
+        for field_id, scale, present, positions, incidence in \
+                self.terms_fields:
+            input_incidence = numpy.zeros((len(prepared_rows),
+                                           len(positions)))
+            input_lengths = numpy.zeros(len(prepared_rows))
+            for index, (_, unique_terms) in enumerate(prepared_rows):
+                terms = unique_terms.get(field_id, [])
+                if not isinstance(terms, list):
+                    terms = [terms]
+                input_lengths[index] = len(terms)
+                for term in set(terms):
+                    if term in positions:
+                        input_incidence[index, positions[term]] = 1
+            centroid_lengths = incidence.sum(axis=1)
+            lengths = input_lengths[:, None] * centroid_lengths[None, :]
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                similarity = numpy.dot(input_incidence, incidence.T) / \
+                    numpy.sqrt(lengths)
+            field_distances2 = numpy.where(
+                lengths > 0, (scale * (1 - similarity)) ** 2,
+                numpy.where((input_lengths[:, None] > 0) |
+                            (centroid_lengths[None, :] > 0),
+                            scale ** 2, 0.0))
+            distances2 += numpy.where(present, field_distances2, 0.0)
+        return distances2
+
+    def centroids(self, input_data_list, by_name=True):
+        """Returns the nearest centroid for each input data in the list, in
+           the format of the Cluster.centroid method, or None when the
+           distance cannot be computed
+
+        """
+        prepared_rows = [self.prepare(input_data, by_name=by_name)
+                         for input_data in input_data_list]
+        valid = [prepared for prepared in prepared_rows
+                 if prepared is not None]
+        nearest = []
+        if valid:
+            distances2 = self.distances2(valid)
+            closest = numpy.argmin(distances2, axis=1).tolist()
+            minimum = distances2[numpy.arange(len(valid)), closest].tolist()
+            nearest = [{"centroid_id": self.ids[index],
+                        "centroid_name": self.names[index],
+                        "distance": math.sqrt(distance2)}
+                       for index, distance2 in zip(closest, minimum)]
+        nearest.reverse()
+        return [None if prepared is None else nearest.pop()
+                for prepared in prepared_rows]
+
+
 def local_centroid(clusters, test_reader, output, args,
                    exclude=None):
     """Get local cluster and issue centroid prediction
@@ -126,16 +282,45 @@ def local_centroid(clusters, test_reader, output, args,
     """
     # Only one cluster at present
     local_cluster = Cluster(clusters[0], api=args.retrieve_api_)
-    test_set_header = test_reader.has_headers()
+    if not NUMPY:
+        for input_data in test_reader:
+            input_data_dict = test_reader.dict(input_data, filtering=False)
+            try:
+                centroid_info = local_cluster.centroid(
+                    input_data_dict, by_name=False)
+            except Exception:
+                centroid_info = {'centroid_name': NO_CENTROID}
+            write_centroid(centroid_info['centroid_name'], output,
+                           args.prediction_info, input_data, exclude)
+        return
+    batch_cluster = BatchCluster(local_cluster)
+    input_data_list = []
     for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        try:
-            centroid_info = local_cluster.centroid(
-                input_data_dict, by_name=test_set_header)
-        except Exception:
-            centroid_info = {'centroid_name': NO_CENTROID}
-        write_centroid(centroid_info['centroid_name'], output,
-                       args.prediction_info, input_data, exclude)
+        input_data_list.append(input_data)
+        if len(input_data_list) == BATCH_SIZE:
+            write_centroids(batch_cluster, input_data_list, test_reader,
+                            output, args, exclude)
+            input_data_list = []
+    write_centroids(batch_cluster, input_data_list, test_reader,
+                    output, args, exclude)
+
+
+def write_centroids(batch_cluster, input_data_list, test_reader, output,
+                    args, exclude=None):
+    """Assigns a chunk of test rows to their centroids and writes them
+
+    """
+    if not input_data_list:
+        return
+    centroids_info = batch_cluster.centroids(
+        [test_reader.dict(input_data, filtering=False)
+         for input_data in input_data_list],
+        by_name=False)
+    for centroid_info, input_data in zip(centroids_info, input_data_list):
+        centroid_name = NO_CENTROID if centroid_info is None else \
+            centroid_info['centroid_name']
+        write_centroid(centroid_name, output, args.prediction_info,
+                       input_data, exclude)
 
 
 def centroid(clusters, fields, args, session_file=None):
@@ -144,11 +329,12 @@ def centroid(clusters, fields, args, session_file=None):
     """
     test_set = args.test_set
     test_set_header = args.test_header
-    output = args.predictions
+    output = format_file_name(args.predictions, args)
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, headers=args.prediction_header,
+                       lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args)
@@ -180,8 +366,9 @@ def remote_centroid(cluster, test_dataset, batch_centroid_args, args,
             cluster_id, test_dataset, batch_centroid_args,
             args, api, session_file=session_file, path=path, log=log)
     if not args.no_csv:
-        file_name = api.download_batch_centroid(batch_centroid,
-                                                prediction_file)
+        file_name = u.download_to_sink(api.download_batch_centroid,
+                                       batch_centroid, prediction_file,
+                                       sink=args.output_sink)
         if file_name is None:
             sys.exit("Failed downloading CSV.")
     if args.to_dataset:
@@ -26,6 +26,11 @@ import bigml.api
 from bigml.util import console_log
 
 from bigmler.utils import log_message
+from bigmler.compressed import compression, open_compressed
+
+# number of lines of the compressed files, keyed by path, size and
+# modification time
+LINE_COUNTS = {}
 
 
 def is_source_created(path, suffix=""):
@@ -200,17 +205,32 @@ def checkpoint(function, *args, **kwargs):
 
 
 def file_number_of_lines(file_name):
-    """Counts the number of lines in a file
+    """Counts the number of lines in a file. Compressed files are
+       decompressed while counting and their counts are cached.
 
     """
-    try:
+    file_compression = compression(file_name)
+    if file_compression is None:
+        try:
+            item = (0, None)
+            with open(file_name) as file_handler:
+                for item in enumerate(file_handler):
+                    pass
+            return item[0] + 1
+        except IOError:
+            return 0
+    stat = os.stat(file_name)
+    key = (os.path.abspath(file_name), stat.st_size, stat.st_mtime)
+    if key not in LINE_COUNTS:
         item = (0, None)
-        with open(file_name) as file_handler:
+        file_handler = open_compressed(file_name, file_compression)
+        try:
             for item in enumerate(file_handler):
                 pass
-        return item[0] + 1
-    except IOError:
-        return 0
+        finally:
+            file_handler.close()
+        LINE_COUNTS[key] = item[0] + 1
+    return LINE_COUNTS[key]
 
 
 def is_batch_prediction_created(path):
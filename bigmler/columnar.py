@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Columnar writers for the predictions output
+
+   The ColumnarWriter class offers the same writerow interface as the
+   UnicodeWriter used for CSV files, but buffers the rows and stores them
+   in row groups using the Parquet, Arrow or NPY formats.
+
+   Column types are inferred from the first row group. A column found to be
+   numeric cannot store non-numeric values in later row groups.
+
+"""
+from __future__ import absolute_import
+
+import os
+import sys
+import numbers
+import tempfile
+
+from bigml.io import UnicodeWriter
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW = True
+except ImportError:
+    PYARROW = False
+
+try:
+    import numpy
+    import numpy.lib.format
+    NUMPY = True
+except ImportError:
+    NUMPY = False
+
+
+CSV_FORMAT = "csv"
+PARQUET_FORMAT = "parquet"
+ARROW_FORMAT = "arrow"
+NPY_FORMAT = "npy"
+PREDICTIONS_FORMATS = [CSV_FORMAT, PARQUET_FORMAT, ARROW_FORMAT, NPY_FORMAT]
+ROW_GROUP_SIZE = 50000
+
+NUMERIC_TYPE = "numeric"
+TEXT_TYPE = "text"
+
+
+def is_number(value):
+    """Checks whether the value is a number (booleans excluded)
+
+    """
+    return (isinstance(value, numbers.Number) and
+            not isinstance(value, bool))
+
+
+def to_number(value):
+    """Casts the value to float. None values are stored as missings.
+       Non-numeric values raise a ValueError.
+
+    """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(u"%s is not a number" % to_text(value))
+
+
+def to_text(value):
+    """Casts the value to text. None values are stored as missings.
+
+    """
+    if value is None or isinstance(value, basestring):
+        return value
+    return u"%s" % value
+
+
+def format_extension(file_format):
+    """Returns the file extension for the given predictions format
+
+    """
+    return ".%s" % file_format
+
+
+def format_file_name(file_name, args):
+    """Returns the name of the file that stores the predictions in the
+       format chosen in --predictions-format. The csv extension, if any,
+       is replaced by the one of the format.
+
+    """
+    file_format = getattr(args, "predictions_format", CSV_FORMAT)
+    if file_format is None or file_format == CSV_FORMAT:
+        return file_name
+    base_name, extension = os.path.splitext(file_name)
+    if extension.lower() == format_extension(file_format):
+        return file_name
+    if extension.lower() == format_extension(CSV_FORMAT):
+        file_name = base_name
+    return "%s%s" % (file_name, format_extension(file_format))
+
+
+def output_writer(file_name, args, headers=False, **kwargs):
+    """Returns the writer object that stores predictions in the format
+       chosen in --predictions-format. The `headers` argument tells whether
+       the first written row contains the column names.
+
+    """
+    file_format = getattr(args, "predictions_format", CSV_FORMAT)
+    if file_format is None or file_format == CSV_FORMAT:
+        return UnicodeWriter(file_name, **kwargs)
+    return ColumnarWriter(file_name, file_format, headers=headers)
+
+
+class ColumnarWriter(object):
+    """Buffered writer that stores rows in columnar formats
+
+    """
+
+    def __init__(self, file_name, file_format, headers=False,
+                 row_group_size=ROW_GROUP_SIZE):
+        """Writer constructor
+
+           `file_name`: path to the output file
+           `file_format`: one of parquet, arrow or npy
+           `headers`: boolean, True means that the first row contains the
+                      column names
+           `row_group_size`: number of rows buffered before writing them
+        """
+        if file_format not in PREDICTIONS_FORMATS[1:]:
+            sys.exit("Unknown predictions format: %s" % file_format)
+        if file_format in [PARQUET_FORMAT, ARROW_FORMAT] and not PYARROW:
+            sys.exit("Failed to find the pyarrow library needed to store"
+                     " predictions in %s format. Please, install it"
+                     " manually" % file_format)
+        if file_format == NPY_FORMAT and not NUMPY:
+            sys.exit("Failed to find the numpy library needed to store"
+                     " predictions in npy format. Please, install it"
+                     " manually")
+        self.file_name = file_name
+        self.file_format = file_format
+        self.headers = headers
+        self.row_group_size = row_group_size
+        self.names = None
+        self.types = None
+        self.schema = None
+        self.writer = None
+        self.buffer = []
+        # npy files store a single array whose header needs the number of
+        # rows and the length of the longest value, so row groups are
+        # spooled to a temporary file till the writer is closed
+        self.spool = None
+        self.rows_count = 0
+        self.columns_count = 0
+        self.width = 1
+
+    def __enter__(self):
+        """Opening the writer as context manager
+
+        """
+        return self.open_writer()
+
+    def __exit__(self, ftype, value, traceback):
+        """Closing the writer when leaving the context
+
+        """
+        self.close_writer()
+
+    def open_writer(self):
+        """Opening the writer. Files are created when the first row group
+           is flushed.
+
+        """
+        return self
+
+    def writerow(self, row):
+        """Adds a row to the buffer and flushes it when the row group is
+           complete
+
+        """
+        if self.headers and self.names is None:
+            self.names = [to_text(name) for name in row]
+            if self.file_format == NPY_FORMAT:
+                self.buffer.append(self.names)
+            return
+        self.buffer.append(row)
+        if len(self.buffer) >= self.row_group_size:
+            self.flush()
+
+    def writerows(self, rows):
+        """Adds a list of rows to the buffer
+
+        """
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        """Writes the buffered rows as a new row group
+
+        """
+        if not self.buffer:
+            return
+        if self.file_format == NPY_FORMAT:
+            self._spool_rows()
+            return
+        if self.names is None:
+            self.names = [u"column_%s" % index for index in
+                          range(0, len(self.buffer[0]))]
+        columns = [list(column) for column in zip(*self.buffer)]
+        self.buffer = []
+        if self.types is None:
+            # types are inferred from the first row group: columns
+            # whose non-missing values are all numbers are numeric
+            self.types = []
+            for column in columns:
+                values = [value for value in column if value is not None]
+                self.types.append(
+                    NUMERIC_TYPE if values and all(is_number(value) for value
+                                                   in values)
+                    else TEXT_TYPE)
+        arrays = []
+        for name, column, column_type in zip(self.names, columns,
+                                             self.types):
+            if column_type == NUMERIC_TYPE:
+                try:
+                    values = [to_number(value) for value in column]
+                except ValueError, exc:
+                    sys.exit(u"Failed to store the %s column in %s format:"
+                             u" its values were numbers in the first row"
+                             u" group, but %s. Please, use the csv"
+                             u" predictions format for this output." %
+                             (name, self.file_format, exc))
+                arrays.append(pyarrow.array(values, type=pyarrow.float64()))
+            else:
+                arrays.append(pyarrow.array([to_text(value) for value
+                                             in column],
+                                            type=pyarrow.string()))
+        self._write_arrays(arrays)
+
+    def _spool_rows(self):
+        """Stores the buffered rows as a text array in the temporary file
+
+        """
+        # missing values are stored as empty strings, as in CSV files
+        array = numpy.array([[u"" if value is None else to_text(value)
+                              for value in row] for row in self.buffer],
+                            dtype="U")
+        self.buffer = []
+        if self.spool is None:
+            self.spool = tempfile.TemporaryFile()
+        numpy.save(self.spool, array)
+        self.rows_count += array.shape[0]
+        self.columns_count = array.shape[1]
+        self.width = max(self.width, array.dtype.itemsize //
+                         numpy.dtype("U1").itemsize)
+
+    def _write_npy(self):
+        """Writes the spooled row groups as a single array
+
+        """
+        with open(self.file_name, "wb") as output_handler:
+            if self.spool is None:
+                numpy.save(output_handler, numpy.array([], dtype="U"))
+                return
+            dtype = numpy.dtype("U%s" % self.width)
+            numpy.lib.format.write_array_header_1_0(output_handler, {
+                "descr": numpy.lib.format.dtype_to_descr(dtype),
+                "fortran_order": False,
+                "shape": (self.rows_count, self.columns_count)})
+            self.spool.seek(0)
+            spooled_rows = 0
+            while spooled_rows < self.rows_count:
+                array = numpy.load(self.spool)
+                output_handler.write(array.astype(dtype).tobytes())
+                spooled_rows += array.shape[0]
+        self.spool.close()
+        self.spool = None
+
+    def _write_arrays(self, arrays):
+        """Writes a row group given as a list of column arrays
+
+        """
+        if self.file_format == PARQUET_FORMAT:
+            table = pyarrow.Table.from_arrays(arrays, self.names)
+            if self.writer is None:
+                self.schema = table.schema
+                self.writer = pyarrow.parquet.ParquetWriter(self.file_name,
+                                                            self.schema)
+            self.writer.write_table(table)
+        else:
+            batch = pyarrow.RecordBatch.from_arrays(arrays, self.names)
+            if self.writer is None:
+                self.schema = batch.schema
+                self.writer = pyarrow.RecordBatchFileWriter(self.file_name,
+                                                            self.schema)
+            self.writer.write_batch(batch)
+
+    def close_writer(self):
+        """Flushes the remaining rows and closes the file
+
+        """
+        self.flush()
+        if self.file_format == NPY_FORMAT:
+            self._write_npy()
+            return
+        if self.writer is None and self.names is not None:
+            # no rows were written: the file only stores the columns
+            self._write_arrays([pyarrow.array([], type=pyarrow.string())
+                                for _ in self.names])
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
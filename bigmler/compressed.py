@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Compressed input files
+
+   Test and training files compressed with gzip, bzip2 or zstandard are
+   detected by their magic bytes and decompressed while they are read.
+
+"""
+from __future__ import absolute_import
+
+import sys
+import io
+import gzip
+import bz2
+
+try:
+    import zstandard
+    ZSTANDARD = True
+except ImportError:
+    ZSTANDARD = False
+
+from bigmler.utils import PYTHON3
+from bigmler.utf8recoder import UTF8Recoder
+
+GZIP = "gzip"
+BZIP2 = "bzip2"
+ZSTD = "zstd"
+MAGIC_BYTES = [(GZIP, b"\x1f\x8b"),
+               (BZIP2, b"BZh"),
+               (ZSTD, b"\x28\xb5\x2f\xfd")]
+READ_BUFFER = 1024 * 1024
+
+
+def compression(file_name):
+    """Returns the compression used in the file, or None for files that
+       are not compressed or cannot be read
+
+    """
+    if not isinstance(file_name, basestring):
+        return None
+    try:
+        with open(file_name, "rb") as file_handler:
+            start = file_handler.read(4)
+    except IOError:
+        return None
+    for file_compression, magic_bytes in MAGIC_BYTES:
+        if start.startswith(magic_bytes):
+            return file_compression
+    return None
+
+
+def open_compressed(file_name, file_compression):
+    """Opens a compressed file as a binary stream of decompressed contents
+
+    """
+    if file_compression == GZIP:
+        return io.BufferedReader(gzip.GzipFile(file_name, "rb"),
+                                 buffer_size=READ_BUFFER)
+    if file_compression == BZIP2:
+        if PYTHON3:
+            return io.BufferedReader(bz2.BZ2File(file_name, "rb"),
+                                     buffer_size=READ_BUFFER)
+        return bz2.BZ2File(file_name, "rb", buffering=READ_BUFFER)
+    if file_compression == ZSTD:
+        if not ZSTANDARD:
+            sys.exit("Failed to find the zstandard library needed to read"
+                     " %s. Please, install it manually" % file_name)
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(open(file_name, "rb")),
+            buffer_size=READ_BUFFER)
+    raise ValueError("Unknown compression: %s" % file_compression)
+
+
+def compressed_recoder(file_name, file_compression, encoding="utf-8"):
+    """Returns an UTF8Recoder that the CSV readers can iterate to get the
+       lines of the decompressed file
+
+    """
+    stream = open_compressed(file_name, file_compression)
+    if PYTHON3:
+        stream = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    return UTF8Recoder(stream, encoding)
@@ -90,6 +90,7 @@ FLAGS = {
         {'flag': 'ensemble', 'type': 'string'},
         {'flag': 'ensemble_file', 'type': 'string'},
         {'flag': 'prediction_info', 'type': 'string'},
+        {'flag': 'predictions_format', 'type': 'string'},
         {'flag': 'max_parallel_evaluations', 'type': 'int'},
         {'flag': 'test_separator', 'type': 'string'},
         {'flag': 'multi_label', 'type': 'boolean'},
@@ -141,6 +142,9 @@ FLAGS = {
         {'flag': 'to_csv', 'type': 'string'},
         {'flag': 'resource_types', 'type': 'string'},
         {'flag': 'dry_run', 'type': 'boolean'},
+        {'flag': 'max_parallel_deletes', 'type': 'int'},
+        {'flag': 'deletes_per_second', 'type': 'float'},
+        {'flag': 'scan_index', 'type': 'string'},
         {'flag': 'anomaly_tag', 'type': 'string'},
         {'flag': 'anomaly_score_tag', 'type': 'string'},
         {'flag': 'project_tag', 'type': 'string'},
@@ -149,6 +153,7 @@ FLAGS = {
         {'flag': 'project_id', 'type': 'string'},
         {'flag': 'no_csv', 'type': 'boolean'},
         {'flag': 'to_dataset', 'type': 'boolean'},
+        {'flag': 'output_sink', 'type': 'string'},
         {'flag': 'median', 'type': 'boolean'},
         {'flag': 'random_candidates', 'type': 'int'},
         {'flag': 'status', 'type': 'string'},
@@ -205,6 +210,7 @@ FLAGS = {
         {'flag': 'score', 'type': 'boolean'},
         {'flag': 'anomalies-dataset', 'type': 'string'},
         {'flag': 'top_n', 'type': 'int'},
+        {'flag': 'top_k_scores', 'type': 'int'},
         {'flag': 'forest_size', 'type': 'int'}],
     'BigMLer sample': [
         {'flag': 'anomaly_fields', 'type': 'string'},
@@ -232,7 +238,8 @@ FLAGS = {
         {'flag': 'no_server', 'type': 'boolean'}],
     'BigMLer reify': [
         {'flag': 'language', 'type': 'string'},
-        {'flag': 'add_fields', 'type': 'boolean'}],
+        {'flag': 'add_fields', 'type': 'boolean'},
+        {'flag': 'reify_cache', 'type': 'string'}],
     'BigMLer project': [
         {'flag': 'project_attributes', 'type': 'string'}],
     'BigMLer association': [
@@ -241,6 +248,8 @@ FLAGS = {
         {'flag': 'association_file', 'type': 'string'},
         {'flag': 'associations', 'type': 'string'},
         {'flag': 'association_k', 'type': 'int'},
+        {'flag': 'association_set_k', 'type': 'int'},
+        {'flag': 'score_by', 'type': 'string'},
         {'flag': 'no_association', 'type': 'boolean'},
         {'flag': 'association_attributes', 'type': 'string'}],
     'BigMLer logistic regression': [
@@ -281,6 +290,7 @@ FLAGS = {
         {'flag': 'time_series_attributes', 'type': 'string'},
         {'flag': 'all_numeric_objectives', 'type': 'boolean'},
         {'flag': 'damped_trend', 'type': 'boolean'},
+        {'flag': 'local_evaluation', 'type': 'boolean'},
         {'flag': 'default_numeric_value', 'type': 'string'},
         {'flag': 'error', 'type': 'int'},
         {'flag': 'period', 'type': 'int'},
@@ -338,7 +348,8 @@ FLAGS = {
         {'flag': 'package_dir', 'type': 'string'},
         {'flag': 'embed_libs', 'type': 'boolean'}],
     'BigMLer export': [
-        {'flag': 'language', 'type': 'string'}],
+        {'flag': 'language', 'type': 'string'},
+        {'flag': 'lookup_table', 'type': 'boolean'}],
     'BigMLer retrain': [
         {'flag': 'model_type', 'type': 'string'}]}
 
@@ -24,6 +24,8 @@ import os
 import datetime
 import shutil
 
+from multiprocessing.pool import ThreadPool
+
 import bigml.api
 import bigmler.utils as u
 import bigmler.processing.args as a
@@ -31,20 +33,14 @@ import bigmler.processing.args as a
 from bigmler.defaults import DEFAULTS_FILE
 from bigmler.command import get_stored_command, command_handling
 from bigmler.dispatcher import SESSIONS_LOG, clear_log_files
+from bigmler.delete.scanner import retrieve_resources
 
 COMMAND_LOG = u".bigmler_delete"
 DIRS_LOG = u".bigmler_delete_dir_stack"
 LOG_FILES = [COMMAND_LOG, DIRS_LOG, u.NEW_DIRS_LOG]
 ROWS_LIMIT = 15
+MAX_PARALLEL_LISTINGS = 4
 INDENT_IDS = 26
-RESOURCES_LOG_FILES = set(['project', 'source', 'dataset', 'dataset_train',
-                           'dataset_test', 'dataset_gen', 'dataset_cluster',
-                           'dataset_parts', 'dataset_multi', 'models',
-                           'ensembles', 'evaluations',
-                           'clusters', 'batch_prediction', 'batch_centroid',
-                           'anomalies', 'batch_anomaly_score', 'sample',
-                           'associations', 'time_series', "deepnets",
-                           'scripts', 'library', 'execution'])
 STATUS_CODES = {
     "finished": bigml.api.FINISHED,
     "faulty": bigml.api.FAULTY,
@@ -59,23 +55,26 @@ STATUS_CODES = {
 }
 
 GROUP_RESOURCES = ["project", "execution"]
-
-
-def retrieve_resources(directory):
-    """Searches recusively the user-given directory for resource log files
-       and returns its ids.
-
-    """
-    log_ids = []
-    if os.path.isdir(directory):
-        for root, _, files in os.walk(directory):
-            for resources_file in files:
-                if resources_file in RESOURCES_LOG_FILES:
-                    for line in open(os.path.join(root, resources_file)):
-                        resource_id = bigml.api.get_resource_id(line.strip())
-                        if resource_id is not None:
-                            log_ids.append(resource_id)
-    return list(set(log_ids))
+# Resource types grouped in layers following the origin of the resources:
+# each layer contains the types derived from the ones in the next layers,
+# so they are deleted first. Types in the same layer are independent.
+DELETION_LAYERS = [
+    ["project", "execution"],
+    ["prediction", "batchprediction", "evaluation", "centroid",
+     "batchcentroid", "anomalyscore", "batchanomalyscore",
+     "associationset", "topicdistribution", "batchtopicdistribution",
+     "forecast"],
+    ["ensemble"],
+    ["model", "cluster", "anomaly", "association", "logisticregression",
+     "topicmodel", "timeseries", "deepnet", "sample", "correlation",
+     "statisticaltest"],
+    ["dataset", "script"],
+    ["source", "library", "configuration"]]
+DELETION_ORDER = dict([(resource_type, layer) for layer, types in
+                       enumerate(DELETION_LAYERS) for resource_type in types])
+# files that store the ids to delete and the ids already deleted
+DELETE_LIST_FILE = "delete_list"
+DELETED_FILE = "deleted_resources"
 
 
 def time_interval_qs(args, api):
@@ -98,31 +97,53 @@ def time_interval_qs(args, api):
     return query_string_list
 
 
+def iter_delete_list(args, api, query_list):
+    """Generates the ids of the resources to be deleted by adding the tag
+       filtering user options to the
+       previous ones for all the filtered resource types. The resource
+       types are listed in parallel and the ids of each type are generated
+       as soon as its listing is complete.
+
+    """
+    listings = []
+    for selector, api_call, filter_linked in filtered_selectors(args, api):
+        query_value = args.all_tag
+        type_query_list = query_list[:]
+        if args.all_tag or selector:
+            if selector:
+                query_value = selector
+            type_query_list.append("tags__in=%s" % query_value)
+        if type_query_list and filter_linked:
+            type_query_list.append(filter_linked)
+        if type_query_list:
+            listings.append((api_call, ";".join(type_query_list)))
+    if not listings:
+        return
+    status_code = STATUS_CODES[args.status]
+
+    def list_type(listing):
+        """Lists the ids of one resource type
+
+        """
+        api_call, query_string = listing
+        return u.list_ids(api_call, query_string, status_code=status_code)
+
+    pool = ThreadPool(min(MAX_PARALLEL_LISTINGS, len(listings)))
+    try:
+        for ids in pool.imap(list_type, listings):
+            for resource_id in ids:
+                yield resource_id
+    finally:
+        pool.terminate()
+
+
 def get_delete_list(args, api, query_list):
     """Building the list of resources to be deleted by adding the tag
        filtering user options to the
        previous ones for all the filtered resource types.
 
     """
-    resource_selectors = filtered_selectors(args, api)
-    delete_list = []
-
-    if resource_selectors:
-        for selector, api_call, filter_linked in resource_selectors:
-            query_value = args.all_tag
-            type_query_list = query_list[:]
-            if args.all_tag or selector:
-                if selector:
-                    query_value = selector
-                type_query_list.append("tags__in=%s" % query_value)
-            if type_query_list and filter_linked:
-                type_query_list.append(filter_linked)
-            if type_query_list:
-                status_code = STATUS_CODES[args.status]
-                delete_list.extend(u.list_ids(api_call,
-                                              ";".join(type_query_list),
-                                              status_code=status_code))
-    return delete_list
+    return list(iter_delete_list(args, api, query_list))
 
 
 def get_date(reference, api):
@@ -150,14 +171,59 @@ def get_date(reference, api):
     return date
 
 
+def pending_deletions(delete_list_file, journal):
+    """Returns the ids in the delete list of an interrupted deletion that
+       are not in its journal of deleted resources, or None if no deletion
+       was interrupted.
+
+    """
+    if not os.path.exists(delete_list_file):
+        return None
+    deleted = set()
+    if os.path.exists(journal):
+        with open(journal) as journal_file:
+            deleted = set(line.strip() for line in journal_file)
+    with open(delete_list_file) as list_file:
+        return [resource_id.strip() for resource_id in list_file
+                if resource_id.strip() and
+                resource_id.strip() not in deleted]
+
+
+def deletion_layer(resource_id):
+    """Returns the deletion layer of the resource, according to its type
+
+    """
+    return DELETION_ORDER.get(bigml.api.get_resource_type(resource_id),
+                              len(DELETION_LAYERS))
+
+
+def deletion_plan(resources_list):
+    """Splits the sorted list of resources in the lists of resources that
+       can be deleted in parallel, in deletion order
+
+    """
+    plan = []
+    current_layer = None
+    for resource_id in resources_list:
+        layer = deletion_layer(resource_id)
+        if layer != current_layer:
+            plan.append([])
+            current_layer = layer
+        plan[-1].append(resource_id)
+    return plan
+
+
 def resources_by_type(resources_list, bulk_deletion=False):
-    """Sorts resources by type. Datasets are shifted to the bottom of the
-       list to avoid problems deleting cluster-related datasets, if possible.
+    """Sorts resources by type. The resources derived from others are
+       placed before their origins (e.g.: batch predictions before models,
+       models before datasets and datasets before sources), as set in
+       DELETION_LAYERS.
        Returns aggregations by type.
        If bulk_deletion is set, then only projects or executions are kept
     """
     type_summary = {}
-    resources_list.sort()
+    resources_list.sort(key=lambda resource_id: (
+        deletion_layer(resource_id), resource_id))
     if bulk_deletion:
         new_resources_list = []
     for resource in resources_list:
@@ -252,7 +318,9 @@ def delete_dispatcher(args=sys.argv[1:]):
 
     # Parses command line arguments.
     command_args = a.parse_and_check(command)
-    if command_args.resume:
+    # the stored command replaces the arguments, so the flag is kept here
+    resume = command_args.resume
+    if resume:
         command_args, session_file, _ = get_stored_command(
             args, command_args.debug, command_log=COMMAND_LOG,
             dirs_log=DIRS_LOG, sessions_log=SESSIONS_LOG)
@@ -276,12 +344,14 @@ def delete_dispatcher(args=sys.argv[1:]):
     # Creates the corresponding api instance
     api = a.get_api_instance(command_args, u.check_dir(session_file))
 
-    delete_resources(command_args, api)
+    delete_resources(command_args, api, resume=resume)
     u.log_message("_" * 80 + "\n", log_file=session_file)
 
 
-def delete_resources(command_args, api, deleted_list=None):
-    """Deletes the resources selected by the user given options
+def delete_resources(command_args, api, deleted_list=None, resume=False):
+    """Deletes the resources selected by the user given options. When
+       resuming, only the resources of the interrupted deletion that are
+       not in its journal are deleted.
 
     """
     if deleted_list is None:
@@ -291,42 +361,54 @@ def delete_resources(command_args, api, deleted_list=None):
     else:
         path = command_args.output_dir
     session_file = os.path.join(path, SESSIONS_LOG)
-    message = u.dated("Retrieving objects to delete.\n")
-    u.log_message(message, log_file=session_file,
-                  console=command_args.verbosity)
-    # Parses resource types to filter
-    if command_args.resource_types is not None:
-        resource_types = [resource_type.strip() for resource_type in
-                          command_args.resource_types.split(',')]
-        command_args.resource_types_ = resource_types
+    delete_list_file = os.path.join(path, DELETE_LIST_FILE)
+    journal = os.path.join(path, DELETED_FILE)
+    # an interrupted deletion is resumed using its delete list and journal
+    delete_list = None
+    if resume:
+        delete_list = pending_deletions(delete_list_file, journal)
+    if delete_list is not None:
+        message = u.dated("Resuming deletion.\n")
+        u.log_message(message, log_file=session_file,
+                      console=command_args.verbosity)
     else:
-        command_args.resource_types_ = None
-
-    delete_list = []
-    # by ids
-    if command_args.delete_list:
-        delete_list = [resource_id.strip() for resource_id in
-                       command_args.delete_list.split(',')]
-    # in file
-    if command_args.delete_file:
-        if not os.path.exists(command_args.delete_file):
-            sys.exit("File %s not found" % command_args.delete_file)
-        with open(command_args.delete_file, "r") as delete_file:
-            resource_id = bigml.api.get_resource_id(
-                delete_file.readline().strip())
-            if resource_id:
-                delete_list.append(resource_id)
-    # from directory
-    if command_args.from_dir:
-        delete_list.extend(retrieve_resources(command_args.from_dir))
-
-    # filter resource_types if any
-    delete_list = filter_resource_types(delete_list,
-                                        command_args.resource_types_)
-
-    # by time interval and tag (plus filtered resource_types)
-    time_qs_list = time_interval_qs(command_args, api)
-    delete_list.extend(get_delete_list(command_args, api, time_qs_list))
+        message = u.dated("Retrieving objects to delete.\n")
+        u.log_message(message, log_file=session_file,
+                      console=command_args.verbosity)
+        # Parses resource types to filter
+        if command_args.resource_types is not None:
+            resource_types = [resource_type.strip() for resource_type in
+                              command_args.resource_types.split(',')]
+            command_args.resource_types_ = resource_types
+        else:
+            command_args.resource_types_ = None
+
+        delete_list = []
+        # by ids
+        if command_args.delete_list:
+            delete_list = [resource_id.strip() for resource_id in
+                           command_args.delete_list.split(',')]
+        # in file
+        if command_args.delete_file:
+            if not os.path.exists(command_args.delete_file):
+                sys.exit("File %s not found" % command_args.delete_file)
+            with open(command_args.delete_file, "r") as delete_file:
+                resource_id = bigml.api.get_resource_id(
+                    delete_file.readline().strip())
+                if resource_id:
+                    delete_list.append(resource_id)
+        # from directory
+        if command_args.from_dir:
+            delete_list.extend(retrieve_resources(
+                command_args.from_dir, index_file=command_args.scan_index))
+
+        # filter resource_types if any
+        delete_list = filter_resource_types(delete_list,
+                                            command_args.resource_types_)
+
+        # by time interval and tag (plus filtered resource_types)
+        time_qs_list = time_interval_qs(command_args, api)
+        delete_list.extend(get_delete_list(command_args, api, time_qs_list))
 
     delete_list = [resource_id for resource_id in delete_list \
         if resource_id not in deleted_list]
@@ -374,7 +456,20 @@ def delete_resources(command_args, api, deleted_list=None):
     message = ("%s" % (" " * INDENT_IDS)) + message + "\n"
     u.log_message(message, log_file=session_file)
     if not command_args.dry_run:
-        u.delete(api, delete_list, exe_outputs=not command_args.execution_only)
+        with open(delete_list_file, "w") as list_file:
+            list_file.write("".join("%s\n" % resource_id for resource_id in
+                                    delete_list))
+        # each layer is deleted once the resources derived from it are gone
+        for layer_list in deletion_plan(delete_list):
+            u.delete(api, layer_list,
+                     exe_outputs=not command_args.execution_only,
+                     max_parallel=command_args.max_parallel_deletes,
+                     rate=command_args.deletes_per_second, journal=journal,
+                     verbosity=command_args.verbosity)
+        # the deletion is complete, so there is nothing left to resume
+        os.remove(delete_list_file)
+        if os.path.exists(journal):
+            os.remove(journal)
     if bulk_deletion:
         # if projects and executions have already been deleted, delete the rest
         delete_resources(command_args, api, deleted_list=delete_list)
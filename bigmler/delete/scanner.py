@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""BigMLer - scanning the resource log files in an output directory
+
+   The directory tree is traversed listing each directory once and the
+   resource log files found are parsed in parallel using a single regular
+   expression that matches any resource id. The results can be stored in an
+   index file so that directories and files that have not changed since the
+   last scan are neither listed nor parsed again.
+
+"""
+from __future__ import absolute_import
+
+import os
+import re
+
+from multiprocessing.pool import ThreadPool
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+import bigml.constants as c
+
+
+RESOURCES_LOG_FILES = set(['project', 'source', 'dataset', 'dataset_train',
+                           'dataset_test', 'dataset_gen', 'dataset_cluster',
+                           'dataset_parts', 'dataset_multi', 'models',
+                           'ensembles', 'evaluations',
+                           'clusters', 'batch_prediction', 'batch_centroid',
+                           'anomalies', 'batch_anomaly_score', 'sample',
+                           'associations', 'time_series', "deepnets",
+                           'scripts', 'library', 'execution'])
+MAX_PARALLEL_SCANS = 8
+SCAN_INDEX_VERSION = 1
+# one expression for all the resource types: a resource id per line,
+# surrounded by optional blanks. The anchors of each type expression are
+# replaced by the line anchors.
+RESOURCE_ID_RE = re.compile(
+    r"^[ \t]*(%s)[ \t\r]*$" % "|".join(
+        ["(?:%s)" % resource_re.pattern.replace("^", "").replace("$", "")
+         for resource_re in c.RESOURCE_RE.values()]),
+    re.M)
+
+
+def file_resource_ids(path):
+    """Returns the resource ids found in a resource log file, one per line
+
+    """
+    try:
+        with open(path) as log_file:
+            contents = log_file.read()
+    except IOError:
+        return []
+    return [match.group(1) for match in RESOURCE_ID_RE.finditer(contents)]
+
+
+def file_stamp(path):
+    """Modification time and size of a file, used to detect changes
+
+    """
+    stat = os.stat(path)
+    return [stat.st_mtime, stat.st_size]
+
+
+def list_directory(directory):
+    """Returns the subdirectories and the resource log files in a directory,
+       sorted by name
+
+    """
+    subdirs = []
+    log_files = []
+    if scandir is not None:
+        for entry in scandir(directory):
+            if entry.is_dir():
+                subdirs.append(entry.name)
+            elif entry.name in RESOURCES_LOG_FILES and entry.is_file():
+                log_files.append(entry.name)
+    else:
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                subdirs.append(name)
+            elif name in RESOURCES_LOG_FILES and os.path.isfile(path):
+                log_files.append(name)
+    return sorted(subdirs), sorted(log_files)
+
+
+def read_scan_index(index_file):
+    """Reads the stored scan index. Missing or unreadable index files
+       start a new index.
+
+    """
+    try:
+        with open(index_file) as index_handler:
+            index = json.load(index_handler)
+        if index.get("version") == SCAN_INDEX_VERSION:
+            return index["directories"]
+    except (IOError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+
+def write_scan_index(index_file, directories):
+    """Stores the scan index
+
+    """
+    with open(index_file, "w") as index_handler:
+        json.dump({"version": SCAN_INDEX_VERSION,
+                   "directories": directories}, index_handler)
+
+
+def scan_directory(directory, index=None, max_parallel=MAX_PARALLEL_SCANS):
+    """Traverses the directory tree and returns the new index of the
+       directories and log files in it.
+
+       `index` is a previous scan of the tree, as a dict keyed by
+       directory path. Directories with the same modification time are not
+       listed again and log files with the same modification time and size
+       are not parsed again.
+
+    """
+    index = index or {}
+    directories = {}
+    pending = []
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            mtime = os.stat(current).st_mtime
+        except OSError:
+            continue
+        cached = index.get(current)
+        if cached is not None and cached["mtime"] == mtime:
+            subdirs = cached["subdirs"]
+            log_files = sorted(cached["files"].keys())
+        else:
+            cached = None
+            try:
+                subdirs, log_files = list_directory(current)
+            except OSError:
+                continue
+        files = {}
+        for log_file in log_files:
+            path = os.path.join(current, log_file)
+            try:
+                stamp = file_stamp(path)
+            except OSError:
+                continue
+            if cached is not None and log_file in cached["files"] and \
+                    cached["files"][log_file][0:2] == stamp:
+                files[log_file] = cached["files"][log_file]
+            else:
+                files[log_file] = stamp + [[]]
+                pending.append((files[log_file], path))
+        directories[current] = {"mtime": mtime, "subdirs": subdirs,
+                                "files": files}
+        # reversed, so that subdirectories are traversed in name order
+        stack.extend([os.path.join(current, subdir) for subdir in
+                      reversed(subdirs)])
+    if pending:
+        pool = ThreadPool(max(1, min(max_parallel, len(pending))))
+        try:
+            ids_list = pool.map(file_resource_ids,
+                                [path for _, path in pending])
+        finally:
+            pool.close()
+            pool.join()
+        for (entry, _), ids in zip(pending, ids_list):
+            entry[2] = ids
+    return directories
+
+
+def retrieve_resources(directory, index_file=None,
+                       max_parallel=MAX_PARALLEL_SCANS):
+    """Searches recursively the user-given directory for resource log files
+       and returns their ids, in the order they are found and with no
+       duplicates. The scan is stored in `index_file`, if given, and reused
+       in the next scans.
+
+    """
+    if not os.path.isdir(directory):
+        return []
+    directory = os.path.abspath(directory)
+    index = read_scan_index(index_file) if index_file else {}
+    directories = scan_directory(directory, index=index,
+                                 max_parallel=max_parallel)
+    if index_file:
+        # scans of other directories in the same index are kept
+        root = os.path.join(directory, "")
+        for path in index:
+            if path != directory and not path.startswith(root):
+                directories.setdefault(path, index[path])
+        write_scan_index(index_file, directories)
+    log_ids = []
+    seen = set()
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        entry = directories.get(current)
+        if entry is None:
+            continue
+        for log_file in sorted(entry["files"].keys()):
+            for resource_id in entry["files"][log_file][2]:
+                if resource_id not in seen:
+                    seen.add(resource_id)
+                    log_ids.append(resource_id)
+        stack.extend([os.path.join(current, subdir) for subdir in
+                      reversed(entry["subdirs"])])
+    return log_ids
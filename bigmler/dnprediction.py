@@ -24,7 +24,14 @@ import sys
 import bigml.api
 
 from bigml.deepnet import Deepnet
-from bigml.io import UnicodeWriter
+from bigml.util import cast, PRECISION
+from bigml.laminar.constants import LARGE_EXP
+
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
@@ -32,8 +39,285 @@ import bigmler.checkpoint as c
 from bigmler.tst_reader import TstReader as TestReader
 from bigmler.resources import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resources import create_batch_prediction
-from bigmler.prediction import use_prediction_headers
-from bigmler.lrprediction import write_prediction
+from bigmler.prediction import use_prediction_headers, PredictionWriter
+from bigmler.lrprediction import write_prediction, write_batch, BATCH_SIZE
+from bigmler.columnar import output_writer, format_file_name
+
+MEAN = "mean"
+STANDARD_DEVIATION = "stdev"
+ZERO = "zero_value"
+ONE = "one_value"
+
+
+def sigmoid(values):
+    """Sigmoid activation that does not overflow for large negative values
+
+    """
+    exps = numpy.exp(-numpy.abs(values))
+    return numpy.where(values >= 0, 1 / (1 + exps), exps / (1 + exps))
+
+
+def softplus(values):
+    """Softplus activation, linear beyond LARGE_EXP
+
+    """
+    return numpy.where(values < LARGE_EXP,
+                       numpy.log(numpy.exp(numpy.minimum(values,
+                                                         LARGE_EXP)) + 1),
+                       values)
+
+
+def softmax(values):
+    """Row-wise softmax activation
+
+    """
+    exps = numpy.exp(values - numpy.amax(values, axis=1)[:, None])
+    return exps / numpy.sum(exps, axis=1)[:, None]
+
+
+ACTIVATORS = {
+    'tanh': numpy.tanh,
+    'sigmoid': sigmoid,
+    'softplus': softplus,
+    'relu': lambda values: values * (values > 0),
+    'softmax': softmax,
+    'identity': lambda values: values
+} if NUMPY else {}
+
+
+def to_width(matrix, width):
+    """Tiles the columns of a matrix up to the given width
+
+    """
+    ntiles = int(numpy.ceil(width / float(matrix.shape[1])))
+    return numpy.tile(matrix, (1, max(ntiles, 1)))[:, :width]
+
+
+class BatchDeepnet(object):
+    """Batch scorer for local deepnets
+
+       A chunk of input rows is encoded as a single matrix, with a column per
+       preprocessed input feature, and each layer of the network (or of
+       every network in the deepnet ensemble) is computed as one matrix
+       product plus its activation function. The results follow the format
+       and rounding of the Deepnet.predict method.
+
+    """
+    def __init__(self, local_deepnet):
+        """Prepares the terms lookups and the layers as numpy arrays
+
+        """
+        self.local_deepnet = local_deepnet
+        self.term_positions = {}
+        for field_id in local_deepnet.input_fields:
+            if field_id in local_deepnet.tag_clouds:
+                terms = local_deepnet.tag_clouds[field_id]
+            elif field_id in local_deepnet.items:
+                terms = local_deepnet.items[field_id]
+            else:
+                continue
+            self.term_positions[field_id] = first_positions(terms)
+        self.category_positions = [
+            first_positions(spec['values']) if spec['type'] != 'numeric'
+            else None for spec in local_deepnet.preprocess]
+        network = local_deepnet.network
+        self.networks = []
+        for model in local_deepnet.networks or [network]:
+            self.networks.append({
+                "trees": model['trees'],
+                "layers": [self._init_layer(layer)
+                           for layer in model['layers']],
+                "output_exposition": model.get('output_exposition')})
+
+    @staticmethod
+    def _init_layer(layer):
+        """Stores the weights and vectors of a layer as numpy arrays
+
+        """
+        numpy_layer = dict(layer)
+        if layer['weights'] is not None:
+            numpy_layer['weights'] = numpy.array(layer['weights'],
+                                                 dtype=float).T
+        for key in ['mean', 'stdev', 'offset', 'scale']:
+            if layer.get(key) is not None:
+                numpy_layer[key] = numpy.array(layer[key], dtype=float)
+        return numpy_layer
+
+    def columns(self, input_data, by_name=True):
+        """Builds the list of raw input columns for an input data row,
+           as the Deepnet.fill_array method does before preprocessing
+
+        """
+        local = self.local_deepnet
+        input_data = local.filter_input_data(input_data, by_name=by_name)
+        cast(input_data, local.fields)
+        unique_terms = local.get_unique_terms(input_data)
+        columns = []
+        for field_id in local.input_fields:
+            positions = self.term_positions.get(field_id)
+            if positions is not None:
+                occurrences = [0.0] * len(positions)
+                for term, count in unique_terms.get(field_id, []):
+                    if term in positions:
+                        occurrences[positions[term]] = count
+                columns.extend(occurrences)
+            elif field_id in local.categories:
+                category = unique_terms.get(field_id)
+                if category is not None:
+                    category = category[0][0]
+                columns.append(category)
+            elif local.missing_numerics and \
+                    local.fields[field_id]["summary"]["missing_count"] > 0:
+                if field_id in input_data:
+                    columns.extend([input_data[field_id], 0.0])
+                else:
+                    columns.extend([0.0, 1.0])
+            else:
+                columns.append(input_data.get(field_id))
+        return columns
+
+    def input_matrix(self, rows_columns):
+        """Preprocesses the raw columns of a chunk of rows into the matrix
+           of inputs for the network
+
+        """
+        blocks = []
+        for spec, positions in zip(self.local_deepnet.preprocess,
+                                   self.category_positions):
+            values = [columns[spec['index']] for columns in rows_columns]
+            if positions is not None:
+                block = numpy.zeros((len(values), len(positions)))
+                for row, value in enumerate(values):
+                    if value in positions:
+                        block[row, positions[value]] = 1
+                blocks.append(block)
+                continue
+            vector = numpy.array([float('nan') if value is None else value
+                                  for value in values], dtype=float)
+            if STANDARD_DEVIATION in spec:
+                vector = vector - spec[MEAN]
+                if spec[STANDARD_DEVIATION] > 0:
+                    vector = vector / spec[STANDARD_DEVIATION]
+                vector[numpy.isnan(vector)] = 0.0
+            elif ZERO in spec:
+                if spec[ONE] == 0.0:
+                    vector = ((vector == 0.0) | (vector == 1.0)) * 1.0
+                else:
+                    vector = (vector == spec[ONE]) * 1.0
+            else:
+                raise ValueError("'%s' is not a valid numeric spec!" %
+                                 str(spec))
+            blocks.append(vector[:, None])
+        return numpy.hstack(blocks)
+
+    @staticmethod
+    def tree_transform(matrix, trees):
+        """Adds the embeddings of the tree models as new input columns
+
+        """
+        blocks = []
+        for (start, end), model in trees:
+            inputs = matrix[:, start:end].tolist()
+            predictions = None
+            for tree in model:
+                tree_predictions = numpy.array(
+                    [tree_predict(tree, point) for point in inputs],
+                    dtype=float)
+                predictions = tree_predictions if predictions is None \
+                    else predictions + tree_predictions
+            if predictions.shape[1] > 1:
+                predictions /= predictions.sum(axis=1, keepdims=True)
+            else:
+                predictions /= len(model)
+            blocks.append(predictions)
+        blocks.append(matrix)
+        return numpy.hstack(blocks)
+
+    @staticmethod
+    def propagate(matrix, layers):
+        """Runs the input matrix through the layers of the network
+
+        """
+        last_matrix = identities = matrix
+        for layer in layers:
+            next_in = numpy.dot(last_matrix, layer['weights'])
+            if layer['mean'] is not None and layer['stdev'] is not None:
+                next_in = layer['scale'] * (next_in - layer['mean']) / \
+                    layer['stdev'] + layer['offset']
+            else:
+                next_in = next_in + layer['offset']
+            if layer['residuals']:
+                next_in = next_in + to_width(identities, next_in.shape[1])
+                last_matrix = ACTIVATORS[layer['activation_function']](
+                    next_in)
+                identities = last_matrix
+            else:
+                last_matrix = ACTIVATORS[layer['activation_function']](
+                    next_in)
+        return last_matrix
+
+    def predict_batch(self, input_data_list, by_name=True):
+        """Returns the prediction for each input data in the list, in the
+           format of the Deepnet.predict method
+
+        """
+        local = self.local_deepnet
+        matrix = self.input_matrix([self.columns(input_data, by_name=by_name)
+                                    for input_data in input_data_list])
+        trees_matrix = None
+        if local.network['trees'] is not None:
+            trees_matrix = self.tree_transform(matrix,
+                                               local.network['trees'])
+        outputs = []
+        for model in self.networks:
+            y_out = self.propagate(trees_matrix if model['trees'] else matrix,
+                                   model['layers'])
+            if local.regression:
+                exposition = model['output_exposition']
+                y_out = y_out[:, 0] * exposition[STANDARD_DEVIATION] + \
+                    exposition[MEAN]
+            outputs.append(y_out)
+        y_sum = sum(outputs)
+        if local.regression:
+            return [{"prediction": value} for value in
+                    (y_sum / len(outputs)).tolist()]
+        if len(outputs) > 1:
+            y_sum = y_sum / numpy.sum(y_sum, axis=1)[:, None]
+        predictions = []
+        for row, best in zip(y_sum.tolist(),
+                             numpy.argmax(y_sum, axis=1).tolist()):
+            predictions.append({
+                "prediction": local.class_names[best],
+                "probability": round(row[best], PRECISION),
+                "distribution": [{"category": category,
+                                  "probability": round(row[index],
+                                                       PRECISION)}
+                                 for index, category
+                                 in enumerate(local.class_names)]})
+        return predictions
+
+
+def first_positions(values):
+    """Maps each value to the position of its first occurrence in the list
+
+    """
+    positions = {}
+    for index in range(len(values) - 1, -1, -1):
+        positions[values[index]] = index
+    return positions
+
+
+def tree_predict(tree, point):
+    """Leaf distribution for a point in one of the deepnet's tree models
+
+    """
+    node = tree
+    while node[-1] is not None:
+        if point[node[0]] <= node[1]:
+            node = node[2]
+        else:
+            node = node[3]
+    return node[0]
 
 
 def local_prediction(deepnets, test_reader, output, args,
@@ -44,13 +328,27 @@ def local_prediction(deepnets, test_reader, output, args,
     # Only one deepnet at present
     local_deepnet = Deepnet(deepnets[0],
                             api=args.retrieve_api_)
-    test_set_header = test_reader.has_headers()
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        prediction_info = local_deepnet.predict(
-            input_data_dict, by_name=test_set_header)
-        write_prediction(prediction_info, output,
-                         args.prediction_info, input_data, exclude)
+    if not NUMPY or not local_deepnet.preprocess:
+        for input_data in test_reader:
+            input_data_dict = test_reader.dict(input_data, filtering=False)
+            prediction_info = local_deepnet.predict(
+                input_data_dict, by_name=False)
+            write_prediction(prediction_info, output,
+                             args.prediction_info, input_data, exclude)
+        return
+    # rows are scored in chunks, each layer as one matrix product
+    batch_deepnet = BatchDeepnet(local_deepnet)
+    with PredictionWriter(output, args.prediction_info,
+                          exclude) as prediction_writer:
+        input_data_list = []
+        for input_data in test_reader:
+            input_data_list.append(input_data)
+            if len(input_data_list) == BATCH_SIZE:
+                write_batch(batch_deepnet, input_data_list, test_reader,
+                            prediction_writer)
+                input_data_list = []
+        write_batch(batch_deepnet, input_data_list, test_reader,
+                    prediction_writer)
 
 
 def dn_prediction(deepnets, fields, args, session_file=None):
@@ -60,11 +358,12 @@ def dn_prediction(deepnets, fields, args, session_file=None):
     """
     test_set = args.test_set
     test_set_header = args.test_header
-    output = args.predictions
+    output = format_file_name(args.predictions, args)
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, headers=args.prediction_header,
+                       lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args,
@@ -100,8 +399,9 @@ def remote_dn_prediction(deepnet, test_dataset,
             deepnet_id, test_dataset, batch_prediction_args,
             args, api, session_file=session_file, path=path, log=log)
     if not args.no_csv:
-        file_name = api.download_batch_prediction(batch_prediction,
-                                                  prediction_file)
+        file_name = u.download_to_sink(api.download_batch_prediction,
+                                       batch_prediction, prediction_file,
+                                       sink=args.output_sink)
         if file_name is None:
             sys.exit("Failed downloading CSV.")
     if args.to_dataset:
@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Ensemble level output
+
+This module defines functions that generate the code that combines the
+predictions of the exported models of an ensemble using the ensemble
+voting methods: plurality and confidence weighted. Regressions are combined
+by averaging or by weighting the predictions with their errors, as the
+local Ensemble does.
+"""
+import keyword
+
+from unidecode import unidecode
+
+from bigml.tree_utils import to_camel_js, slugify, INDENT
+from bigml.util import PY3
+from bigml.multivote import PLURALITY_CODE, CONFIDENCE_CODE, COMBINER_MAP
+
+
+COMBINER_METHODS = [PLURALITY_CODE, CONFIDENCE_CODE]
+# range of the scaled errors used to weight regression predictions
+TOP_RANGE = 10
+
+JS_TEMPLATE = u"""
+/**
+*  Predictor for %(objective)s from %(ensemble)s
+*  Combines the predictions of its models by %(method)s
+*/
+var MODELS_%(name)s = [
+%(models)s];
+
+function predict%(name)s() {
+    var predictions = [];
+    var prediction, index;
+    for (index = 0; index < MODELS_%(name)s.length; index++) {
+        prediction = MODELS_%(name)s[index].apply(null, arguments);
+        if (prediction !== null) {
+            predictions.push(prediction);
+        }
+    }
+    if (predictions.length === 0) {
+        return null;
+    }
+    return combine(predictions);
+%(combine)s}
+"""
+
+JS_MODEL_TEMPLATE = u"""%(indent)s(function () {
+%(code)s
+%(indent)sreturn predict%(name)s;
+%(indent)s})()"""
+
+# votes are added per category and ties are broken by choosing the category
+# that was predicted first
+JS_CLASSIFICATION = u"""
+    function combine(predictions) {
+        var votes = {}, order = [], weights = 0, confidence = 0;
+        var category, weight, best, index;
+        for (index = 0; index < predictions.length; index++) {
+            category = predictions[index].prediction;
+            weight = %(weight)s;
+            if (!votes.hasOwnProperty(category)) {
+                votes[category] = 0;
+                order.push(category);
+            }
+            votes[category] += weight;
+        }
+        best = order[0];
+        for (index = 1; index < order.length; index++) {
+            if (votes[order[index]] > votes[best]) {
+                best = order[index];
+            }
+        }
+        for (index = 0; index < predictions.length; index++) {
+            if (predictions[index].prediction == best) {
+                weight = %(weight)s;
+                confidence += weight * predictions[index].confidence;
+                weights += weight;
+            }
+        }
+        return {prediction: best,
+                confidence: weights > 0 ? confidence / weights : NaN};
+    }
+"""
+
+JS_REGRESSION = u"""
+    function combine(predictions) {
+        var weights = [], total = 0, prediction = 0, error = 0;
+        var minError = Infinity, maxError = -Infinity, range, index;
+        for (index = 0; index < predictions.length; index++) {
+            minError = Math.min(minError, predictions[index].error);
+            maxError = Math.max(maxError, predictions[index].error);
+        }
+        range = maxError - minError;
+        for (index = 0; index < predictions.length; index++) {
+            weights.push(%(weighted)s && range > 0 ?
+                Math.exp((minError - predictions[index].error) / range *
+                         %(top_range)s) : 1);
+            total += weights[index];
+        }
+        for (index = 0; index < predictions.length; index++) {
+            prediction += weights[index] * predictions[index].prediction;
+            error += weights[index] * predictions[index].error;
+        }
+        return {prediction: prediction / total, error: error / total};
+    }
+"""
+
+# loads the prediction functions from the model files
+LOADER_TEMPLATE = u"""# -*- coding: utf-8 -*-
+\"\"\"Predictor for %(objective)s from %(ensemble)s
+
+    Combines the predictions of its models by %(method)s
+\"\"\"
+import os
+import math
+%(imports)s
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILES = [
+%(models)s]
+
+
+def load_predictor(model_file):
+    \"\"\"Returns the prediction function defined in the model file
+
+    \"\"\"
+    path = os.path.join(DIRECTORY, model_file)
+    names = {"__file__": path, "__name__": model_file[:-3]}
+    with open(path, "rb") as model_handler:
+        exec(compile(model_handler.read(), path, "exec"), names)
+    return [value for name, value in sorted(names.items()) if
+            name.startswith("predict_") and callable(value)][0]
+
+
+MODELS = [load_predictor(model_file) for model_file in MODEL_FILES]
+"""
+
+PYTHON_TEMPLATE = u"""
+
+def predict_%(name)s(*args, **kwargs):
+    \"\"\"Predictor for %(objective)s from %(ensemble)s
+
+    \"\"\"
+    predictions = []
+    for model in MODELS:
+        prediction = model(*args, **kwargs)
+        if prediction is None:
+            continue
+        if not isinstance(prediction, dict):
+            prediction = {"prediction": prediction}
+        predictions.append(prediction)
+    if not predictions:
+        return None
+    return combine(predictions)
+%(combine)s"""
+
+PYTHON_CLASSIFICATION = u"""
+
+def combine(predictions):
+    \"\"\"Votes the category. Ties are broken by choosing the category that
+       was predicted first
+
+    \"\"\"
+    votes = {}
+    order = []
+    for prediction in predictions:
+        category = prediction["prediction"]
+        if category not in votes:
+            votes[category] = 0
+            order.append(category)
+        votes[category] += %(weight)s
+    best = order[0]
+    for category in order[1:]:
+        if votes[category] > votes[best]:
+            best = category
+    confidence = 0.0
+    weights = 0.0
+    for prediction in predictions:
+        if prediction["prediction"] == best and \\
+                prediction.get("confidence") is not None:
+            weight = %(weight)s
+            confidence += weight * prediction["confidence"]
+            weights += weight
+    return {"prediction": best,
+            "confidence": confidence / weights if weights > 0 else None}
+"""
+
+PYTHON_REGRESSION = u"""
+
+def combine(predictions):
+    \"\"\"Averages the predictions, weighted by their errors if required
+
+    \"\"\"
+    errors = [prediction.get("error") or 0 for prediction in predictions]
+    error_range = float(max(errors) - min(errors))
+    if %(weighted)s and error_range > 0:
+        weights = [math.exp((min(errors) - error) / error_range *
+                            %(top_range)s) for error in errors]
+    else:
+        weights = [1] * len(predictions)
+    total = float(sum(weights))
+    return {"prediction": sum([weight * prediction["prediction"] for
+                               weight, prediction in
+                               zip(weights, predictions)]) / total,
+            "error": sum([weight * error for weight, error in
+                          zip(weights, errors)]) / total}
+"""
+
+NUMPY_TEMPLATE = u"""
+
+def predict_batch(columns):
+    \"\"\"Predictor for %(objective)s from %(ensemble)s
+
+       `columns` is a dict that contains the values of the input fields
+       for all the rows, keyed by field name.
+
+    \"\"\"
+    return combine([model(columns) for model in MODELS])
+%(combine)s"""
+
+NUMPY_CLASSIFICATION = u"""
+
+def combine(results):
+    \"\"\"Votes the category of each row. Ties are broken by choosing the
+       category that was predicted first
+
+    \"\"\"
+    count = len(results[0]["prediction"])
+    rows = np.arange(count)
+    categories = set()
+    for result in results:
+        categories.update(result["prediction"].tolist())
+    categories.discard(None)
+    categories = np.array(sorted(categories) or [None], dtype=object)
+    votes = np.zeros((len(categories), count))
+    order = np.empty((len(categories), count), dtype=int)
+    order[:] = len(results)
+    for index, result in enumerate(results):
+        weight = %(weight)s
+        for position, category in enumerate(categories):
+            selected = result["prediction"] == category
+            votes[position] += np.where(selected, weight, 0)
+            order[position][selected] = np.minimum( \\
+                order[position][selected], index)
+    best = np.zeros(count, dtype=int)
+    for position in range(1, len(categories)):
+        better = (votes[position] > votes[best, rows]) | \\
+            ((votes[position] == votes[best, rows]) &
+             (order[position] < order[best, rows]))
+        best[better] = position
+    predicted = order[best, rows] < len(results)
+    prediction = np.empty(count, dtype=object)
+    prediction[predicted] = categories[best[predicted]]
+    confidence = np.zeros(count)
+    weights = np.zeros(count)
+    for result in results:
+        weight = %(weight)s
+        selected = predicted & (result["prediction"] == prediction) & \\
+            ~np.isnan(result["confidence"])
+        confidence += np.where(selected, weight * result["confidence"], 0)
+        weights += np.where(selected, weight, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        confidence = np.where(weights > 0, confidence / weights, np.nan)
+    return {"prediction": prediction, "confidence": confidence}
+"""
+
+NUMPY_REGRESSION = u"""
+
+def combine(results):
+    \"\"\"Averages the predictions of each row, weighted by their errors if
+       required
+
+    \"\"\"
+    predictions = np.array([result["prediction"] for result in results],
+                           dtype=float)
+    errors = np.nan_to_num(np.array([result["error"] for result in results],
+                                    dtype=float))
+    valid = ~np.isnan(predictions)
+    min_error = np.where(valid, errors, np.inf).min(axis=0)
+    error_range = np.where(valid, errors, -np.inf).max(axis=0) - min_error
+    weights = np.ones(predictions.shape)
+    if %(weighted)s:
+        with np.errstate(invalid="ignore"):
+            scaled = np.where(error_range > 0, error_range, 1)
+            weights = np.where(error_range > 0,
+                               np.exp((min_error - errors) / scaled *
+                                      %(top_range)s), 1)
+    weights = np.where(valid, weights, 0)
+    total = weights.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {"prediction": (weights * np.nan_to_num(predictions)).sum( \\
+                    axis=0) / total,
+                "error": (weights * errors).sum(axis=0) / total}
+"""
+
+
+def js_combiner(ensemble, model_codes, method):
+    """Javascript code that combines the predictions of the models, whose
+       code is inlined in a closure each
+
+    """
+    objective = ensemble.fields[ensemble.objective_id]
+    name = to_camel_js(unidecode(objective['name']), False)
+    models = [JS_MODEL_TEMPLATE % {"indent": INDENT, "code": code,
+                                   "name": name}
+              for code in model_codes]
+    if objective['optype'] == 'numeric':
+        combine = JS_REGRESSION % {
+            "weighted": "true" if method == CONFIDENCE_CODE else "false",
+            "top_range": TOP_RANGE}
+    else:
+        combine = JS_CLASSIFICATION % {
+            "weight": "predictions[index].confidence" if \
+                method == CONFIDENCE_CODE else "1"}
+    return JS_TEMPLATE % {"objective": objective['name'],
+                          "ensemble": ensemble.resource_id,
+                          "method": COMBINER_MAP[method],
+                          "name": name,
+                          "models": u",\n".join(models),
+                          "combine": combine}
+
+
+def loader_code(ensemble, model_files, method, imports=u""):
+    """Python code that loads the prediction functions of the models from
+       their files
+
+    """
+    return LOADER_TEMPLATE % {
+        "objective": ensemble.fields[ensemble.objective_id]['name'],
+        "ensemble": ensemble.resource_id,
+        "method": COMBINER_MAP[method],
+        "imports": imports,
+        "models": u"".join([u"%s%r,\n" % (INDENT, str(model_file))
+                            for model_file in model_files])}
+
+
+def python_combiner(ensemble, model_files, method):
+    """Python code that combines the predictions of the models, loaded
+       from their files
+
+    """
+    objective = ensemble.fields[ensemble.objective_id]
+    name = slugify(objective['name'], reserved_keywords=keyword.kwlist,
+                   prefix="_")
+    if objective['optype'] == 'numeric':
+        combine = PYTHON_REGRESSION % {
+            "weighted": method == CONFIDENCE_CODE,
+            "top_range": TOP_RANGE}
+    else:
+        combine = PYTHON_CLASSIFICATION % {
+            "weight": "(prediction.get(\"confidence\") or 0)" if \
+                method == CONFIDENCE_CODE else "1"}
+    return loader_code(ensemble, model_files, method) + PYTHON_TEMPLATE % {
+        "objective": objective['name'],
+        "ensemble": ensemble.resource_id,
+        "name": name,
+        "combine": combine}
+
+
+def numpy_combiner(ensemble, model_files, method):
+    """Python code that combines the arrays of predictions of the numpy
+       models, loaded from their files
+
+    """
+    objective = ensemble.fields[ensemble.objective_id]
+    if objective['optype'] == 'numeric':
+        combine = NUMPY_REGRESSION % {
+            "weighted": method == CONFIDENCE_CODE,
+            "top_range": TOP_RANGE}
+    else:
+        combine = NUMPY_CLASSIFICATION % {
+            "weight": "np.nan_to_num(result[\"confidence\"])" if \
+                method == CONFIDENCE_CODE else "1.0"}
+    return loader_code(ensemble, model_files, method,
+                       imports=u"\nimport numpy as np\n\n") + \
+        NUMPY_TEMPLATE % {"objective": objective['name'],
+                          "ensemble": ensemble.resource_id,
+                          "combine": combine}
+
+
+def inline_codes(model_files):
+    """Contents of the model files
+
+    """
+    codes = []
+    for model_file in model_files:
+        with open(model_file) as model_handler:
+            code = model_handler.read()
+        if not PY3:
+            code = code.decode("utf8")
+        codes.append(code)
+    return codes
+
+
+# languages whose combiner inlines the code of the models
+INLINED = ["javascript"]
+
+COMBINERS = {
+    "javascript": js_combiner,
+    "python": python_combiner,
+    "numpy": numpy_combiner}
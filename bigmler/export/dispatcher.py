@@ -23,12 +23,15 @@ import sys
 import os
 import shutil
 
+from multiprocessing.pool import ThreadPool
 
 import bigmler.processing.args as a
 import bigmler.utils as u
 
 
 from bigml.ensemble import Ensemble
+from bigml.util import PY3
+from bigml.multivote import COMBINER_MAP
 
 from bigmler.defaults import DEFAULTS_FILE
 from bigmler.command import get_context
@@ -40,27 +43,41 @@ except:
     from bigml.model import Model as PythonModel
 from bigmler.export.out_model.tableaumodel import TableauModel
 from bigmler.export.out_model.mysqlmodel import MySQLModel
+from bigmler.export.out_model.mysqlrules import MySQLRulesModel
 from bigmler.export.out_model.rmodel import RModel
 from bigmler.export.out_model.pythonlr import PythonLR
+from bigmler.export.out_model.jstable import JsTableModel
+from bigmler.export.out_model.pythontable import PythonTableModel
+from bigmler.export.out_model.numpymodel import NumpyModel
+from bigmler.export.combiner import (COMBINERS, COMBINER_METHODS, INLINED,
+                                     inline_codes)
 
 
 COMMAND_LOG = u".bigmler_export"
 DIRS_LOG = u".bigmler_export_dir_stack"
 LOG_FILES = [COMMAND_LOG, DIRS_LOG, u.NEW_DIRS_LOG]
+MAX_PARALLEL_EXPORTS = 4
 
 EXPORTS = {
     "javascript": JsModel,
     "python": PythonModel,
     "tableau": TableauModel,
     "mysql": MySQLModel,
-    "r": RModel}
+    "r": RModel,
+    "numpy": NumpyModel}
+
+TABLE_EXPORTS = {
+    "javascript": JsTableModel,
+    "python": PythonTableModel,
+    "mysql": MySQLRulesModel}
 
 EXTENSIONS = {
     "javascript": "js",
     "python": "py",
     "tableau": "tb",
     "mysql": "sql",
-    "r": "R"}
+    "r": "R",
+    "numpy": "py"}
 
 LR_EXPORTS   = {
     "python": PythonLR
@@ -92,50 +109,128 @@ def export_dispatcher(args=sys.argv[1:]):
                                                  resource)
     u.log_message(message, \
         log_file=session_file, console=command_args.verbosity)
-    export_code(command_args, api)
+    export_code(command_args, api, session_file=session_file)
     u.log_message("_" * 80 + "\n", log_file=session_file)
 
     u.print_generated_files(command_args.output_dir, log_file=session_file,
                             verbosity=command_args.verbosity)
 
 
+def output_file_name(resource_id, args, suffix=""):
+    """Path of the file where the code for the resource is stored
+
+    """
+    return os.path.join(args.output_dir, "%s%s.%s" % ( \
+        resource_id.replace("/", "_"), suffix, EXTENSIONS[args.language]))
+
+
 def generate_output(local_model, args, model_type="model", attr="confidence"):
     """Generates the output for the prediction (and confidence) function
+       and returns the path of the prediction file
 
     """
-    with open(os.path.join(args.output_dir, \
-        "%s.%s") % (local_model.resource_id.replace("/", "_"),
-                    EXTENSIONS[args.language]), "w") as handler:
+    model_file = output_file_name(local_model.resource_id, args)
+    with open(model_file, "w") as handler:
         local_model.plug_in(out=handler)
-    # creating a separate file to predict confidence
-    if args.language in SEPARATE_OUTPUT:
-        with open(os.path.join(args.output_dir, \
-            "%s_confidence.%s") % (getattr(args, model_type).replace("/", "_"),
-                        EXTENSIONS[args.language]), "w") as handler:
+    # creating a separate file to predict confidence. The lookup table
+    # outputs return both at once
+    if args.language in SEPARATE_OUTPUT and not args.lookup_table:
+        with open(output_file_name(local_model.resource_id, args,
+                                   suffix="_confidence"), "w") as handler:
             local_model.plug_in(out=handler, attr=attr)
+    return model_file
+
 
+def export_models(local_ensemble, exports, args, api=None):
+    """Retrieves the models of the ensemble and generates their code in
+       parallel. Returns the paths of the prediction files, in the order
+       of the models in the ensemble.
+
+    """
+    def export_model(model_id):
+        """Generates the code for one of the models
 
-def export_code(args, api=None):
+        """
+        try:
+            local_model = exports[args.language]( \
+                model_id,
+                api=api,
+                fields=local_ensemble.fields)
+            return generate_output(local_model, args, model_type="model")
+        except SystemExit as exc:
+            # the pool workers cannot end the process
+            return exc
+
+    pool = ThreadPool(min(MAX_PARALLEL_EXPORTS,
+                          len(local_ensemble.model_ids)))
+    try:
+        model_files = pool.map(export_model, local_ensemble.model_ids)
+    finally:
+        pool.terminate()
+    for model_file in model_files:
+        if isinstance(model_file, SystemExit):
+            raise model_file
+    return model_files
+
+
+def generate_combiner(local_ensemble, model_files, args, session_file=None):
+    """Generates the code that combines the predictions of the models in
+       the ensemble, if available for the language and method
+
+    """
+    message = None
+    if args.language not in COMBINERS:
+        message = "The ensemble combiner is not available for %s.\n" % \
+            args.language
+    elif local_ensemble.boosting:
+        message = "The ensemble combiner is not available for boosted" \
+            " ensembles.\n"
+    elif args.method not in COMBINER_METHODS:
+        message = "The ensemble combiner is only available for the %s" \
+            " methods.\n" % " and ".join( \
+                [COMBINER_MAP[method] for method in COMBINER_METHODS])
+    if message is not None:
+        u.log_message(message, log_file=session_file,
+                      console=args.verbosity)
+        return
+    if args.language in INLINED:
+        model_files = inline_codes(model_files)
+    else:
+        model_files = [os.path.basename(model_file) for model_file
+                       in model_files]
+    output = COMBINERS[args.language](local_ensemble, model_files,
+                                      args.method)
+    if not PY3:
+        output = output.encode("utf8")
+    with open(output_file_name(local_ensemble.resource_id, args),
+              "w") as handler:
+        handler.write(output)
+
+
+def export_code(args, api=None, session_file=None):
     """Generates the plugin code in the language required by the user
 
     """
     args.language = args.language or "javascript"
+    exports = EXPORTS
+    if args.lookup_table:
+        if args.language not in TABLE_EXPORTS:
+            sys.exit("The lookup table output is not available for %s." %
+                     args.language)
+        exports = TABLE_EXPORTS
 
-    if args.model is not None and args.language in EXPORTS:
+    if args.model is not None and args.language in exports:
 
-        local_model = EXPORTS[args.language](args.model, api=api)
+        local_model = exports[args.language](args.model, api=api)
         generate_output(local_model, args, model_type="model")
 
-    if args.ensemble is not None and args.language in EXPORTS:
-        local_ensemble = Ensemble(args.ensemble, api=api)
-
-        for model_id in local_ensemble.model_ids:
-            local_model = EXPORTS[args.language]( \
-                model_id,
-                api=api,
-                fields=local_ensemble.fields,
-                boosting=local_ensemble.boosting)
-            generate_output(local_model, args, model_type="model")
+    if args.ensemble is not None and args.language in exports:
+        # only the first model is retrieved here, the rest are retrieved
+        # while generating their code
+        local_ensemble = Ensemble(args.ensemble, api=api, max_models=1)
+        model_files = export_models(local_ensemble, exports, args, api=api)
+        generate_combiner(local_ensemble, model_files, args,
+                          session_file=session_file)
 
 
     """
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Lookup table output for JavaScript
+
+This module defines functions that generate JavaScript code to make local
+predictions by traversing a table of nodes in a loop
+"""
+
+import sys
+import json
+
+from unidecode import unidecode
+
+from bigml.tree_utils import to_camel_js, sort_fields, INDENT, MAX_ARGS_LENGTH
+from bigml.util import PY3
+
+from bigmler.export.out_model.jsmodel import JsModel
+import bigmler.export.out_tree.nodetable as t
+
+
+NODES_TEMPLATE = u"""
+var NODES_%s = [
+%s];
+"""
+
+# the loop follows the same steps as the nested "if" code: returns the node
+# output when the split field is missing and checks the children in order
+LOOP_TEMPLATE = u"""
+    var nodes = NODES_%(objective)s;
+    var node = nodes[0];
+    var index, child, value, matches;
+    while (true) {
+        if (node[%(first_child)s] < 0 || (node[%(missing_check)s] !== null &&
+                input[node[%(missing_check)s]] == null)) {
+            return {prediction: node[%(output)s],
+                    %(metric)s: node[%(confidence)s]};
+        }
+        index = node[%(first_child)s];
+        matches = false;
+        while (index >= 0 && !matches) {
+            child = nodes[index];
+            value = input[child[%(field)s]];
+            if (child[%(missing)s] === %(or_missing)s && value == null) {
+                matches = true;
+            } else if (child[%(missing)s] === %(and_not_missing)s &&
+                       value == null) {
+                matches = false;
+            } else if (child[%(matcher)s] === "text") {
+                matches = compare(child[%(operator)s],
+                                  termMatches(value, child[%(field)s],
+                                              child[%(term)s]),
+                                  child[%(value)s]);
+            } else if (child[%(matcher)s] === "items") {
+                matches = compare(child[%(operator)s],
+                                  itemMatches(value, child[%(field)s],
+                                              child[%(term)s]),
+                                  child[%(value)s]);
+            } else {
+                matches = compare(child[%(operator)s], value,
+                                  child[%(value)s]);
+            }
+            if (!matches) {
+                index = child[%(next)s];
+            }
+        }
+        if (!matches) {
+            return null;
+        }
+        node = child;
+    }
+
+    function compare(operator, value, reference) {
+        switch (operator) {
+            case "<": return value < reference;
+            case "<=": return value <= reference;
+            case ">": return value > reference;
+            case ">=": return value >= reference;
+            case "==": return value == reference;
+            case "!=": return value != reference;
+        }
+        return false;
+    }
+}
+"""
+
+
+class JsTableModel(JsModel):
+
+    def js_input(self):
+        """Code that stores the input data in an object keyed by the
+           camelcase name of the fields
+
+        """
+        if len(self.tree.fields) > MAX_ARGS_LENGTH:
+            return u"%svar input = data;\n" % INDENT
+        pairs = []
+        for field_id, _ in sort_fields(self.tree.fields):
+            if field_id != self.tree.objective_id:
+                camelcase = self.tree.fields[field_id]['camelCase']
+                pairs.append(u"%s: %s" % (json.dumps(camelcase), camelcase))
+        return u"%svar input = {%s};\n" % (
+            INDENT, (u",\n" + INDENT * 5).join(pairs))
+
+    def js_nodes(self, table):
+        """Code that defines the table of nodes
+
+        """
+        rows = []
+        for row in table:
+            row = row[:]
+            for column in [t.FIELD, t.MISSING_CHECK]:
+                if row[column] is not None:
+                    row[column] = self.tree.fields[row[column]]['camelCase']
+            rows.append(u"%s[%s]" % (INDENT, u", ".join( \
+                [json.dumps(value) for value in row])))
+        return NODES_TEMPLATE % ( \
+            self.tree.fields[self.tree.objective_id]['CamelCase'],
+            u",\n".join(rows))
+
+    def plug_in(self, out=sys.stdout, hadoop=False,
+                filter_id=None, subtree=True):
+        """Generates a javascript implementation of local predictions that
+           traverses the tree stored as a table of nodes
+
+        `out` is file descriptor to write the javascript code.
+
+        """
+        objective_field = self.tree.fields[self.tree.objective_id]
+        camelcase = to_camel_js(unidecode(objective_field['name']), False)
+        objective_field['CamelCase'] = camelcase
+        for field in [(key, val) for key, val in
+                      sort_fields(self.tree.fields)]:
+            field_obj = self.tree.fields[field[0]]
+            field_obj['camelCase'] = to_camel_js(unidecode(field_obj['name']))
+
+        table = t.node_table(self.tree, ids_path=self.get_ids_path(filter_id),
+                             subtree=subtree)
+        term_analysis_predicates = []
+        item_analysis_predicates = []
+        for row in table:
+            if row[t.MATCHER] == "text":
+                term_analysis_predicates.append((row[t.FIELD], row[t.TERM]))
+            elif row[t.MATCHER] == "items":
+                item_analysis_predicates.append((row[t.FIELD], row[t.TERM]))
+        terms_body = ""
+        items_body = ""
+        if term_analysis_predicates:
+            terms_body = self.js_term_analysis_body(term_analysis_predicates)
+        if item_analysis_predicates:
+            items_body = self.js_item_analysis_body(item_analysis_predicates)
+        output = self.js_nodes(table)
+        output += self.js_pre_body()
+        output += terms_body + items_body + self.js_input()
+        output += LOOP_TEMPLATE % {
+            "objective": camelcase,
+            "metric": "error" if self.tree.regression else "confidence",
+            "field": t.FIELD,
+            "operator": t.OPERATOR,
+            "value": t.VALUE,
+            "missing": t.MISSING,
+            "term": t.TERM,
+            "matcher": t.MATCHER,
+            "first_child": t.FIRST_CHILD,
+            "next": t.NEXT,
+            "missing_check": t.MISSING_CHECK,
+            "output": t.OUTPUT,
+            "confidence": t.CONFIDENCE,
+            "or_missing": t.OR_MISSING,
+            "and_not_missing": t.AND_NOT_MISSING}
+        if not PY3:
+            output = output.encode("utf8")
+        out.write(output)
+        out.flush()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Rules table output for MySQL
+
+This module defines functions that generate a table with the rules that
+lead to each leaf of the tree and a single query that scores all the rows
+of a table by joining them with the rules
+"""
+import sys
+
+from bigml.tree_utils import INDENT, COMPOSED_FIELDS
+from bigml.util import PY3
+
+from bigmler.export.out_model.mysqlmodel import MySQLModel
+from bigmler.export.out_tree.mysqltree import value_to_print, condition_code
+
+
+# name of the table to be scored in the generated query
+INPUT_TABLE = "input_data"
+
+RULES_TEMPLATE = u"""%(docstring)s
+--
+-- Scores all the rows of the `%(input)s` table in a single query: each row
+-- is assigned the rule that it matches and is joined with the rules table
+-- to get its prediction. Replace `%(input)s` by the table to be scored.
+
+CREATE TABLE `%(rules)s` (
+    `rule` INT NOT NULL PRIMARY KEY,
+    `prediction` %(type)s,
+    `%(metric)s` DOUBLE);
+
+INSERT INTO `%(rules)s` VALUES
+%(values)s;
+
+SELECT `data`.*, `rules`.`prediction`, `rules`.`%(metric)s`
+FROM (
+    SELECT `%(input)s`.*,
+        CASE
+%(cases)s
+        END AS `rule`
+    FROM `%(input)s`) AS `data`
+LEFT JOIN `%(rules)s` AS `rules` ON `rules`.`rule` = `data`.`rule`;
+
+"""
+
+LOWER_BOUNDS = [">", ">="]
+UPPER_BOUNDS = ["<", "<="]
+
+
+def tighter(bound, current, lower):
+    """Checks whether the (operator, value) bound is more restrictive than
+       the current one
+
+    """
+    if current is None:
+        return True
+    operator, value = bound
+    current_operator, current_value = current
+    if value != current_value:
+        return value > current_value if lower else value < current_value
+    # for the same value, the strict inequality is more restrictive
+    return len(operator) < len(current_operator)
+
+
+def rule_code(conditions):
+    """Code for the conjunction of the conditions of a rule. The numeric
+       comparisons on the same field are merged into a range.
+
+    """
+    codes = []
+    # lower and upper bounds of each field and the position of its range
+    bounds = {}
+    for condition in conditions:
+        if isinstance(condition, tuple) and \
+                condition[1] in LOWER_BOUNDS + UPPER_BOUNDS:
+            name, operator, value = condition
+            position = 0 if operator in LOWER_BOUNDS else 1
+            if name not in bounds:
+                bounds[name] = [None, None, len(codes)]
+                codes.append(None)
+            if tighter((operator, value), bounds[name][position],
+                       position == 0):
+                bounds[name][position] = (operator, value)
+        else:
+            codes.append(condition_code(condition))
+    for name, (lower, upper, index) in bounds.items():
+        codes[index] = u" AND ".join( \
+            [condition_code((name,) + bound) for bound in [lower, upper]
+             if bound is not None])
+    return u" AND ".join(codes) or u"TRUE"
+
+
+class MySQLRulesModel(MySQLModel):
+
+    def plug_in(self, out=sys.stdout, filter_id=None, subtree=True, attr=None):
+        """Generates the MySQL code that creates the table of rules of the
+           model and the query that scores a table of input data with it.
+
+        `out`  is file descriptor to write the MySQL code.
+        `attr` is not used: the query returns the prediction and its
+               confidence (or error) at once.
+
+        """
+        if any(field['optype'] in COMPOSED_FIELDS for field_id, field in
+               self.fields.items() if field_id != self.objective_id):
+            sys.exit(u"\nFailed to represent this model "
+                     u"in MySQL syntax. Currently only models with "
+                     u"categorical and numeric fields can be generated.\n")
+        rules = self.tree.rules(ids_path=self.get_ids_path(filter_id),
+                                subtree=subtree)
+        objective = self.fields[self.objective_id]
+        function_name = objective['name']
+        if function_name == "":
+            function_name = "field_" + self.objective_id
+        values = []
+        cases = []
+        for index, (conditions, node) in enumerate(rules):
+            values.append(u"%s(%s, %s, %s)" % ( \
+                INDENT, index,
+                value_to_print(node.output, objective['optype']),
+                value_to_print(node.confidence, 'numeric')))
+            cases.append(u"%sWHEN %s THEN %s" % ( \
+                INDENT * 3, rule_code(conditions), index))
+        output = RULES_TEMPLATE % {
+            "docstring": u"\n".join( \
+                [(u"-- %s" % line.strip()).rstrip() for line in
+                 self.docstring().strip().splitlines()]),
+            "input": INPUT_TABLE,
+            "rules": u"predict_%s_rules" % function_name,
+            "type": u"DOUBLE" if objective['optype'] == 'numeric' else \
+                u"VARCHAR(250)",
+            "metric": u"error" if self.tree.regression else u"confidence",
+            "values": u",\n".join(values),
+            "cases": u"\n".join(cases)}
+        if not PY3:
+            output = output.encode("utf8")
+        out.write(output)
+        out.flush()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Model level output for NumPy
+
+This module defines functions that generate a standalone Python module
+that stores the tree as arrays and uses NumPy to make local predictions
+for whole arrays of rows
+"""
+
+import sys
+
+from bigml.tree_utils import sort_fields
+from bigml.model import Model
+from bigml.util import PY3
+
+import bigmler.export.out_tree.nodetable as t
+
+
+MODULE_TEMPLATE = u"""# -*- coding: utf-8 -*-
+\"\"\"%(docstring)s
+\"\"\"
+import operator
+
+import numpy as np
+
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne}
+OR_MISSING = %(or_missing)s
+# input fields and their types
+FIELDS = %(fields)s
+NUMERIC = %(numeric)s
+# one position per node: the predicate that leads to the node, the index of
+# its first child and of the node to check when the predicate fails, the
+# field whose missing value stops the prediction at the node and its output
+FIELD = np.array(%(field)s, dtype=int)
+OPERATOR = %(operator)s
+VALUE = %(value)s
+MISSING = np.array(%(missing)s, dtype=int)
+FIRST_CHILD = np.array(%(first_child)s, dtype=int)
+NEXT = np.array(%(next)s, dtype=int)
+MISSING_CHECK = np.array(%(missing_check)s, dtype=int)
+OUTPUT = np.array(%(output)s, dtype=%(output_type)s)
+CONFIDENCE = np.array(%(confidence)s, dtype=float)
+
+
+def input_columns(columns):
+    \"\"\"Builds the arrays of values and missing flags for every field.
+       Fields not in `columns` are missing in all the rows.
+
+    \"\"\"
+    count = max([len(column) for column in columns.values()] or [0])
+    values = []
+    missings = []
+    for name, numeric in zip(FIELDS, NUMERIC):
+        column = columns.get(name)
+        if column is None:
+            column = [None] * count
+        if numeric:
+            column = np.asarray(column, dtype=float)
+            missing = np.isnan(column)
+        else:
+            column = np.asarray(column, dtype=object)
+            missing = np.array([value is None or value == "" or
+                                value != value for value in column],
+                               dtype=bool)
+        values.append(column)
+        missings.append(missing)
+    return count, values, missings
+
+
+def matches(nodes, rows, values, missings):
+    \"\"\"Evaluates the predicates of the nodes for the corresponding rows
+
+    \"\"\"
+    result = np.zeros(len(nodes), dtype=bool)
+    for node in np.unique(nodes):
+        selected = nodes == node
+        field = FIELD[node]
+        node_rows = rows[selected]
+        missing = missings[field][node_rows]
+        if VALUE[node] is None:
+            result[selected] = missing if OPERATOR[node] == "==" else \\
+                ~missing
+            continue
+        with np.errstate(invalid="ignore"):
+            matched = ~missing & OPERATORS[OPERATOR[node]]( \\
+                values[field][node_rows], VALUE[node])
+        if MISSING[node] == OR_MISSING:
+            matched |= missing
+        result[selected] = matched
+    return result
+
+
+def predict_batch(columns):
+    \"\"\"%(docstring)s
+
+       `columns` is a dict that contains the values of the input fields
+       for all the rows, keyed by field name. Missing values are None or
+       NaN. Returns a dict with the arrays of predictions and %(metric)ss.
+       Rows with no prediction get None or NaN.
+
+    \"\"\"
+    count, values, missings = input_columns(columns)
+    prediction = np.empty(count, dtype=%(output_type)s)
+    prediction[:] = %(no_output)s
+    confidence = np.empty(count, dtype=float)
+    confidence[:] = np.nan
+    node = np.zeros(count, dtype=int)
+    active = np.arange(count)
+    while active.size:
+        current = node[active]
+        check = MISSING_CHECK[current]
+        missing = np.zeros(active.size, dtype=bool)
+        for field in np.unique(check[check >= 0]):
+            selected = check == field
+            missing[selected] = missings[field][active[selected]]
+        final = (FIRST_CHILD[current] < 0) | missing
+        done = active[final]
+        prediction[done] = OUTPUT[node[done]]
+        confidence[done] = CONFIDENCE[node[done]]
+        active = active[~final]
+        # the children are checked in order until one of them matches.
+        # Failing the last one continues with the node after the parent
+        candidate = FIRST_CHILD[node[active]]
+        matched = np.zeros(active.size, dtype=bool)
+        pending = np.arange(active.size)
+        while pending.size:
+            found = matches(candidate[pending], active[pending], values,
+                            missings)
+            matched[pending[found]] = True
+            failed = pending[~found]
+            candidate[failed] = NEXT[candidate[failed]]
+            pending = failed[candidate[failed] >= 0]
+        node[active[matched]] = candidate[matched]
+        active = active[matched]
+    return {"prediction": prediction, "%(metric)s": confidence}
+"""
+
+
+class NumpyModel(Model):
+
+    def plug_in(self, out=sys.stdout, hadoop=False,
+                filter_id=None, subtree=True):
+        """Generates a python module that uses numpy to make predictions
+           for arrays of rows
+
+        `out` is file descriptor to write the python code.
+
+        """
+        table = t.node_table(self.tree, ids_path=self.get_ids_path(filter_id),
+                             subtree=subtree)
+        if any(row[t.MATCHER] is not None for row in table):
+            sys.exit("The numpy output is not available for models"
+                     " that use text or items fields.")
+        field_ids = [field_id for field_id, _ in
+                     sort_fields(self.tree.fields)
+                     if field_id != self.tree.objective_id]
+        positions = dict([(field_id, position) for position, field_id in
+                          enumerate(field_ids)])
+        regression = self.tree.regression
+
+        def column(index):
+            """List of the values in a column of the table
+
+            """
+            return [row[index] for row in table]
+
+        output = MODULE_TEMPLATE % {
+            "docstring": self.docstring(),
+            "or_missing": t.OR_MISSING,
+            "fields": repr([self.tree.fields[field_id]['name'] for
+                            field_id in field_ids]),
+            "numeric": repr([self.tree.fields[field_id]['optype'] ==
+                             'numeric' for field_id in field_ids]),
+            "field": repr([positions.get(field_id, t.NO_NODE) for
+                           field_id in column(t.FIELD)]),
+            "operator": repr(column(t.OPERATOR)),
+            "value": repr(column(t.VALUE)),
+            "missing": repr(column(t.MISSING)),
+            "first_child": repr(column(t.FIRST_CHILD)),
+            "next": repr(column(t.NEXT)),
+            "missing_check": repr([positions.get(field_id, t.NO_NODE) for
+                                   field_id in column(t.MISSING_CHECK)]),
+            "output": repr(column(t.OUTPUT)),
+            "output_type": "float" if regression else "object",
+            "no_output": "np.nan" if regression else "None",
+            "confidence": repr(column(t.CONFIDENCE)),
+            "metric": "error" if regression else "confidence"}
+        if not PY3:
+            output = output.encode("utf8")
+        out.write(output)
+        out.flush()
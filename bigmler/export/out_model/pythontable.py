@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Lookup table output for Python
+
+This module defines functions that generate Python code to make local
+predictions by traversing a table of nodes in a loop
+"""
+
+import sys
+import keyword
+
+from bigml.tree_utils import slugify, sort_fields, INDENT, MAX_ARGS_LENGTH
+from bigml.model import Model
+from bigml.util import PY3
+
+import bigmler.export.out_tree.nodetable as t
+
+
+NODES_TEMPLATE = u"""# -*- coding: utf-8 -*-
+import operator
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne}
+
+NODES_%s = [
+%s]
+"""
+
+# the loop follows the same steps as the nested "if" code: returns the node
+# output when the split field is missing and checks the children in order
+LOOP_TEMPLATE = u"""
+    nodes = NODES_%(objective)s
+    node = nodes[0]
+    while True:
+        if node[%(first_child)s] < 0 or (
+                node[%(missing_check)s] is not None and
+                data.get(node[%(missing_check)s]) is None):
+            return {"prediction": node[%(output)s],
+                    "%(metric)s": node[%(confidence)s]}
+        index = node[%(first_child)s]
+        while index >= 0:
+            child = nodes[index]
+            value = data.get(child[%(field)s])
+            if value is None:
+                if child[%(missing)s] == %(or_missing)s or \\
+                        (child[%(value)s] is None and
+                         child[%(operator)s] == "=="):
+                    break
+            elif child[%(value)s] is not None:
+                if OPERATORS[child[%(operator)s]](value, child[%(value)s]):
+                    break
+            elif child[%(operator)s] == "!=":
+                break
+            index = child[%(next)s]
+        if index < 0:
+            return None
+        node = child
+"""
+
+
+class PythonTableModel(Model):
+
+    def plug_in(self, out=sys.stdout, hadoop=False,
+                filter_id=None, subtree=True):
+        """Generates a python implementation of local predictions that
+           traverses the tree stored as a table of nodes
+
+        `out` is file descriptor to write the python code.
+
+        """
+        table = t.node_table(self.tree, ids_path=self.get_ids_path(filter_id),
+                             subtree=subtree)
+        if any(row[t.MATCHER] is not None for row in table):
+            sys.exit("The lookup table output is not available for models"
+                     " that use text or items fields in Python.")
+        parameters = sort_fields(self.tree.fields)
+        input_map = len(parameters) > MAX_ARGS_LENGTH
+        reserved_keywords = keyword.kwlist if not input_map else None
+        prefix = "_" if not input_map else ""
+        args = []
+        for field_id, _ in parameters:
+            field = self.tree.fields[field_id]
+            field['slug'] = slugify(field['name'],
+                                    reserved_keywords=reserved_keywords,
+                                    prefix=prefix)
+            if not input_map and field_id != self.tree.objective_id:
+                args.append(field['slug'])
+        objective = self.tree.fields[self.tree.objective_id]['slug']
+
+        rows = []
+        for row in table:
+            row = row[:]
+            for column in [t.FIELD, t.MISSING_CHECK]:
+                if row[column] is not None:
+                    row[column] = self.tree.fields[row[column]]['slug']
+            rows.append(u"%s[%s]" % (INDENT, u", ".join( \
+                [repr(value) for value in row])))
+        output = NODES_TEMPLATE % (objective, u",\n".join(rows))
+
+        predictor_definition = u"\n\ndef predict_%s" % objective
+        depth = len(predictor_definition) - 1
+        if input_map:
+            output += u"%s(data={}):\n" % predictor_definition
+        else:
+            output += u"%s(%s):\n" % (
+                predictor_definition,
+                (u",\n" + u" " * depth).join( \
+                    [u"%s=None" % arg for arg in args]))
+        output += (INDENT + u"\"\"\" " + self.docstring() +
+                   u"\n" + INDENT + u"\"\"\"\n")
+        if not input_map:
+            output += u"%sdata = {%s}\n" % (
+                INDENT, (u",\n" + INDENT * 2).join( \
+                    [u"%r: %s" % (arg, arg) for arg in args]))
+        output += LOOP_TEMPLATE % {
+            "objective": objective,
+            "metric": "error" if self.tree.regression else "confidence",
+            "field": t.FIELD,
+            "operator": t.OPERATOR,
+            "value": t.VALUE,
+            "missing": t.MISSING,
+            "first_child": t.FIRST_CHILD,
+            "next": t.NEXT,
+            "missing_check": t.MISSING_CHECK,
+            "output": t.OUTPUT,
+            "confidence": t.CONFIDENCE,
+            "or_missing": t.OR_MISSING}
+        if not PY3:
+            output = output.encode("utf8")
+        out.write(output)
+        out.flush()
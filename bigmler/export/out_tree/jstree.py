@@ -75,7 +75,7 @@ class JsTree(Tree):
 
     def split_condition_code(self, field, depth, prefix,
                              pre_condition, term_analysis_fields,
-                             item_analysis_fields):
+                             item_analysis_fields, cmv):
         """Condition code for the split
 
         """
@@ -120,36 +120,61 @@ class JsTree(Tree):
         to evaluate a predicate the output at that node is returned without
         further evaluation.
 
+        The tree is traversed with an explicit stack and the code is
+        appended to a list of strings, so that deep trees need neither
+        recursion nor repeated string concatenation.
+
         """
         metric = "error" if self.regression else "confidence"
         if cmv is None:
             cmv = []
-        body = u""
+        body = []
         term_analysis_fields = []
         item_analysis_fields = []
         prefix = u""
-        field_obj = self.fields[self.objective_id]
 
         if len(self.fields) > MAX_ARGS_LENGTH:
             prefix = u"data."
-        children = filter_nodes(self.children, ids=ids_path,
-                                subtree=subtree)
-
-        if children:
+        # the stack contains the nodes to translate and the code to be
+        # added when the previous nodes are finished, with the term and
+        # item analysis fields it uses
+        stack = [(self, depth, cmv)]
+        while stack:
+            item = stack.pop()
+            if len(item) == 3 and isinstance(item[0], basestring):
+                code, terms, items = item
+                body.append(code)
+                term_analysis_fields.extend(terms)
+                item_analysis_fields.extend(items)
+                continue
+            node, depth, cmv = item
+            children = filter_nodes(node.children, ids=ids_path,
+                                    subtree=subtree)
+            if not children:
+                value = value_to_print( \
+                    node.output, node.fields[node.objective_id]['optype'])
+                body.append(u"%sreturn {prediction: %s, %s: %s};\n" % ( \
+                    INDENT * depth,
+                    value,
+                    metric,
+                    node.confidence))
+                continue
 
             # field used in the split
             field = split(children)
 
-            has_missing_branch = missing_branch(children)
+            has_missing_branch = (missing_branch(children) or
+                                  none_value(children))
             # the missing is singled out as a special case only when there's
             # no missing branch in the children list
             one_branch = not has_missing_branch or \
-                self.fields[field]['optype'] in COMPOSED_FIELDS
+                node.fields[field]['optype'] in COMPOSED_FIELDS
             if (one_branch and
-                    not self.fields[field]['camelCase'] in cmv):
-                body += self.missing_check_code(field, depth, prefix, cmv,
-                                                metric)
+                    not node.fields[field]['camelCase'] in cmv):
+                body.append(node.missing_check_code(field, depth, prefix, cmv,
+                                                    metric))
 
+            children_items = []
             for child in children:
 
                 field = child.predicate.field
@@ -157,29 +182,21 @@ class JsTree(Tree):
                 pre_condition = u""
                 # code when missing_splits has been used
                 if has_missing_branch and child.predicate.value is not None:
-                    pre_condition = self.missing_prefix_code(child, field,
-                                                             prefix, cmv)
+                    pre_condition = child.missing_prefix_code(field,
+                                                              prefix, cmv)
 
                 # complete split condition code
-                body += child.split_condition_code( \
-                    field, depth, prefix, pre_condition,
-                    term_analysis_fields, item_analysis_fields)
+                terms = []
+                items = []
+                condition = child.split_condition_code( \
+                    field, depth, prefix, pre_condition, terms, items, cmv)
 
                 # value to be determined in next node
-                next_level = child.plug_in_body(depth + 1, cmv=cmv[:],
-                                                ids_path=ids_path,
-                                                subtree=subtree)
-                body += next_level[0]
-                body += u"%s}\n" % (INDENT * depth)
-                term_analysis_fields.extend(next_level[1])
-                item_analysis_fields.extend(next_level[2])
-
-        else:
-            value = value_to_print(self.output,
-                                   self.fields[self.objective_id]['optype'])
-            body = u"%sreturn {prediction: %s, %s: %s};\n" % ( \
-                INDENT * depth,
-                value,
-                metric,
-                self.confidence)
-        return body, term_analysis_fields, item_analysis_fields
+                children_items.append(((condition, terms, items),
+                                       (child, depth + 1, cmv[:])))
+            for condition, child_item in reversed(children_items):
+                stack.append((u"%s}\n" % (INDENT * depth), [], []))
+                stack.append(child_item)
+                stack.append(condition)
+
+        return u"".join(body), term_analysis_fields, item_analysis_fields
@@ -35,6 +35,9 @@ T_MISSING_OPERATOR = {
 # Map operator str to its corresponding mysql operator
 MYSQL_OPERATOR = {
     "/=": "!="}
+# pairs of operators whose conditions are complementary for the same value
+COMPLEMENTARY = [set(["<", ">="]), set(["<=", ">"]), set(["=", "!="]),
+                 set(["=", "/="])]
 
 def value_to_print(value, optype):
     """String of code that represents a value according to its type
@@ -79,9 +82,9 @@ class MySQLTree(Tree):
 
         """
 
-        negation = u"" if child.predicate.missing else u"NOT "
-        connection = u"OR" if child.predicate.missing else u"AND"
-        if not child.predicate.missing:
+        negation = u"" if self.predicate.missing else u"NOT "
+        connection = u"OR" if self.predicate.missing else u"AND"
+        if not self.predicate.missing:
             cmv.append(self.fields[field]['name'])
         return u"(%sISNULL(`%s`) %s " % ( \
             negation, self.fields[field]['name'],
@@ -123,21 +126,40 @@ class MySQLTree(Tree):
         it's set to None, the prediction is returned. When set to the
         name of an attribute (e.g. 'confidence') this attribute is returned
 
+        The tree is traversed with an explicit stack and the code is
+        appended to a list of strings, so that deep trees need neither
+        recursion nor repeated string concatenation.
+
         """
 
         if cmv is None:
             cmv = []
+        body = [body] if body else []
+        # the stack contains the nodes to translate and the code to be
+        # added when the previous nodes are finished
+        stack = [(self, depth, cmv)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, basestring):
+                body.append(item)
+                continue
+            node, depth, cmv = item
+            if body:
+                alternate = u",\n%sIF (" % (depth * INDENT)
+            else:
+                alternate = u"IF ("
+            post_missing_body = u""
 
-        if body:
-            alternate = u",\n%sIF (" % (depth * INDENT)
-        else:
-            alternate = u"IF ("
-        post_missing_body = u""
-
-
-        children = filter_nodes(self.children, ids=ids_path,
-                                subtree=subtree)
-        if children:
+            children = filter_nodes(node.children, ids=ids_path,
+                                    subtree=subtree)
+            if not children:
+                if attr is None:
+                    value = value_to_print( \
+                        node.output, node.fields[node.objective_id]['optype'])
+                else:
+                    value = getattr(node, attr)
+                body.append(u", %s" % (value))
+                continue
 
             # field used in the split
             field = split(children)
@@ -147,35 +169,112 @@ class MySQLTree(Tree):
             # the missing is singled out as a special case only when there's
             # no missing branch in the children list
             if (not has_missing_branch and
-                    not self.fields[field]['name'] in cmv):
-                body += self.missing_check_code(field, alternate, cmv, attr)
+                    not node.fields[field]['name'] in cmv):
+                body.append(node.missing_check_code(field, alternate, cmv,
+                                                    attr))
                 depth += 1
                 alternate = u",\n%sIF (" % (depth * INDENT)
                 post_missing_body += u")"
 
+            children_items = []
             for child in children:
                 pre_condition = u""
                 # code when missing splits has been used
                 if has_missing_branch and child.predicate.value is not None:
-                    pre_condition = self.missing_prefix_code(child, field, cmv)
+                    pre_condition = child.missing_prefix_code(field, cmv)
 
                 # complete split condition code
-                body += child.split_condition_code( \
+                condition = child.split_condition_code( \
                     field, alternate, pre_condition)
 
                 depth += 1
                 alternate = u",\n%sIF (" % (depth * INDENT)
-                body = child.plug_in_body(depth, cmv=cmv[:],
-                                          ids_path=ids_path, subtree=subtree,
-                                          body=body, attr=attr)
-            body += u", NULL))" + post_missing_body
-            post_missing_body = u""
-        else:
-            if attr is None:
-                value = value_to_print( \
-                    self.output, self.fields[self.objective_id]['optype'])
-            else:
-                value = getattr(self, attr)
-            body += u", %s" % (value)
+                children_items.append((condition, (child, depth, cmv[:])))
+            stack.append(u", NULL))" + post_missing_body)
+            for condition, child_item in reversed(children_items):
+                stack.append(child_item)
+                stack.append(condition)
 
-        return body
+        return u"".join(body)
+
+    def rules(self, ids_path=None, subtree=True):
+        """Returns the rules that lead to every node where the prediction
+           can end, as a list of (conditions, node) pairs.
+
+        The rules are mutually exclusive and reproduce the nested "IF"
+        code: a child is chosen when its condition is true and the
+        conditions of the previous children are not. Conditions are
+        strings, or (field, operator, value) tuples for the numeric
+        comparisons that can be merged into ranges.
+
+        """
+        rules = []
+        stack = [(self, [], [])]
+        while stack:
+            node, conditions, cmv = stack.pop()
+            children = filter_nodes(node.children, ids=ids_path,
+                                    subtree=subtree)
+            if not children:
+                rules.append((conditions, node))
+                continue
+            field = split(children)
+            name = node.fields[field]['name']
+            has_missing_branch = (missing_branch(children) or
+                                  none_value(children))
+            if not has_missing_branch and not name in cmv:
+                rules.append((conditions + [u"ISNULL(`%s`)" % name], node))
+                conditions = conditions + [u"NOT ISNULL(`%s`)" % name]
+                cmv.append(name)
+            previous = []
+            children_items = []
+            for child in children:
+                predicate = child.predicate
+                operator = MYSQL_OPERATOR.get(predicate.operator,
+                                              predicate.operator)
+                if predicate.value is None:
+                    condition = u"%s`%s`)" % ( \
+                        T_MISSING_OPERATOR[predicate.operator], name)
+                elif has_missing_branch:
+                    # the missing prefix is closed here
+                    condition = u"%s`%s`%s%s)" % ( \
+                        child.missing_prefix_code(field, cmv), name,
+                        operator, value_to_print( \
+                            predicate.value,
+                            node.fields[field]['optype']))
+                elif node.fields[field]['optype'] == 'numeric':
+                    condition = (name, operator, predicate.value)
+                else:
+                    condition = u"`%s`%s%s" % ( \
+                        name, operator, value_to_print( \
+                            predicate.value, node.fields[field]['optype']))
+                # the previous condition need not be excluded when it is
+                # the complementary of this one and the value is not missing
+                complementary = (
+                    len(previous) == 1 and name in cmv and
+                    not has_missing_branch and
+                    previous[0][1] is not None and
+                    predicate.value == previous[0][1] and
+                    set([previous[0][0], predicate.operator]) in
+                    COMPLEMENTARY)
+                child_conditions = conditions[:]
+                if not complementary:
+                    child_conditions.extend( \
+                        [u"NOT IFNULL(%s, FALSE)" % condition_code( \
+                            previous_condition)
+                         for _, _, previous_condition in previous])
+                child_conditions.append(condition)
+                previous.append((predicate.operator, predicate.value,
+                                 condition))
+                children_items.append((child, child_conditions, cmv[:]))
+            stack.extend(reversed(children_items))
+        return rules
+
+
+
+def condition_code(condition):
+    """SQL code for a condition
+
+    """
+    if isinstance(condition, tuple):
+        return u"`%s`%s%s" % condition
+    return u"(%s)" % condition
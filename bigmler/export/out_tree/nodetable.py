@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Tree as a flat table of nodes
+
+This module flattens the tree into a list of nodes that the generated code
+can traverse in a loop instead of nesting "if" statements. Each node
+stores the predicate that leads to it, the index of its first child and
+the index of the node to be checked when its predicate is not satisfied:
+its next sibling or, for the last one, the node to be checked after its
+parent. The evaluation follows the same steps as the nested "if" code.
+"""
+
+from bigml.tree_utils import (filter_nodes, missing_branch, none_value,
+                              PYTHON_OPERATOR, COMPOSED_FIELDS)
+from bigml.util import split
+
+# positions of the node attributes in each row of the table
+FIELD = 0
+OPERATOR = 1
+VALUE = 2
+MISSING = 3
+TERM = 4
+MATCHER = 5
+FIRST_CHILD = 6
+NEXT = 7
+MISSING_CHECK = 8
+OUTPUT = 9
+CONFIDENCE = 10
+COLUMNS = ["field", "operator", "value", "missing", "term", "matcher",
+           "first_child", "next", "missing_check", "output", "confidence"]
+# values of the missing column: how the predicate handles missing values
+# when missing splits are used
+NO_MISSING = 0
+OR_MISSING = 1
+AND_NOT_MISSING = 2
+# value of the index columns when there's no such node
+NO_NODE = -1
+
+
+def node_row(node):
+    """Row of the table for the node. The index columns are set when its
+       children and siblings are known.
+
+    """
+    row = [None, None, None, NO_MISSING, None, None, NO_NODE, NO_NODE, None,
+           node.output, node.confidence]
+    if node.predicate is not True:
+        field = node.fields[node.predicate.field]
+        row[FIELD] = node.predicate.field
+        row[OPERATOR] = PYTHON_OPERATOR[node.predicate.operator]
+        row[VALUE] = node.predicate.value
+        if field['optype'] in COMPOSED_FIELDS:
+            row[TERM] = node.predicate.term
+            row[MATCHER] = field['optype']
+    return row
+
+
+def node_table(tree, ids_path=None, subtree=True):
+    """Returns the list of rows that describe the nodes of the tree. The
+       root is the first one. Fields are referred to by their ids.
+
+    """
+    table = [node_row(tree)]
+    # nodes whose children have to be added, with their row index and the
+    # fields already checked for missing values in their path
+    stack = [(tree, 0, [])]
+    while stack:
+        node, index, cmv = stack.pop()
+        children = filter_nodes(node.children, ids=ids_path,
+                                subtree=subtree)
+        if not children:
+            continue
+        field = split(children)
+        has_missing_branch = (missing_branch(children) or
+                              none_value(children))
+        # the missing is singled out as a special case only when there's
+        # no missing branch in the children list
+        one_branch = not has_missing_branch or \
+            node.fields[field]['optype'] in COMPOSED_FIELDS
+        if one_branch and not field in cmv:
+            table[index][MISSING_CHECK] = field
+            cmv.append(field)
+        first_child = len(table)
+        table[index][FIRST_CHILD] = first_child
+        for position, child in enumerate(children):
+            row = node_row(child)
+            if has_missing_branch and child.predicate.value is not None:
+                if child.predicate.missing:
+                    row[MISSING] = OR_MISSING
+                else:
+                    row[MISSING] = AND_NOT_MISSING
+                    cmv.append(child.predicate.field)
+            if child.predicate.value is None:
+                cmv.append(child.predicate.field)
+            # when the predicate fails, the next sibling is checked and
+            # after the last one, the node checked after the parent
+            if position < len(children) - 1:
+                row[NEXT] = first_child + position + 1
+            else:
+                row[NEXT] = table[index][NEXT]
+            table.append(row)
+            stack.append((child, first_child + position, cmv[:]))
+    return table
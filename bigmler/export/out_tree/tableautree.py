@@ -106,21 +106,39 @@ class TableauTree(Tree):
         `depth` controls the size of indentation. As soon as a value is missing
         that node is returned without further evaluation.
 
+        The tree is traversed with an explicit stack and the code is
+        appended to a list of strings, so that deep trees need neither
+        recursion nor repeated string concatenation.
+
         """
 
         if cmv is None:
             cmv = []
-
-        if body:
-             alternate = u"ELSEIF"
-        else:
-            if conditions is None:
-                conditions = []
-            alternate = u"IF"
-
-        children = filter_nodes(self.children, ids=ids_path,
-                                subtree=subtree)
-        if children:
+        if conditions is None:
+            conditions = []
+        body = [body] if body else []
+        # the stack contains the nodes to translate with the conditions
+        # that lead to them
+        stack = [(self, conditions, cmv)]
+        while stack:
+            node, conditions, cmv = stack.pop()
+            if body:
+                alternate = u"ELSEIF"
+            else:
+                alternate = u"IF"
+
+            children = filter_nodes(node.children, ids=ids_path,
+                                    subtree=subtree)
+            if not children:
+                if attr is None:
+                    value = value_to_print( \
+                        node.output, node.fields[node.objective_id]['optype'])
+                else:
+                    value = getattr(node, attr)
+                body.append(u"%s %s THEN" % (alternate,
+                                             " AND ".join(conditions)))
+                body.append(u" %s\n" % value)
+                continue
 
             field = split(children)
             has_missing_branch = (missing_branch(children) or
@@ -128,34 +146,24 @@ class TableauTree(Tree):
             # the missing is singled out as a special case only when there's
             # no missing branch in the children list
             one_branch = not has_missing_branch or \
-                self.fields[field]['optype'] in COMPOSED_FIELDS
+                node.fields[field]['optype'] in COMPOSED_FIELDS
             if (one_branch and
-                    not self.fields[field]['name'] in cmv):
-                body += self.missing_check_code(field, alternate, cmv,
-                                                conditions, attr=attr)
-                alternate = u"ELSEIF"
+                    not node.fields[field]['name'] in cmv):
+                body.append(node.missing_check_code(field, alternate, cmv,
+                                                    conditions, attr=attr))
 
+            children_items = []
             for child in children:
                 pre_condition = u""
                 post_condition = u""
                 if has_missing_branch and child.predicate.value is not None:
-                    pre_condition = self.missing_prefix_code(child, field, cmv)
+                    pre_condition = child.missing_prefix_code(field, cmv)
                     post_condition = u")"
 
-                child.split_condition_code(field, conditions,
+                child_conditions = conditions[:]
+                child.split_condition_code(field, child_conditions,
                                            pre_condition, post_condition)
+                children_items.append((child, child_conditions, cmv[:]))
+            stack.extend(reversed(children_items))
 
-                body = child.plug_in_body(body, conditions[:], cmv=cmv[:],
-                                          ids_path=ids_path, subtree=subtree,
-                                          attr=attr)
-                del conditions[-1]
-        else:
-            if attr is None:
-                value = value_to_print( \
-                    self.output, self.fields[self.objective_id]['optype'])
-            else:
-                value = getattr(self, attr)
-            body += u"%s %s THEN" % (alternate, " AND ".join(conditions))
-            body += u" %s\n" % value
-
-        return body
+        return u"".join(body)
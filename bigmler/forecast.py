@@ -20,11 +20,12 @@ from __future__ import absolute_import
 
 
 import sys
+import json
 
 import bigml.api
 
-from bigml.timeseries import TimeSeries
-from bigml.io import UnicodeWriter
+from bigml.timeseries import TimeSeries, DEFAULT_SUBMODEL, filter_submodels
+from bigml.timeseries import compute_forecasts as python_forecasts
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
@@ -32,15 +33,128 @@ import bigmler.checkpoint as c
 from bigmler.resources import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resources import create_forecast
 from bigmler.prediction import use_prediction_headers
+from bigmler.columnar import (output_writer, format_extension,
+                              CSV_FORMAT)
 
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
 
-def write_forecasts(forecast, output):
+
+BATCH_HEADERS = ["time_series", "input", "field", "model", "step",
+                 "point_forecast"]
+
+
+def season_contributions(s_list, horizon):
+    """Array of the seasonal contributions for each step in the horizon
+
+    """
+    if not isinstance(s_list, list):
+        return numpy.zeros(horizon)
+    period = len(s_list)
+    steps = numpy.arange(horizon)
+    return numpy.array(s_list, dtype=float)[
+        numpy.abs(1 - period + steps % period)]
+
+
+def ets_forecast(submodel, horizon):
+    """Computes the points of an ETS submodel for all the steps in the
+       horizon at once. The formulae are those in bigml.tssubmodels.
+
+    """
+    name = submodel["name"]
+    steps = numpy.arange(1, horizon + 1, dtype=float)
+    if "," not in name:
+        if name == "drift":
+            return submodel["value"] + submodel["slope"] * steps
+        values = numpy.array(submodel["value"], dtype=float)
+        return values[numpy.arange(horizon) % len(values)]
+    _, trend, seasonality = name.split(",")
+    final_state = submodel.get("final_state", {})
+    level = final_state.get("l", 0)
+    slope = final_state.get("b", 0)
+    if trend.endswith("d"):
+        # damped trends use phi_h = phi + phi^2 + ... + phi^(h + 1)
+        phi = submodel.get("phi", 0)
+        steps = numpy.cumsum(numpy.power(float(phi), steps))
+    if trend.startswith("A"):
+        points = level + steps * slope
+    elif trend.startswith("M"):
+        points = level * numpy.power(float(slope), steps)
+    else:
+        points = numpy.repeat(float(level), horizon)
+    seasons = season_contributions(final_state.get("s", 0), horizon)
+    if seasonality == "A":
+        points = points + seasons
+    elif seasonality == "M":
+        points = points * seasons
+    return points
+
+
+def compute_forecasts(submodels, horizon):
+    """Computes the forecasts for each of the models in the submodels
+    array, as bigml.timeseries.compute_forecasts does.
+
+    """
+    if not NUMPY:
+        return python_forecasts(submodels, horizon)
+    return [{"model": submodel["name"],
+             "point_forecast": ets_forecast(submodel, horizon).tolist()}
+            for submodel in submodels]
+
+
+def local_forecast(local_time_series, input_data=None):
+    """Computes the forecast of a local TimeSeries for the input data,
+       keyed by field id
+
+    """
+    if not input_data:
+        return local_time_series.forecast()
+    input_data = local_time_series.filter_objectives(input_data,
+                                                     by_name=False)
+    forecasts = {}
+    for field_id, field_input in input_data.items():
+        filter_info = field_input.get("ets_models", {}) or DEFAULT_SUBMODEL
+        submodels = filter_submodels(local_time_series.ets_models[field_id],
+                                     filter_info)
+        forecasts[field_id] = compute_forecasts(submodels,
+                                                field_input["horizon"])
+    return forecasts
+
+
+def read_forecast_inputs(path):
+    """Reads the forecast inputs in a file. The file can contain a single
+       JSON object or one JSON object per line (JSON lines).
+
+    """
+    try:
+        with open(path) as inputs_file:
+            content = inputs_file.read()
+    except IOError:
+        sys.exit("Error: cannot read the forecast inputs file %s" % path)
+    try:
+        return [json.loads(content)]
+    except ValueError:
+        pass
+    try:
+        return [json.loads(line) for line in content.splitlines()
+                if line.strip()]
+    except ValueError:
+        sys.exit("Failed to parse the forecast inputs in %s. The file"
+                 " should contain a JSON object or one JSON object per"
+                 " line." % path)
+
+
+def write_forecasts(forecast, output, args=None):
     """Writes the final forecast to the required output
 
     The function creates a new file per field used in the forecast input data.
     The id of the field will be appended to the name provided in the `output`
-    parameter.
+    parameter, followed by the extension of the --predictions-format.
     """
+    file_format = getattr(args, "predictions_format", CSV_FORMAT)
 
     for objective_id, forecast_value in forecast.items():
         headers = [f["model"] for f in forecast_value]
@@ -49,33 +163,79 @@ def write_forecasts(forecast, output):
             sys.exit("No forecasts available")
         for index in range(len(forecast_value[0]["point_forecast"])):
             points.append([f["point_forecast"][index] for f in forecast_value])
-        output_file = "%s_%s.csv" % (output, objective_id)
-        with UnicodeWriter(output_file, lineterminator="\n") as out_handler:
+        output_file = "%s_%s%s" % (output, objective_id,
+                                   format_extension(file_format))
+        with output_writer(output_file, args, headers=True,
+                           lineterminator="\n") as out_handler:
             out_handler.writerow(headers)
             for row in points:
                 out_handler.writerow(row)
 
 
-def forecast(time_series, args, session_file=None):
-    """Computes a time-series forecast
+def write_batch_forecasts(time_series_id, input_index, forecast,
+                          out_handler):
+    """Writes the forecast for one time series and input as rows of the
+       batch forecasts file, one per model and step
 
     """
+    for objective_id in sorted(forecast.keys()):
+        for model_forecast in forecast[objective_id]:
+            for step, point in enumerate(model_forecast["point_forecast"]):
+                out_handler.writerow([time_series_id, input_index,
+                                      objective_id, model_forecast["model"],
+                                      step + 1, point])
 
-    local_time_series = TimeSeries(time_series,
-                                   api=args.retrieve_api_)
 
+def forecast(time_series_set, args, session_file=None):
+    """Computes the time-series forecasts for every time series in the
+       set and every input in the --test file.
+
+       A single time series and input produce one file per objective field,
+       as written by `write_forecasts`. Otherwise, all the forecasts are
+       stored in a single file with one row per time series, input, field,
+       model and step.
+    """
+    if not isinstance(time_series_set, list):
+        time_series_set = [time_series_set]
     output = args.predictions
     # Local forecasts: Forecasts are computed locally
     message = u.dated("Creating local forecasts.\n")
     u.log_message(message, log_file=session_file, console=args.verbosity)
-    input_data = []
+    inputs = [None]
     if args.test_set is not None:
-        input_data = [u.read_json(args.test_set)]
-    elif args.horizon is not None:
-        input_data = [{local_time_series.objective_id: { \
-            "horizon": args.horizon}}]
-    write_forecasts(local_time_series.forecast(*input_data, by_name=False),
-                    output)
+        inputs = read_forecast_inputs(args.test_set)
+
+    def series_inputs(local_time_series):
+        """Inputs for the given time series
+
+        """
+        if args.test_set is None and args.horizon is not None:
+            return [{local_time_series.objective_id: {
+                "horizon": args.horizon}}]
+        return inputs
+
+    if len(time_series_set) == 1 and len(inputs) == 1:
+        local_time_series = TimeSeries(time_series_set[0],
+                                       api=args.retrieve_api_)
+        write_forecasts(local_forecast(local_time_series,
+                                       series_inputs(local_time_series)[0]),
+                        output, args)
+        return
+
+    file_format = getattr(args, "predictions_format", CSV_FORMAT)
+    output_file = "%s%s" % (output, format_extension(file_format))
+    with output_writer(output_file, args, headers=True,
+                       lineterminator="\n") as out_handler:
+        out_handler.writerow(BATCH_HEADERS)
+        for time_series in time_series_set:
+            local_time_series = TimeSeries(time_series,
+                                           api=args.retrieve_api_)
+            for index, input_data in enumerate(
+                    series_inputs(local_time_series)):
+                write_batch_forecasts(
+                    local_time_series.resource_id, index,
+                    local_forecast(local_time_series, input_data),
+                    out_handler)
 
 
 def remote_forecast(time_series,
@@ -108,4 +268,5 @@ def remote_forecast(time_series,
             time_series_id, input_data, forecast_args,
             args, api, session_file=session_file, path=path, log=log)
 
-        write_forecasts(forecast["object"]["forecast"]["result"], output)
+        write_forecasts(forecast["object"]["forecast"]["result"], output,
+                        args)
@@ -20,11 +20,19 @@ from __future__ import absolute_import
 
 
 import sys
+import math
 
 import bigml.api
 
-from bigml.logistic import LogisticRegression
-from bigml.io import UnicodeWriter
+from bigml.logistic import LogisticRegression, balance_input
+from bigml.util import cast, PRECISION
+from bigml.logistic import OPTIONAL_FIELDS
+
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
@@ -32,7 +40,14 @@ import bigmler.checkpoint as c
 from bigmler.tst_reader import TstReader as TestReader
 from bigmler.resources import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resources import create_batch_prediction
-from bigmler.prediction import use_prediction_headers
+from bigmler.prediction import use_prediction_headers, PredictionWriter
+from bigmler.columnar import output_writer, format_file_name
+
+# number of test rows scored at once in batch mode
+BATCH_SIZE = 1000
+NUMERIC_MISSING = "numeric"
+TERMS_MISSING = "terms"
+CATEGORY_MISSING = "category"
 
 
 def write_prediction(prediction, output=sys.stdout,
@@ -69,6 +84,228 @@ def write_prediction(prediction, output=sys.stdout,
             raise AttributeError("You should provide a writeable object")
 
 
+class BatchLogisticRegression(object):
+    """Batch scorer for local logistic regressions
+
+       The coefficients of the logistic regression are laid out once as a
+       weights matrix with a row per expanded feature (numeric value or
+       missing indicator, category, term or item and bias) and a column per
+       objective class. Each input row is encoded as a sparse list of
+       (feature, value) pairs and the class scores for a chunk of rows are
+       computed with a single matrix product. The probabilities are then
+       computed as in the LogisticRegression.predict method.
+
+    """
+    def __init__(self, local_logistic):
+        """Builds the weights matrix from a LogisticRegression object
+
+        """
+        self.local_logistic = local_logistic
+        # classes are kept in the coefficients order, as the
+        # normalization in predict adds them in this order too
+        self.classes = list(local_logistic.coefficients.keys())
+        objective_categories = local_logistic.categories[
+            local_logistic.objective_id]
+        self.orders = []
+        for category in self.classes:
+            try:
+                order = objective_categories.index(category)
+            except ValueError:
+                order = len(objective_categories)
+            self.orders.append(order)
+        self.weights = []
+        self.value_columns = {}
+        self.term_columns = {}
+        self.missing_columns = []
+        for field_id in local_logistic.input_fields:
+            self._add_field(field_id)
+        self.bias_column = self._add_column(
+            [local_logistic.coefficients[category][-1][0]
+             for category in self.classes])
+        self.weights_array = (numpy.array(self.weights) if NUMPY else None)
+
+    def _add_column(self, weights):
+        """Adds a feature with the given per-class weights and returns its
+           index
+
+        """
+        self.weights.append(weights)
+        return len(self.weights) - 1
+
+    def _add_field(self, field_id):
+        """Adds the features generated by a field to the weights matrix
+
+        """
+        local = self.local_logistic
+        coefficients = [local.get_coefficients(category, field_id)
+                        for category in self.classes]
+        if local.fields[field_id]['optype'] == 'numeric':
+            self.value_columns[field_id] = self._add_column(
+                [coefficient[0] for coefficient in coefficients])
+            # numeric_fields is only filled when missing_numerics is set
+            if field_id in local.numeric_fields:
+                self.missing_columns.append((field_id, NUMERIC_MISSING,
+                                             self._add_column(
+                                                 [coefficient[1] for
+                                                  coefficient in
+                                                  coefficients])))
+            return
+        if field_id in local.tag_clouds:
+            terms = local.tag_clouds[field_id]
+            kind = TERMS_MISSING
+        elif field_id in local.items:
+            terms = local.items[field_id]
+            kind = TERMS_MISSING
+        elif (field_id in local.categories and
+              field_id != local.objective_id):
+            terms = local.categories[field_id]
+            kind = CATEGORY_MISSING
+        else:
+            return
+        codings = None
+        if kind == CATEGORY_MISSING and field_id in local.field_codings and \
+                local.field_codings[field_id].keys()[0] != "dummy":
+            codings = local.field_codings[field_id].values()[0]
+        columns = {}
+        # the first occurrence of a term sets its coefficient
+        for index in range(len(terms) - 1, -1, -1):
+            columns[terms[index]] = index
+        for term, index in columns.items():
+            if codings is None:
+                weights = [coefficient[index] for coefficient in coefficients]
+            else:
+                # non-dummy codings contribute to all their coefficients
+                weights = [sum(coefficient[coeff_index] * contribution[index]
+                               for coeff_index, contribution
+                               in enumerate(codings))
+                           for coefficient in coefficients]
+            columns[term] = self._add_column(weights)
+        self.term_columns[field_id] = columns
+        if codings is None:
+            weights = [coefficient[len(terms)] for coefficient
+                       in coefficients]
+        else:
+            weights = [sum(coefficient[coeff_index] * contribution[-1]
+                           for coeff_index, contribution
+                           in enumerate(codings))
+                       for coefficient in coefficients]
+        self.missing_columns.append((field_id, kind,
+                                     self._add_column(weights)))
+
+    def encode(self, input_data, by_name=True):
+        """Encodes the input data as a list of (feature, value) pairs and
+           the squared norm used when the logistic regression normalizes
+           its inputs
+
+        """
+        local = self.local_logistic
+        input_data = local.filter_input_data(input_data, by_name=by_name)
+        cast(input_data, local.fields)
+        if not local.missing_numerics:
+            for field_id, field in local.fields.items():
+                if (not field['optype'] in OPTIONAL_FIELDS and
+                        not field_id in input_data):
+                    raise Exception("Failed to predict. Input"
+                                    " data must contain values for all"
+                                    " numeric fields to get a logistic"
+                                    " regression prediction.")
+        if local.balance_fields:
+            balance_input(input_data, local.fields)
+        unique_terms = local.get_unique_terms(input_data)
+        features = [(self.bias_column, 1)]
+        norm2 = 1 if local.bias else 0
+        # only numeric values are left in input_data
+        for field_id, value in input_data.items():
+            features.append((self.value_columns[field_id], value))
+            norm2 += value * value
+        for field_id, terms in unique_terms.items():
+            columns = self.term_columns.get(field_id)
+            if columns is None or field_id not in local.input_fields:
+                continue
+            for term, occurrences in terms:
+                column = columns.get(term)
+                if column is not None:
+                    features.append((column, occurrences))
+                    norm2 += occurrences * occurrences
+        for field_id, kind, column in self.missing_columns:
+            if (kind == NUMERIC_MISSING and field_id not in input_data) or \
+                    (kind == TERMS_MISSING and
+                     not unique_terms.get(field_id)) or \
+                    (kind == CATEGORY_MISSING and
+                     field_id not in unique_terms):
+                features.append((column, 1))
+                norm2 += 1
+        return features, norm2
+
+    def scores(self, encoded_rows):
+        """Computes the class scores for a list of encoded rows
+
+        """
+        if NUMPY:
+            rows = []
+            columns = []
+            values = []
+            for index, (features, _) in enumerate(encoded_rows):
+                for column, value in features:
+                    rows.append(index)
+                    columns.append(column)
+                    values.append(value)
+            scores = numpy.zeros((len(encoded_rows), len(self.classes)))
+            numpy.add.at(scores, numpy.array(rows, dtype=int),
+                         self.weights_array[numpy.array(columns, dtype=int)] *
+                         numpy.array(values, dtype=float)[:, None])
+            return scores.tolist()
+        scores = []
+        for features, _ in encoded_rows:
+            row_scores = [0] * len(self.classes)
+            for column, value in features:
+                weights = self.weights[column]
+                for index in range(0, len(row_scores)):
+                    row_scores[index] += weights[index] * value
+            scores.append(row_scores)
+        return scores
+
+    def predict_batch(self, input_data_list, by_name=True):
+        """Returns the prediction for each input data in the list, in the
+           format of the LogisticRegression.predict method
+
+        """
+        encoded_rows = [self.encode(input_data, by_name=by_name)
+                        for input_data in input_data_list]
+        predictions = []
+        normalize = self.local_logistic.lr_normalize
+        for (_, norm2), row_scores in zip(encoded_rows,
+                                          self.scores(encoded_rows)):
+            probabilities = []
+            for score in row_scores:
+                if normalize:
+                    try:
+                        score /= math.sqrt(norm2)
+                    except ZeroDivisionError:
+                        score = float('NaN')
+                try:
+                    probability = 1 / (1 + math.exp(-score))
+                except OverflowError:
+                    probability = 0 if score < 0 else 1
+                probabilities.append(round(probability, 5))
+            total = 0
+            for probability in probabilities:
+                total += probability
+            distribution = sorted(
+                [(round(probability / total, PRECISION), - order, category)
+                 for probability, order, category
+                 in zip(probabilities, self.orders, self.classes)],
+                reverse=True)
+            predictions.append({
+                "prediction": distribution[0][2],
+                "probability": distribution[0][0],
+                "distribution": [{"category": category,
+                                  "probability": probability}
+                                 for probability, _, category
+                                 in distribution]})
+        return predictions
+
+
 def local_prediction(logistic_regressions, test_reader, output, args,
                      exclude=None):
     """Get local logistic_regression and issue prediction
@@ -77,16 +314,44 @@ def local_prediction(logistic_regressions, test_reader, output, args,
     # Only one logistic_regression at present
     local_logistic = LogisticRegression(logistic_regressions[0],
                                         api=args.retrieve_api_)
-    test_set_header = test_reader.has_headers()
-    kwargs = {"by_name": test_set_header}
+    kwargs = {"by_name": False}
     if args.operating_point_:
         kwargs.update({"operating_point": args.operating_point_})
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        prediction_info = local_logistic.predict(
-            input_data_dict, **kwargs)
-        write_prediction(prediction_info, output,
-                         args.prediction_info, input_data, exclude)
+        for input_data in test_reader:
+            input_data_dict = test_reader.dict(input_data, filtering=False)
+            prediction_info = local_logistic.predict(
+                input_data_dict, **kwargs)
+            write_prediction(prediction_info, output,
+                             args.prediction_info, input_data, exclude)
+        return
+    # with no operating point, rows are scored in chunks
+    batch_logistic = BatchLogisticRegression(local_logistic)
+    with PredictionWriter(output, args.prediction_info,
+                          exclude) as prediction_writer:
+        input_data_list = []
+        for input_data in test_reader:
+            input_data_list.append(input_data)
+            if len(input_data_list) == BATCH_SIZE:
+                write_batch(batch_logistic, input_data_list, test_reader,
+                            prediction_writer)
+                input_data_list = []
+        write_batch(batch_logistic, input_data_list, test_reader,
+                    prediction_writer)
+
+
+def write_batch(batch_model, input_data_list, test_reader,
+                prediction_writer):
+    """Scores a chunk of test rows and writes their predictions
+
+    """
+    if not input_data_list:
+        return
+    predictions = batch_model.predict_batch(
+        [test_reader.dict(input_data, filtering=False)
+         for input_data in input_data_list],
+        by_name=False)
+    for prediction, input_data in zip(predictions, input_data_list):
+        prediction_writer.write(prediction, input_data)
 
 
 def lr_prediction(logistic_regressions, fields, args, session_file=None):
@@ -96,11 +361,12 @@ def lr_prediction(logistic_regressions, fields, args, session_file=None):
     """
     test_set = args.test_set
     test_set_header = args.test_header
-    output = args.predictions
+    output = format_file_name(args.predictions, args)
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, headers=args.prediction_header,
+                       lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args,
@@ -136,8 +402,9 @@ def remote_lr_prediction(logistic_regression, test_dataset,
             logistic_regression_id, test_dataset, batch_prediction_args,
             args, api, session_file=session_file, path=path, log=log)
     if not args.no_csv:
-        file_name = api.download_batch_prediction(batch_prediction,
-                                                  prediction_file)
+        file_name = u.download_to_sink(api.download_batch_prediction,
+                                       batch_prediction, prediction_file,
+                                       sink=args.output_sink)
         if file_name is None:
             sys.exit("Failed downloading CSV.")
     if args.to_dataset:
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""MappedRows class
+
+   Random access to the rows of a CSV file. The file is memory-mapped and
+   an index of the offsets where each line starts is built once, so any
+   range of rows can be parsed without reading the previous ones. Rows are
+   expected to be one per line, as in `file_number_of_lines`.
+
+"""
+from __future__ import absolute_import
+
+import sys
+import csv
+import mmap
+
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
+
+from bigml.util import get_csv_delimiter
+
+from bigmler.utils import PYTHON3
+
+NEW_LINE = b"\n"
+
+
+def line_offsets(mapped_file):
+    """Returns the offsets where each line in the mapped file starts
+
+    """
+    size = len(mapped_file)
+    if NUMPY:
+        new_lines = numpy.flatnonzero(
+            numpy.frombuffer(mapped_file, dtype=numpy.uint8) ==
+            ord(NEW_LINE))
+        offsets = [0] + (new_lines + 1).tolist()
+    else:
+        offsets = [0]
+        position = mapped_file.find(NEW_LINE)
+        while position > -1:
+            offsets.append(position + 1)
+            position = mapped_file.find(NEW_LINE, position + 1)
+    # the end of the file closes the last line if there's no final new line
+    if offsets[-1] != size:
+        offsets.append(size)
+    return offsets
+
+
+class MappedRows(object):
+    """Memory-mapped CSV file that returns ranges of rows
+
+    """
+    def __init__(self, file_name, header=False, separator=None,
+                 offsets=None, encoding="utf-8"):
+        """Maps the file in memory
+
+           `file_name`: path to the CSV file
+           `header`: boolean, True means that the first line is a headers
+                     row and is not counted as a row
+           `separator`: CSV separator character
+           `offsets`: line offsets index, when previously computed by
+                      another MappedRows object for the same file
+           `encoding`: encoding of the file contents
+        """
+        self.file_name = file_name
+        self.header = header
+        self.separator = separator or get_csv_delimiter()
+        self.encoding = encoding
+        try:
+            self.file_handler = open(file_name, "rb")
+        except IOError:
+            sys.exit("Error: cannot read file %s" % file_name)
+        try:
+            self.mapped_file = mmap.mmap(self.file_handler.fileno(), 0,
+                                         access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be mapped
+            self.mapped_file = b""
+        self._offsets = offsets
+
+    @property
+    def offsets(self):
+        """Line offsets index, built the first time it is needed
+
+        """
+        if self._offsets is None:
+            self._offsets = line_offsets(self.mapped_file)
+        return self._offsets
+
+    def number_of_rows(self):
+        """Returns the number of rows in the file
+
+        """
+        rows = len(self.offsets) - 1
+        if self.header:
+            rows -= 1
+        return max(rows, 0)
+
+    def rows(self, start=0, stop=None):
+        """Returns the list of parsed rows from `start` (included) to `stop`
+           (excluded). Only the bytes of the range are read and parsed.
+
+        """
+        number_of_rows = self.number_of_rows()
+        if stop is None or stop > number_of_rows:
+            stop = number_of_rows
+        if start >= stop:
+            return []
+        first_line = 1 if self.header else 0
+        contents = self.mapped_file[self.offsets[first_line + start]:
+                                    self.offsets[first_line + stop]]
+        if PYTHON3:
+            lines = contents.decode(self.encoding).splitlines(True)
+            return list(csv.reader(lines, delimiter=self.separator))
+        separator = self.separator
+        if isinstance(separator, unicode):
+            separator = separator.encode(self.encoding)
+        lines = contents.splitlines(True)
+        return [[value.decode(self.encoding) for value in row] for row in
+                csv.reader(lines, delimiter=separator)]
+
+    def close(self):
+        """Closing the mapped file
+
+        """
+        if not isinstance(self.mapped_file, bytes):
+            self.mapped_file.close()
+        self.file_handler.close()
@@ -145,6 +145,15 @@ def get_anomaly_options(defaults=None):
             'type': int,
             'help': ("Number of selected top anomalies.")},
 
+        # Number of most anomalous test rows kept in local anomaly scores
+        '--top-k-scores': {
+            'action': 'store',
+            'dest': 'top_k_scores',
+            'default': defaults.get('top_k_scores', 0),
+            'type': int,
+            'help': ("Stores only the given number of test rows with the"
+                     " highest local anomaly scores, sorted by score.")},
+
         # Number of trees in the anomaly detector
         '--forest-size': {
             'action': 'store',
@@ -80,6 +80,26 @@ def get_association_options(defaults=None):
             'help': ("The strategy for prioritizing the rules"
                      " in the search.")},
 
+        # Number of consequent items in each local association set
+        '--association-set-k': {
+            'action': 'store',
+            'type': int,
+            'dest': 'association_set_k',
+            'default': defaults.get('association_set_k', 10),
+            'help': ("Number of items in the association sets computed"
+                     " for the test data.")},
+
+        # Rule metric used to score the items in local association sets
+        '--score-by': {
+            'action': 'store',
+            'dest': 'score_by',
+            'choices': ["confidence", "coverage", "leverage",
+                        "lift", "support"],
+            'default': defaults.get('score_by', None),
+            'help': ("Rule metric used to score the items in the"
+                     " association sets. The association search strategy"
+                     " is used by default.")},
+
         # Does not create an association just a dataset.
         '--no-association': {
             'action': 'store_true',
@@ -219,6 +219,23 @@ def get_delete_options(defaults=None):
             'default': defaults.get('dry_run', False),
             'help': "Deletes the ids retrieved to be deleted."},
 
+        # Number of resources to be deleted in parallel.
+        '--max-parallel-deletes': {
+            'action': 'store',
+            'dest': 'max_parallel_deletes',
+            'default': defaults.get('max_parallel_deletes', 1),
+            'type': int,
+            'help': "Max number of resources to delete in parallel."},
+
+        # Maximum number of deletions per second for each resource type.
+        '--deletes-per-second': {
+            'action': 'store',
+            'dest': 'deletes_per_second',
+            'default': defaults.get('deletes_per_second', None),
+            'type': float,
+            'help': ("Max number of deletions per second sent for each"
+                     " resource type.")},
+
         # Delete only executions but not the generated output resources
         '--execution-only': {
             'action': 'store_true',
@@ -235,6 +252,16 @@ def get_delete_options(defaults=None):
             'help': ("Retrieves the ids of the resources logged in the "
                      "directory to add them to the delete list.")},
 
+        # File that stores the scan of the --from-dir directory to be reused
+        # in the next scans.
+        '--scan-index': {
+            'action': 'store',
+            'dest': 'scan_index',
+            'default': defaults.get('scan_index', None),
+            'help': ("Path to a file that stores the scan of the --from-dir"
+                     " directory. Only the directories and files that"
+                     " changed since the last scan are read again.")},
+
         # Use it to retrieve projects that were tagged with tag.
         '--project-tag': {
             'dest': 'project_tag',
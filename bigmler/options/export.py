@@ -44,9 +44,22 @@ def get_export_options(defaults=None):
         '--language': {
             'action': 'store',
             'dest': 'language',
-            'choices': ['python', 'javascript', 'tableau', 'mysql', 'r'],
+            'choices': ['python', 'javascript', 'tableau', 'mysql', 'r',
+                        'numpy'],
             'default': defaults.get('language', 'javascript'),
-            'help': ("Language to be used in code generation.")}}
+            'help': ("Language to be used in code generation.")},
+        # Stores the tree nodes in an array that is traversed in a loop
+        # instead of generating nested "if" statements. In MySQL, stores
+        # the rules of the leaves in a table joined to the input data
+        '--lookup-table': {
+            'action': 'store_true',
+            'dest': 'lookup_table',
+            'default': defaults.get('lookup_table', False),
+            'help': ("Generates code that stores the nodes of the tree in a"
+                     " table and traverses it in a loop. For mysql, it"
+                     " generates a table of rules and a query that scores"
+                     " a whole table at once. Only available for"
+                     " javascript, python and mysql.")}}
 
         # If a BigML logistic regression is provided, the script will
         # use it to generate predictions
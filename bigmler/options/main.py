@@ -18,6 +18,11 @@
 """Options for BigMLer main subcommand processing
 
 """
+from __future__ import absolute_import
+
+
+from bigmler.utils import OUTPUT_SINKS
+
 
 def get_main_options(defaults=None, constants=None):
     """Main subcommand-related options
@@ -247,6 +252,15 @@ def get_main_options(defaults=None, constants=None):
                      " input data that generates the prediction"
                      " followed by the latter.")},
 
+        # Format of the file that stores local predictions.
+        '--predictions-format': {
+            'action': 'store',
+            'dest': 'predictions_format',
+            'default': defaults.get('predictions_format', 'csv'),
+            'choices': ["csv", "parquet", "arrow", "npy"],
+            'help': ("Format of the local predictions file: csv,"
+                     " parquet, arrow or npy.")},
+
         # Multi-label. The objective field has multiple labels.
         '--multi-label': {
             'action': 'store_true',
@@ -703,6 +717,15 @@ def get_main_options(defaults=None, constants=None):
             'help': ("Create a dataset as ouput of a batch"
                      " prediction.")},
 
+        # Sink where the CSV output of a batch prediction is downloaded to
+        '--output-sink': {
+            'action': 'store',
+            'dest': 'output_sink',
+            'default': defaults.get('output_sink', 'file'),
+            'choices': OUTPUT_SINKS,
+            'help': ("Sink to stream the CSV output of a batch prediction"
+                     " to: file, stdout or gzip.")},
+
         # The path to a file containing the operating point description.
         '--operating-point': {
             'action': 'store',
@@ -64,6 +64,17 @@ def get_reify_options(defaults=None):
             'default': defaults.get('add_fields', False),
             'help': ("Don't add the updatable fields structure information"
                      " to the source update call.")},
+
+        # File that stores the calls of the reified resources to reuse them
+        # when they have not been updated.
+        '--reify-cache': {
+            'action': 'store',
+            'dest': 'reify_cache',
+            'default': defaults.get('reify_cache', None),
+            'help': ("Path to a file that stores the calls of the reified"
+                     " resources. The calls of the resources that have not"
+                     " been updated since are reused in the next"
+                     " reifications.")},
     }
 
     return options
@@ -143,6 +143,15 @@ def get_time_series_options(defaults=None):
             'default': defaults.get('forecast', False),
             'help': ("Whether to produce forecasts using the time series.")},
 
+        # Whether to evaluate locally using the --test file as holdout
+        '--local-evaluation': {
+            'action': 'store_true',
+            'dest': 'local_evaluation',
+            'default': defaults.get('local_evaluation', False),
+            'help': ("Evaluates the time series locally, using the values"
+                     " in the --test CSV file as holdout, when used with"
+                     " --evaluate. No evaluation resources are created.")},
+
         # objective fields
         '--objectives': {
             'action': 'store',
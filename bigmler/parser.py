@@ -167,6 +167,7 @@ under the License.""" % version
         '--no-csv': main_options['--no-csv'],
         '--no-no-csv': main_options['--no-no-csv'],
         '--to-dataset': main_options['--to-dataset'],
+        '--output-sink': main_options['--output-sink'],
         '--datasets': main_options['--datasets'],
         '--dataset-file': main_options['--dataset-file'],
         '--dataset-tag': delete_options['--dataset-tag']})
@@ -189,6 +190,7 @@ under the License.""" % version
         '--centroid-tag': delete_options['--centroid-tag'],
         '--batch-centroid-tag': delete_options['--batch-centroid-tag'],
         '--prediction-info': main_options['--prediction-info'],
+        '--predictions-format': main_options['--predictions-format'],
         '--prediction-header': main_options['--prediction-header'],
         '--prediction-fields': main_options['--prediction-fields'],
         '--reports': main_options['--reports'],
@@ -196,7 +198,8 @@ under the License.""" % version
         '--no-batch': main_options['--no-batch'],
         '--no-csv': main_options['--no-csv'],
         '--no-no-csv': main_options['--no-no-csv'],
-        '--to-dataset': main_options['--to-dataset']})
+        '--to-dataset': main_options['--to-dataset'],
+        '--output-sink': main_options['--output-sink']})
 
     defaults = general_defaults["BigMLer anomaly"]
     subcommand_options["anomaly"] = get_anomaly_options(defaults=defaults)
@@ -216,6 +219,7 @@ under the License.""" % version
         '--batch-anomaly-score-tag': delete_options[
             '--batch-anomaly-score-tag'],
         '--prediction-info': main_options['--prediction-info'],
+        '--predictions-format': main_options['--predictions-format'],
         '--prediction-header': main_options['--prediction-header'],
         '--prediction-fields': main_options['--prediction-fields'],
         '--reports': main_options['--reports'],
@@ -223,7 +227,8 @@ under the License.""" % version
         '--no-batch': main_options['--no-batch'],
         '--no-csv': main_options['--no-csv'],
         '--no-no-csv': main_options['--no-no-csv'],
-        '--to-dataset': main_options['--to-dataset']})
+        '--to-dataset': main_options['--to-dataset'],
+        '--output-sink': main_options['--output-sink']})
 
     defaults = general_defaults["BigMLer sample"]
     subcommand_options["sample"] = get_sample_options(defaults=defaults)
@@ -255,6 +260,8 @@ under the License.""" % version
         option = '--%s' % option
         export_common_options.update({option: common_options[option]})
     subcommand_options["export"].update(export_common_options)
+    subcommand_options["export"].update({
+        '--method': main_options['--method']})
 
     defaults = general_defaults["BigMLer reify"]
     subcommand_options["reify"] = get_reify_options(defaults=defaults)
@@ -296,6 +303,10 @@ under the License.""" % version
         '--source-tag': delete_options['--source-tag'],
         '--dataset-tag': delete_options['--dataset-tag'],
         '--association-tag': delete_options['--association-tag'],
+        '--prediction-info': main_options['--prediction-info'],
+        '--predictions-format': main_options['--predictions-format'],
+        '--prediction-header': main_options['--prediction-header'],
+        '--prediction-fields': main_options['--prediction-fields'],
         '--reports': main_options['--reports'],
         '--remote': main_options['--remote'],
         '--no-batch': main_options['--no-batch'],
@@ -320,12 +331,14 @@ under the License.""" % version
         '--objective': main_options['--objective'],
         '--evaluate': main_options['--evaluate'],
         '--prediction-info': main_options['--prediction-info'],
+        '--predictions-format': main_options['--predictions-format'],
         '--prediction-header': main_options['--prediction-header'],
         '--prediction-fields': main_options['--prediction-fields'],
         '--reports': main_options['--reports'],
         '--remote': main_options['--remote'],
         '--no-batch': main_options['--no-batch'],
         '--to-dataset': main_options['--to-dataset'],
+        '--output-sink': main_options['--output-sink'],
         '--no-csv': main_options['--no-csv'],
         '--fields-map': main_options['--fields-map'],
         '--dataset-off': main_options['--dataset-off'],
@@ -356,6 +369,7 @@ under the License.""" % version
         '--objective': main_options['--objective'],
         '--evaluate': main_options['--evaluate'],
         '--prediction-header': main_options['--prediction-header'],
+        '--predictions-format': main_options['--predictions-format'],
         '--reports': main_options['--reports'],
         '--remote': main_options['--remote']})
 
@@ -411,6 +425,7 @@ under the License.""" % version
         '--batch-topic-distribution-tag': delete_options[ \
             '--batch-topic-distribution-tag'],
         '--prediction-info': main_options['--prediction-info'],
+        '--predictions-format': main_options['--predictions-format'],
         '--prediction-header': main_options['--prediction-header'],
         '--prediction-fields': main_options['--prediction-fields'],
         '--reports': main_options['--reports'],
@@ -418,7 +433,8 @@ under the License.""" % version
         '--no-batch': main_options['--no-batch'],
         '--no-csv': main_options['--no-csv'],
         '--no-no-csv': main_options['--no-no-csv'],
-        '--to-dataset': main_options['--to-dataset']})
+        '--to-dataset': main_options['--to-dataset'],
+        '--output-sink': main_options['--output-sink']})
 
 
     defaults = general_defaults["BigMLer deepnet"]
@@ -438,12 +454,14 @@ under the License.""" % version
         '--objective': main_options['--objective'],
         '--evaluate': main_options['--evaluate'],
         '--prediction-info': main_options['--prediction-info'],
+        '--predictions-format': main_options['--predictions-format'],
         '--prediction-header': main_options['--prediction-header'],
         '--prediction-fields': main_options['--prediction-fields'],
         '--reports': main_options['--reports'],
         '--remote': main_options['--remote'],
         '--no-batch': main_options['--no-batch'],
         '--to-dataset': main_options['--to-dataset'],
+        '--output-sink': main_options['--output-sink'],
         '--no-csv': main_options['--no-csv'],
         '--fields-map': main_options['--fields-map'],
         '--dataset-off': main_options['--dataset-off'],
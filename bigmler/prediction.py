@@ -21,6 +21,9 @@ from __future__ import absolute_import
 import sys
 import ast
 import gc
+import csv
+
+from StringIO import StringIO
 
 import bigml.api
 
@@ -36,6 +39,7 @@ import bigmler.utils as u
 import bigmler.checkpoint as c
 
 from bigmler.tst_reader import TstReader as TestReader
+from bigmler.columnar import output_writer, format_file_name
 from bigmler.resources import (FIELDS_QS, ALL_FIELDS_QS, BRIEF_FORMAT,
                                NORMAL_FORMAT, FULL_FORMAT)
 from bigmler.resources import create_batch_prediction
@@ -49,6 +53,8 @@ AGGREGATION = -3
 
 COMBINATION_LABEL = 'combined'
 OTHER = "***** other *****"
+# number of rows kept in the prediction writer buffer before writing them
+BUFFER_ROWS = 10000
 
 
 def use_prediction_headers(prediction_headers, output, test_reader,
@@ -107,16 +113,10 @@ def use_prediction_headers(prediction_headers, output, test_reader,
     return exclude
 
 
-def write_prediction(prediction, output=sys.stdout,
-                     prediction_info=NORMAL_FORMAT, input_data=None,
-                     exclude=None):
-    """Writes the final combined prediction to the required output
-
-       The format of the output depends on the `prediction_info` value.
-       There's a brief format, that writes only the predicted value,
-       a normal format (default) that writes the prediction followed by its
-       confidence, and a full data format that writes first the input data
-       used to predict followed by the prediction.
+def split_prediction(prediction):
+    """Returns the (prediction, confidence) pair for the different
+       prediction structures: (prediction, confidence) tuples, [prediction]
+       or [prediction, confidence, ...] lists and dicts.
 
     """
     confidence = False
@@ -130,6 +130,22 @@ def write_prediction(prediction, output=sys.stdout,
     if isinstance(prediction, dict):
         confidence = prediction.get("confidence", prediction.get("probability"))
         prediction = prediction["prediction"]
+    return prediction, confidence
+
+
+def write_prediction(prediction, output=sys.stdout,
+                     prediction_info=NORMAL_FORMAT, input_data=None,
+                     exclude=None):
+    """Writes the final combined prediction to the required output
+
+       The format of the output depends on the `prediction_info` value.
+       There's a brief format, that writes only the predicted value,
+       a normal format (default) that writes the prediction followed by its
+       confidence, and a full data format that writes first the input data
+       used to predict followed by the prediction.
+
+    """
+    prediction, confidence = split_prediction(prediction)
 
     row = []
     # input data is added if prediction format is BRIEF (no confidence) or FULL
@@ -152,6 +168,118 @@ def write_prediction(prediction, output=sys.stdout,
             raise AttributeError("You should provide a writeable object")
 
 
+class PredictionWriter(object):
+    """Buffered writer for the final predictions
+
+       Builds the prediction rows in the format given by `prediction_info`,
+       as write_prediction does, but the columns of the input data to be
+       kept are computed once and rows are written in batches. When the
+       output is a CSV UnicodeWriter, the batches are formatted in memory
+       and written to its file handler in a single call.
+
+    """
+    def __init__(self, output, prediction_info=NORMAL_FORMAT, exclude=None,
+                 buffer_rows=BUFFER_ROWS):
+        """Writer constructor
+
+           `output`: writer object (UnicodeWriter, ColumnarWriter or any
+                     object with a writerow method)
+           `prediction_info`: brief, normal or full format
+           `exclude`: indices of the input data columns to be excluded
+           `buffer_rows`: number of rows buffered before writing them
+        """
+        self.output = output
+        self.with_input = prediction_info != NORMAL_FORMAT
+        self.with_confidence = prediction_info in [NORMAL_FORMAT, FULL_FORMAT]
+        self.exclude = set(exclude) if exclude else set()
+        self.buffer_rows = buffer_rows
+        # kept input columns, computed once per row length
+        self.kept_columns = {}
+        self.rows = []
+        self.file_handler = getattr(output, "file_handler", None)
+        self.csv_buffer = None
+        self.csv_writer = None
+        self.encoding = None
+        if self.file_handler is not None and hasattr(output, "dialect"):
+            self.encoding = None if u.PYTHON3 else output.encoding
+            self.csv_buffer = StringIO()
+            self.csv_writer = csv.writer(self.csv_buffer,
+                                         dialect=output.dialect,
+                                         **output.kwargs)
+
+    def __enter__(self):
+        """Opening the writer as context manager
+
+        """
+        return self
+
+    def __exit__(self, ftype, value, traceback):
+        """Writing the remaining rows on exit
+
+        """
+        self.flush()
+
+    def _input_columns(self, input_data):
+        """Returns the input data columns to be written
+
+        """
+        length = len(input_data)
+        kept = self.kept_columns.get(length)
+        if kept is None:
+            kept = [index for index in range(0, length)
+                    if index not in self.exclude]
+            self.kept_columns[length] = kept
+        return [input_data[index] for index in kept]
+
+    def _encode(self, values):
+        """Encodes the values of a row to be written by the CSV writer.
+           Text values are joined to be encoded in a single call (CSV input
+           cannot contain NUL characters).
+
+        """
+        try:
+            return u"\x00".join(values).encode(self.encoding).split("\x00")
+        except (TypeError, AttributeError):
+            return [(value.encode(self.encoding)
+                     if isinstance(value, basestring) else value)
+                    for value in values]
+
+    def write(self, prediction, input_data=None):
+        """Adds the row for the prediction to the buffer
+
+        """
+        prediction, confidence = split_prediction(prediction)
+        row = []
+        if self.with_input and input_data:
+            row = self._input_columns(input_data)
+            if self.encoding is not None:
+                row = self._encode(row)
+        if self.encoding is not None and isinstance(prediction, basestring):
+            prediction = prediction.encode(self.encoding)
+        row.append(prediction)
+        if self.with_confidence:
+            row.append(confidence)
+        self.rows.append(row)
+        if len(self.rows) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows to the output
+
+        """
+        if not self.rows:
+            return
+        if self.csv_writer is not None:
+            self.csv_writer.writerows(self.rows)
+            self.file_handler.write(self.csv_buffer.getvalue())
+            self.csv_buffer.seek(0)
+            self.csv_buffer.truncate()
+        else:
+            for row in self.rows:
+                self.output.writerow(row)
+        self.rows = []
+
+
 def prediction_to_row(prediction, prediction_info=NORMAL_FORMAT):
     """Returns a csv row to store main prediction info in csv files.
 
@@ -193,12 +321,14 @@ def combine_votes(votes_files, to_prediction, to_file, method=0,
         number_of_tests = len(votes)
         if input_data_list is None or len(input_data_list) != number_of_tests:
             input_data_list = None
-        for index in range(0, number_of_tests):
-            multivote = votes[index]
-            input_data = (None if input_data_list is None
-                          else input_data_list[index])
-            write_prediction(multivote.combine(method, True), output,
-                             prediction_info, input_data, exclude)
+        with PredictionWriter(output, prediction_info,
+                              exclude) as prediction_writer:
+            for index in range(0, number_of_tests):
+                multivote = votes[index]
+                input_data = (None if input_data_list is None
+                              else input_data_list[index])
+                prediction_writer.write(multivote.combine(method, True),
+                                        input_data)
 
 
 def remote_predict_models(models, test_reader, prediction_file, api, args,
@@ -306,8 +436,7 @@ def local_predict(models, test_reader, output, args, options=None,
 
     """
     single_model = len(models) == 1
-    test_set_header = test_reader.has_headers()
-    kwargs = {"by_name": test_set_header, "with_confidence": True,
+    kwargs = {"by_name": False, "with_confidence": True,
               "missing_strategy": args.missing_strategy}
     if single_model:
         local_model = Model(models[0], api=args.retrieve_api_)
@@ -319,19 +448,19 @@ def local_predict(models, test_reader, output, args, options=None,
     if args.operating_point_:
         kwargs.update({"operating_point": args.operating_point_})
 
-    for input_data in test_reader:
-        input_data_dict = dict(zip(test_reader.raw_headers, input_data))
-        prediction = local_model.predict(
-            input_data_dict, **kwargs)
-        if single_model and args.median and local_model.tree.regression:
-            # only single models' predictions can be based on the median value
-            # predict
-            prediction[0] = prediction[-1]
-        if not isinstance(prediction, dict):
-            prediction = prediction[0: 2]
-        write_prediction(prediction,
-                         output,
-                         args.prediction_info, input_data, exclude)
+    with PredictionWriter(output, args.prediction_info,
+                          exclude) as prediction_writer:
+        for input_data in test_reader:
+            input_data_dict = test_reader.dict(input_data, filtering=False)
+            prediction = local_model.predict(
+                input_data_dict, **kwargs)
+            if single_model and args.median and local_model.tree.regression:
+                # only single models' predictions can be based on the median
+                # value predict
+                prediction[0] = prediction[-1]
+            if not isinstance(prediction, dict):
+                prediction = prediction[0: 2]
+            prediction_writer.write(prediction, input_data)
 
 
 def retrieve_models_split(models_split, api, query_string=FIELDS_QS,
@@ -485,9 +614,10 @@ def local_batch_predict(models, test_reader, prediction_file, api, args,
     test_set_header = test_reader.has_headers()
     if output_path is None:
         output_path = u.check_dir(prediction_file)
-    if output is None:
+    close_output = output is None
+    if close_output:
         try:
-            output = open(prediction_file, 'w', 0)
+            output = UnicodeWriter(prediction_file).open_writer()
         except IOError:
             raise IOError("Failed to write in %s" % prediction_file)
     models_total = len(models)
@@ -557,6 +687,8 @@ def local_batch_predict(models, test_reader, prediction_file, api, args,
         u.log_message(message, log_file=session_file, console=args.verbosity)
 
     # combining the votes to issue the final prediction for each input data
+    prediction_writer = PredictionWriter(output, args.prediction_info,
+                                         exclude)
     for index in range(0, len(total_votes)):
         multivote = total_votes[index]
         input_data = raw_input_data_list[index]
@@ -580,8 +712,10 @@ def local_batch_predict(models, test_reader, prediction_file, api, args,
             prediction = multivote.combine(method=method, with_confidence=True,
                                            options=options)
 
-        write_prediction(prediction, output, args.prediction_info, input_data,
-                         exclude)
+        prediction_writer.write(prediction, input_data)
+    prediction_writer.flush()
+    if close_output:
+        output.close_writer()
 
 
 def predict(models, fields, args, api=None, log=None,
@@ -598,14 +732,15 @@ def predict(models, fields, args, api=None, log=None,
     test_set = args.test_set
     test_set_header = args.test_header
     objective_field = args.objective_field
-    output = args.predictions
+    output = format_file_name(args.predictions, args)
     test_reader = TestReader(test_set, test_set_header, fields,
                              objective_field,
                              test_separator=args.test_separator)
 
     prediction_file = output
     output_path = u.check_dir(output)
-    with UnicodeWriter(output) as output:
+    with output_writer(output, args,
+                       headers=args.prediction_header) as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args,
@@ -728,8 +863,9 @@ def remote_predict(model, test_dataset, batch_prediction_args, args,
                     models[index], test_dataset_n, batch_prediction_args,
                     args, api, session_file=session_file, path=path, log=log))
     if not args.no_csv and not args.dataset_off:
-        file_name = api.download_batch_prediction(batch_prediction,
-                                                  prediction_file)
+        file_name = u.download_to_sink(api.download_batch_prediction,
+                                       batch_prediction, prediction_file,
+                                       sink=args.output_sink)
         if file_name is None:
             sys.exit("Failed downloading CSV.")
     if args.to_dataset and not args.dataset_off:
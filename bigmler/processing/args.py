@@ -33,6 +33,7 @@ import bigmler.utils as u
 from bigmler.resources import ADD_REMOVE_PREFIX
 from bigmler.prediction import FULL_FORMAT, COMBINATION, COMBINATION_LABEL
 from bigmler.train_reader import AGGREGATES
+from bigmler.columnar import CSV_FORMAT
 from bigmler.utils import PYTHON3, check_dir
 
 if PYTHON3:
@@ -1020,6 +1021,24 @@ def transform_args(command_args, flags, api):
     except AttributeError:
         pass
 
+    # The output streamed to stdout must not be mixed with the log messages
+    try:
+        if command_args.output_sink == u.STDOUT_SINK:
+            command_args.verbosity = 0
+    except AttributeError:
+        pass
+
+    # Remote predictions are downloaded as CSV files, so the columnar
+    # formats can only be used for local predictions
+    try:
+        if command_args.remote and command_args.predictions_format not in \
+                [None, CSV_FORMAT]:
+            sys.exit("The %s predictions format is only available for local"
+                     " predictions. Please, remove the --remote flag or use"
+                     " the csv format." % command_args.predictions_format)
+    except AttributeError:
+        pass
+
     command_args.has_supervised_ = (
         (hasattr(command_args, 'model') and command_args.model) or
         (hasattr(command_args, 'models') and command_args.models) or
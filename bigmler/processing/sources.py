@@ -21,12 +21,12 @@ from __future__ import absolute_import
 
 import os
 import csv
-from zipfile import ZipFile, ZIP_DEFLATED
+import gzip
 
 import bigml.api
 
 from bigml.fields import Fields
-from bigml.util import bigml_locale
+from bigml.util import bigml_locale, console_log, localize
 
 import bigmler.utils as u
 import bigmler.resources as r
@@ -36,6 +36,7 @@ import bigmler.processing.projects as pp
 from bigmler.train_reader import TrainReader
 
 MONTECARLO_FACTOR = 200
+PROGRESS_ROWS = 100000
 
 
 def test_source_processing(api, args, resume,
@@ -194,30 +195,36 @@ def multi_label_expansion(training_set, training_set_header,
     except AttributeError:
         file_name = "test_set.csv" if input_flag else "training_set.csv"
     output_file = "%s%sextended_%s" % (output_path, os.sep, file_name)
+    # training sources are compressed on the fly while the extended rows
+    # are generated, so that no uncompressed copy of the extended file is
+    # stored and upload time and resources are minimized
+    if not input_flag:
+        output_file = "%s.gz" % output_file
     message = u.dated("Transforming to extended source.\n")
     u.log_message(message, log_file=session_file,
                   console=args.verbosity)
-    with open(output_file, u.open_mode('w')) as output_handler:
+    output_handler = (open(output_file, u.open_mode('w')) if input_flag
+                      else gzip.open(output_file, u.open_mode('w')))
+    with output_handler:
         output = csv.writer(output_handler, lineterminator="\n")
         output.writerow(new_headers)
         # read to write new source file with column per label
         input_reader.reset()
         if training_set_header:
             input_reader.get_next()
+        rows = 0
         while True:
             try:
                 row = input_reader.get_next(extended=True)
                 output.writerow(row)
+                rows += 1
+                if args.verbosity and rows % PROGRESS_ROWS == 0:
+                    console_log("Extended %s rows" % localize(rows),
+                                reset=True)
             except StopIteration:
                 break
 
-    # training sources are zipped to minimize upload time and resources
     if not input_flag:
-        output_file_zip = "%s%sextended_%s.zip" % (output_path,
-                                                   os.sep, file_name)
-        with ZipFile(output_file_zip, 'w', ZIP_DEFLATED) as output_zipped_file:
-            output_zipped_file.write(output_file, file_name)
-        output_file = output_file_zip
         objective_field = input_reader.headers[input_reader.objective_column]
 
     input_reader.close()
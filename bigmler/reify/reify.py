@@ -40,8 +40,8 @@ def reify_resources(args, api, logger):
         sys.exit("Failed to match a valid resource ID. Please, check: %s"
                  % args.resource_id)
 
-    api_calls = RESTChain(api, resource_id, args.add_fields,
-                          logger, args.output_dir)
+    api_calls = RESTChain(api, resource_id, args.add_fields, logger,
+                          cache_file=args.reify_cache)
     output = api_calls.reify(args.language)
     if PYTHON3:
         with open(args.output, "w", encoding="utf-8") as reify_file:
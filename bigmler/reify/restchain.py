@@ -23,7 +23,14 @@ from __future__ import absolute_import
 
 import sys
 import math
-import os
+import copy
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from multiprocessing.pool import ThreadPool
 
 from bigml.resourcehandler import get_resource_id, get_resource_type
 from bigml.fields import Fields
@@ -31,9 +38,28 @@ from bigml.basemodel import retrieve_resource
 
 import bigmler.reify.restutils as u
 
+from bigmler.utils import iter_listed
+
 from bigmler.reify.reify_defaults import COMMON_DEFAULTS, DEFAULTS
 
 GET_QS = 'limit=-1;exclude=root,trees'
+MAX_PARALLEL_RETRIEVALS = 8
+REIFY_CACHE_VERSION = 1
+# list calls used to find the resources updated since they were reified
+LIST_METHODS = {
+    "source": "list_sources",
+    "dataset": "list_datasets",
+    "model": "list_models",
+    "ensemble": "list_ensembles",
+    "cluster": "list_clusters",
+    "anomaly": "list_anomalies",
+    "prediction": "list_predictions",
+    "centroid": "list_centroids",
+    "anomalyscore": "list_anomaly_scores",
+    "evaluation": "list_evaluations",
+    "batchprediction": "list_batch_predictions",
+    "batchcentroid": "list_batch_centroids",
+    "batchanomalyscore": "list_batch_anomaly_scores"}
 INDENT = ' ' * 4
 PREFIXES = {
     "python": (u'#!/usr/bin/env python\n# -​*- coding: utf-8 -*​-\n'
@@ -55,12 +81,86 @@ def uniquify(resource_ids):
 
     """
     unique_objects = []
+    found = set()
     for resource_id in reversed(resource_ids):
-        if not resource_id in unique_objects:
+        # lists of origins are also found as objects
+        key = tuple(resource_id) if isinstance(resource_id, list) \
+            else resource_id
+        if key not in found:
+            found.add(key)
             unique_objects.append(resource_id)
     return unique_objects
 
 
+def call_origins(calls):
+    """Resource ids in the origins of a list of calls
+
+    """
+    ids = []
+    for call in calls:
+        for origins in call.origins or []:
+            if isinstance(origins, basestring):
+                origins = [origins]
+            ids.extend(origins)
+    return ids
+
+
+def read_reify_cache(cache_file):
+    """Reads the calls stored by previous reifications. Missing or
+       unreadable files start a new cache.
+
+    """
+    try:
+        with open(cache_file, "rb") as cache_handler:
+            cache = pickle.load(cache_handler)
+        if cache.get("version") == REIFY_CACHE_VERSION:
+            return cache["resources"]
+    except (IOError, EOFError, ValueError, KeyError, AttributeError,
+            ImportError, pickle.UnpicklingError):
+        pass
+    return {}
+
+
+def write_reify_cache(cache_file, resources):
+    """Stores the calls of the reified resources. The calls are pickled
+       so that the generated code is exactly the same when they are reused.
+
+    """
+    with open(cache_file, "wb") as cache_handler:
+        pickle.dump({"version": REIFY_CACHE_VERSION,
+                     "resources": resources}, cache_handler,
+                    pickle.HIGHEST_PROTOCOL)
+
+
+def origin_ids(resource):
+    """Ids of the resources that will be retrieved to reify the given one:
+       its origins and, for ensembles, their first model. Only the first
+       model is used when the origin is a list of models.
+
+    """
+    resource_type = get_resource_type(resource)
+    ids = []
+    for argument_origins in u.ORIGINS.get(resource_type, []):
+        for origin in argument_origins:
+            if origin == 'new_fields':
+                origin = 'origin_dataset'
+            info = resource.get(origin)
+            if info:
+                if origin == 'ranges':
+                    info = info.keys()
+                elif origin == 'models':
+                    info = info[0: 1]
+                if isinstance(info, basestring):
+                    info = [info]
+                ids.extend(info)
+                break
+    if resource_type == "ensemble":
+        ids.extend(resource.get("models", [])[0: 1])
+    return [resource_id for resource_id in ids
+            if isinstance(resource_id, basestring) and
+            get_resource_id(resource_id) is not None]
+
+
 class RESTChain(object):
 
     """List of REST calls in reverse order leading to the resource creation
@@ -69,9 +169,12 @@ class RESTChain(object):
 
 
     def __init__(self, api, resource_id, add_fields,
-                 logger=None, storage=None):
+                 logger=None, cache_file=None):
         """Constructor: empty list of objects and REST calls
 
+           `cache_file`: file that stores the calls of the reified resources
+                         to reuse them in the next reifications
+
         """
 
         def silent(message):
@@ -83,45 +186,147 @@ class RESTChain(object):
         self.calls = {}
         self.objects = [resource_id]
         self.api = api
-        self.delete = not self.api.storage
-        if self.delete:
-            self.api.storage = storage or os.getcwd()
+        # resources retrieved during the analysis, by id
+        self.resources = {}
+        # resources read while reifying the current one
+        self.reads = None
         self.add_fields = add_fields
         self.logger = logger or silent
-        self.reify_resource(resource_id)
+        self.cache = read_reify_cache(cache_file) if cache_file else {}
+        self.reusable = set()
+        self.pool = ThreadPool(MAX_PARALLEL_RETRIEVALS)
+        try:
+            self.check_cache(resource_id)
+            self.prefetch([resource_id])
+            self.reify_resource(resource_id)
+        finally:
+            self.pool.close()
+            self.pool.join()
         self.objects = uniquify(self.objects)
-        if self.delete:
-            self.api.storage = None
+        if cache_file:
+            write_reify_cache(cache_file, self.cache)
+
+    def check_cache(self, resource_id):
+        """Finds the cached resources whose calls can be reused: the ones
+           that were reified with the same options and such that none of
+           the resources read to reify them has been updated since. The
+           updated resources are listed by type, so that no resource needs
+           to be retrieved to check it.
+
+        """
+        cached_ids = []
+        pending = [resource_id]
+        while pending:
+            cached_id = pending.pop()
+            if cached_id in self.cache and cached_id not in cached_ids:
+                cached_ids.append(cached_id)
+                pending.extend(call_origins(self.cache[cached_id]["calls"]))
+        # calls depending on resources with no update information or
+        # computed with different options cannot be reused
+        cached_ids = [
+            cached_id for cached_id in cached_ids if
+            self.cache[cached_id]["add_fields"] == self.add_fields and
+            None not in self.cache[cached_id]["updated"].values()]
+        # each resource type is listed from the oldest update stored for
+        # its resources, so that every change after any of them is found
+        thresholds = {}
+        for cached_id in cached_ids:
+            for read_id, updated in self.cache[cached_id]["updated"].items():
+                resource_type = get_resource_type(read_id)
+                thresholds[resource_type] = min(
+                    thresholds.get(resource_type, updated), updated)
+        if not thresholds or not set(thresholds).issubset(LIST_METHODS):
+            return
+
+        def updates(resource_type):
+            """Current update time of the resources of the type changed
+               after its threshold
+
+            """
+            return [(obj["resource"], obj.get("updated")) for obj in
+                    iter_listed(getattr(self.api, LIST_METHODS[resource_type]),
+                                "updated__gt=%s" % thresholds[resource_type])]
+
+        current = {}
+        for listed in self.pool.map(updates, list(thresholds)):
+            current.update(listed)
+        # the calls can be reused if none of the resources read to compute
+        # them has been updated after the reification
+        for cached_id in cached_ids:
+            if all(current.get(read_id, updated) == updated for
+                   read_id, updated in
+                   self.cache[cached_id]["updated"].items()):
+                self.reusable.add(cached_id)
+
+    def retrieve(self, resource_id):
+        """Retrieves the resource from the API or, if it was previously
+           stored there, from the api storage directory.
+
+        """
+        return retrieve_resource(self.api, resource_id,
+                                 query_string=GET_QS,
+                                 no_check_fields=True).get('object')
+
+    def prefetch_resource(self, resource_id):
+        """Retrieves the resource in a prefetching thread. Failures are
+           ignored: the resource will be retrieved again when needed.
+
+        """
+        try:
+            return self.retrieve(resource_id)
+        except (Exception, SystemExit):
+            return None
+
+    def prefetch(self, resource_ids):
+        """Retrieves the resources and the origins needed to reify them. The
+           origin graph is traversed by frontiers and the resources in
+           each frontier are retrieved in parallel.
+
+        """
+        frontier = [resource_id for resource_id in uniquify(resource_ids)
+                    if resource_id not in self.resources]
+        while frontier:
+            # reusable resources are not retrieved, but their origins are
+            retrievals = [resource_id for resource_id in frontier
+                          if resource_id not in self.reusable]
+            resources = dict(zip(retrievals, self.pool.map(
+                self.prefetch_resource, retrievals)))
+            next_frontier = []
+            for resource_id in frontier:
+                if resource_id in self.reusable:
+                    origins = call_origins(self.cache[resource_id]["calls"])
+                elif resources[resource_id] is None:
+                    continue
+                else:
+                    self.resources[resource_id] = resources[resource_id]
+                    origins = origin_ids(resources[resource_id])
+                for origin_id in origins:
+                    if origin_id not in self.resources and \
+                            origin_id not in frontier and \
+                            origin_id not in next_frontier:
+                        next_frontier.append(origin_id)
+            frontier = next_frontier
 
     def get_resource(self, resource_id):
         """Auxiliar method to retrieve resources. The query string ensures
-           low bandwith usage and full fields structure.
+           low bandwith usage and full fields structure. Resources are
+           retrieved only once and a copy is returned, as the reify methods
+           change them.
 
         """
         if (resource_id and not isinstance(resource_id, basestring) and
                 isinstance(resource_id, list)):
             resource_id = resource_id[0]
-        try:
-            resource = retrieve_resource(self.api, resource_id,
-                                         query_string=GET_QS,
-                                         no_check_fields=True).get('object')
-            return resource
-        except ValueError:
-            sys.exit("We could not reify the resource. Failed to find"
-                     " information for %s in the"
-                     " creation chain." % resource_id)
-
-    def delete_stored_resource(self, resource_id):
-        """Deletes the copy of the resource stored to fasten the analysis
-
-        """
-        if self.api.storage is not None:
+        if self.reads is not None:
+            self.reads.append(resource_id)
+        if resource_id not in self.resources:
             try:
-                stored_resource = "%s%s%s" % (self.api.storage, os.sep,
-                                              resource_id.replace("/", "_"))
-                os.remove(stored_resource)
-            except IOError:
-                pass
+                self.resources[resource_id] = self.retrieve(resource_id)
+            except ValueError:
+                sys.exit("We could not reify the resource. Failed to find"
+                         " information for %s in the"
+                         " creation chain." % resource_id)
+        return copy.deepcopy(self.resources[resource_id])
 
     def add(self, resource_id, calls):
         """Extend the list of calls and objects
@@ -129,6 +334,15 @@ class RESTChain(object):
         """
         if not resource_id in self.calls:
             self.calls[resource_id] = calls
+        if self.reads is not None:
+            # the calls depend on the resources read to compute them
+            self.cache[resource_id] = {
+                "add_fields": self.add_fields,
+                "updated": dict([(read_id,
+                                  self.resources[read_id].get("updated"))
+                                 for read_id in uniquify(self.reads)]),
+                "calls": calls}
+            self.reads = None
         new_origins = []
         for call in calls:
             for origins in call.origins:
@@ -154,6 +368,7 @@ class RESTChain(object):
                         self.objects.extend(old_origins)
                     else:
                         new_origins.append(origin)
+        self.prefetch(new_origins)
         for origin in new_origins:
             self.reify_resource(origin)
 
@@ -196,12 +411,16 @@ class RESTChain(object):
         if resource_id is not None:
             resource_type = get_resource_type(resource_id)
 
+            if resource_id in self.reusable:
+                message = "Reusing the stored calls for %s.\n" % resource_id
+                self.logger(message)
+                self.add(resource_id, self.cache[resource_id]["calls"])
+                return
             reify_handler = getattr(self, 'reify_%s' % resource_type)
             message = "Analyzing %s.\n" % resource_id
             self.logger(message)
+            self.reads = []
             reify_handler(resource_id)
-            if self.delete:
-                self.delete_stored_resource(resource_id)
 
     def reify_source(self, resource_id):
         """Extracts the REST API arguments from the source JSON structure
@@ -20,12 +20,14 @@ import time
 import csv
 import json
 import nose
+from nose.tools import ok_, eq_, assert_almost_equal
 from bigmler.tests.world import world, res_filename
 from subprocess import check_call, CalledProcessError
 from bigml.api import check_resource
+from bigml.anomaly import Anomaly
 from bigmler.utils import storage_file_name
 from bigmler.checkpoint import file_number_of_lines
-from bigmler.tests.common_steps import check_debug
+from bigmler.tests.common_steps import check_debug, local_results, output_rows
 
 
 def shell_execute(command, output, test=None, options=None,
@@ -148,6 +150,18 @@ def i_create_anomaly_resources_from_anomaly_detector(step, test=None, output=Non
     shell_execute(command, output, test=test)
 
 
+#@step(r'I create BigML resources using anomaly detector to find the top "(.*?)" anomaly scores for "(.*?)" and log predictions in "([^"]*)"$')
+def i_create_top_k_anomaly_scores_from_anomaly_detector(step, top_k=None,
+                                                        test=None,
+                                                        output=None):
+    ok_(top_k is not None and test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler anomaly --anomaly " + world.anomaly['resource'] +
+               " --test " + test + " --top-k-scores " + top_k +
+               " --store --output " + output)
+    shell_execute(command, output, test=test)
+
+
 #@step(r'I create BigML resources using anomaly detector in file "(.*?)" to find anomaly scores for "(.*?)" and log predictions in "([^"]*)"$')
 def i_create_anomaly_resources_from_anomaly_file(step, anomaly_file=None, test=None, output=None):
     if anomaly_file is None or test is None or output is None:
@@ -223,6 +237,30 @@ def i_check_anomaly_scores(step, check_file):
         assert False, str(exc)
 
 
+#@step(r'the local anomaly scores file has the top "(.*)" scores in "(.*)"')
+def i_check_top_k_anomaly_scores(step, top_k=None, check_file=None):
+    ok_(top_k is not None and check_file is not None)
+    check_scores = [float(row[0]) for row in
+                    output_rows(res_filename(check_file))]
+    # the highest scores first, the earliest rows winning ties
+    expected = sorted(check_scores, key=lambda score: -score)[0: int(top_k)]
+    scores = [float(row[0]) for row in output_rows(world.output)]
+    eq_(len(scores), len(expected))
+    for score, expected_score in zip(scores, expected):
+        assert_almost_equal(score, expected_score, places=5)
+
+
+#@step(r'the local anomaly scores file has the scores of the local anomaly detector for "(.*)"')
+def i_check_anomaly_scores_like_local_anomaly(step, test=None):
+    ok_(test is not None)
+    local_anomaly = Anomaly(world.anomaly['resource'], api=world.api)
+    expected = local_results(local_anomaly.anomaly_score, test)
+    rows = output_rows(world.output)
+    eq_(len(rows), len(expected))
+    for row, score in zip(rows, expected):
+        assert_almost_equal(float(row[-1]), score, places=5)
+
+
 #@step(r'I create BigML resources uploading train "(.*?)" file to find anomaly scores for "(.*?)" remotely with mapping file "(.*)" and log predictions in "([^"]*)"$')
 def i_create_all_anomaly_resources_with_mapping(step, data=None, test=None, fields_map=None, output=None):
     if data is None or test is None or output is None or fields_map is None:
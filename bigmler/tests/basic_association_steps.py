@@ -21,13 +21,17 @@ import time
 import csv
 import json
 
-from nose.tools import assert_equal, assert_not_equal, ok_
+from nose.tools import assert_equal, assert_not_equal, ok_, \
+    assert_almost_equal
 from bigmler.tests.world import world, res_filename
 from subprocess import check_call, CalledProcessError
 from bigml.api import check_resource
+from bigml.association import Association
+from bigml.util import cast
 from bigmler.utils import storage_file_name
 from bigmler.checkpoint import file_number_of_lines
-from bigmler.tests.common_steps import check_debug
+from bigmler.tests.common_steps import check_debug, local_results, \
+    output_rows
 
 
 def shell_execute(command, output, test=None, options=None,
@@ -98,3 +102,41 @@ def i_create_association_from_source(step, output_dir=None):
                world.source['resource'] +
                " --store --output-dir " + output_dir)
     shell_execute(command, os.path.join(output_dir, "x.tmp"))
+
+
+#@step(r'I create BigML association sets using dataset to test "(.*)" with options "(.*)" and log predictions in "(.*)"')
+def i_create_association_sets_from_dataset(step, test=None, options=None,
+                                           output=None):
+    ok_(test is not None and options is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler association --dataset " +
+               world.dataset['resource'] + " --test " + test +
+               " --store --output " + output + " " + options)
+    shell_execute(command, output, test=test, options=options)
+
+
+#@step(r'the local association sets file is like the local association sets for "(.*)" with k "(.*)"')
+def i_check_association_sets_like_local(step, test, k):
+    k = int(k)
+    local_association = Association(world.association['resource'],
+                                    api=world.api)
+    rules = dict([(rule.rule_id, rule) for rule in local_association.rules])
+
+    def association_set(input_data):
+        input_data = local_association.filter_input_data(input_data)
+        cast(input_data, local_association.fields)
+        return local_association.association_set(input_data, k=k,
+                                                 by_name=False)
+
+    association_sets = local_results(association_set, test)
+    rows = output_rows(world.output, header=world.prediction_header)
+    assert_equal(len(rows), len(association_sets))
+    for row, association_set in zip(rows, association_sets):
+        assert_equal(len(row), 2 * k)
+        for rank, prediction in enumerate(association_set):
+            rule = rules[prediction["rules"][0]]
+            item = local_association.items[rule.rhs[0]]
+            assert_equal(row[2 * rank], item.describe())
+            assert_almost_equal(float(row[2 * rank + 1]),
+                                prediction["score"], places=5)
+        ok_(all(value == "" for value in row[2 * len(association_set):]))
@@ -19,8 +19,10 @@ import os
 import time
 import csv
 import json
+import gzip
+import shutil
 from bigmler.tests.world import world, res_filename
-from subprocess import check_call, CalledProcessError
+from subprocess import check_call, check_output, CalledProcessError
 from bigml.api import check_resource
 from nose.tools import ok_
 from bigmler.tests.common_steps import check_debug
@@ -186,3 +188,31 @@ def i_create_resources_from_model_remote_no_batch(step,
                test + " --no-batch --store --remote --output " + output +
                " --max-batch-models 1")
     shell_execute(command, output, test=test)
+
+
+#@step(r'I create BigML remote batch predictions using model to test "(.*)" with output sink "(.*)" and log predictions in "(.*)"')
+def i_create_resources_from_model_remote_to_sink(step, test=None, sink=None,
+                                                 output=None):
+    ok_(test is not None and sink is not None and output is not None)
+    test = res_filename(test)
+    command = check_debug("bigmler --model " + world.model['resource'] +
+                          " --test " + test + " --store --remote --output " +
+                          output + " --max-batch-models 1 --output-sink " +
+                          sink)
+    world.directory = os.path.dirname(output)
+    world.folders.append(world.directory)
+    world.output = output
+    try:
+        if sink == "stdout":
+            # the console must contain only the downloaded CSV rows
+            contents = check_output(command, shell=True)
+            with open(output, "wb") as output_file:
+                output_file.write(contents)
+        else:
+            check_call(command, shell=True)
+            ok_(not os.path.exists(output))
+            with gzip.open("%s.gz" % output, "rb") as gzip_file:
+                with open(output, "wb") as output_file:
+                    shutil.copyfileobj(gzip_file, output_file)
+    except (OSError, CalledProcessError, IOError) as exc:
+        assert False, str(exc)
@@ -21,13 +21,15 @@ import time
 import csv
 import json
 
-from nose.tools import assert_equal, assert_not_equal, ok_
+from nose.tools import assert_equal, assert_not_equal, ok_, eq_
 from bigmler.tests.world import world, res_filename
 from subprocess import check_call, CalledProcessError
 from bigml.api import check_resource
+from bigml.cluster import Cluster
 from bigmler.utils import storage_file_name
+from bigmler.centroid import NO_CENTROID
 from bigmler.checkpoint import file_number_of_lines
-from bigmler.tests.common_steps import check_debug
+from bigmler.tests.common_steps import check_debug, local_results, output_rows
 
 
 def shell_execute(command, output, test=None, options=None,
@@ -119,6 +121,41 @@ def i_check_centroids(step, check_file):
         assert False, str(exc)
 
 
+#@step(r'the local centroids file is like "(.*)" but for row "(.*)", which has no centroid')
+def i_check_centroids_with_no_centroid_row(step, check_file, row_number):
+    check_file = res_filename(check_file)
+    row_number = int(row_number)
+    with open(world.output, "U") as predictions_file:
+        rows = list(csv.reader(predictions_file, lineterminator="\n"))
+    with open(check_file, "U") as check_handler:
+        check_rows = list(csv.reader(check_handler, lineterminator="\n"))
+    ok_(len(rows) > row_number)
+    for index, row in enumerate(rows):
+        if index == row_number:
+            assert_equal(row, ["-"])
+        else:
+            assert_equal(row, check_rows[index])
+
+
+#@step(r'the local centroids file has the centroids of the local cluster for "(.*)"')
+def i_check_centroids_like_local_cluster(step, test=None):
+    ok_(test is not None)
+    local_cluster = Cluster(world.cluster['resource'], api=world.api)
+
+    def centroid_name(input_data):
+        """Name of the centroid assigned to the input data or the mark used
+           when no centroid can be assigned
+
+        """
+        try:
+            return local_cluster.centroid(input_data)['centroid_name']
+        except Exception:
+            return NO_CENTROID
+
+    expected = local_results(centroid_name, test)
+    eq_([row[-1] for row in output_rows(world.output)], expected)
+
+
 #@step(r'I create BigML resources using dataset to find centroids for "(.*)" and log predictions in "(.*)"')
 def i_create_cluster_resources_from_dataset(step, test=None, output=None):
     ok_(test is not None and output is not None)
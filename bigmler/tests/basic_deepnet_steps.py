@@ -25,7 +25,9 @@ from bigml.io import UnicodeReader
 from bigmler.checkpoint import file_number_of_lines
 from bigmler.utils import storage_file_name, open_mode, decode2
 from bigmler.utils import PYTHON3
-from bigmler.tests.common_steps import check_debug
+from bigml.deepnet import Deepnet
+from bigmler.tests.common_steps import (check_debug, local_results,
+                                        check_local_predictions)
 from nose.tools import ok_, assert_equal, assert_not_equal
 
 
@@ -126,6 +128,14 @@ def i_create_dn_resources_from_model_remote(step, test=None, output=None):
     shell_execute(command, output, test=test)
 
 
+#@step(r'the predictions are like the local deepnet ones for "(.*)"')
+def i_check_dn_predictions_like_local(step, test=None):
+    ok_(test is not None)
+    local_deepnet = Deepnet(world.deepnet['resource'], api=world.api)
+    check_local_predictions(world.output,
+                            local_results(local_deepnet.predict, test))
+
+
 #@step(r'I check that the deepnet model has been created')
 def i_check_create_dn_model(step):
     dn_file = "%s%sdeepnets" % (world.directory, os.sep)
@@ -26,7 +26,9 @@ from bigmler.processing.models import MONTECARLO_FACTOR
 from bigmler.checkpoint import file_number_of_lines
 from bigmler.utils import storage_file_name, open_mode, decode2
 from bigmler.utils import PYTHON3
-from bigmler.tests.common_steps import check_debug
+from bigml.logistic import LogisticRegression
+from bigmler.tests.common_steps import (check_debug, local_results,
+                                        check_local_predictions)
 from nose.tools import ok_, assert_equal, assert_not_equal
 
 
@@ -141,6 +143,15 @@ def i_create_lr_resources_from_model_with_op(step, test=None, output=None,
                output)
     shell_execute(command, output, test=test)
 
+#@step(r'the predictions are like the local logistic regression ones for "(.*)"')
+def i_check_lr_predictions_like_local(step, test=None):
+    ok_(test is not None)
+    local_logistic = LogisticRegression(world.logistic_regression['resource'],
+                                        api=world.api)
+    check_local_predictions(world.output,
+                            local_results(local_logistic.predict, test))
+
+
 #@step(r'I check that the logistic regression model has been created')
 def i_check_create_lr_model(step):
     lr_file = "%s%slogistic_regressions" % (world.directory, os.sep)
@@ -23,10 +23,11 @@ from bigmler.tests.world import world, res_filename
 from subprocess import check_call, CalledProcessError
 from bigml.api import check_resource
 from bigml.io import UnicodeReader
+from bigml.timeseries import TimeSeries
 from bigmler.checkpoint import file_number_of_lines
 from bigmler.utils import storage_file_name, open_mode, decode2
 from bigmler.utils import PYTHON3
-from bigmler.tests.common_steps import check_debug
+from bigmler.tests.common_steps import check_debug, output_rows
 from nose.tools import ok_, assert_equal, assert_not_equal, assert_almost_equal
 
 
@@ -94,6 +95,35 @@ def i_create_all_ts_resources_to_evaluate(step, data=None, output=None):
     shell_execute(command, output)
 
 
+#@step(r'I create BigML forecasts from the time series to test "(.*?)"'
+#       ' and log forecasts in "([^"]*)"$')
+def i_create_forecasts_from_time_series(step, test=None, output=None):
+    ok_(test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler time-series --time-series " +
+               world.time_series['resource'] + " --test " + test +
+               " --store --output " + output)
+    shell_execute(command, output, test=test)
+
+
+#@step(r'I create BigML time series uploading train "(.*)" file and log resources in "([^"]*)"$')
+def i_create_time_series(step, data=None, output_dir=None):
+    ok_(data is not None and output_dir is not None)
+    command = ("bigmler time-series --train " + res_filename(data) +
+               " --store --output-dir " + output_dir)
+    shell_execute(command, os.path.join(output_dir, "x.tmp"))
+
+
+#@step(r'I evaluate the time series locally with holdout "(.*)" and log evaluation in "([^"]*)"$')
+def i_evaluate_time_series_locally(step, test=None, output=None):
+    ok_(test is not None and output is not None)
+    command = ("bigmler time-series --time-series " +
+               world.time_series['resource'] + " --evaluate" +
+               " --local-evaluation --test " + res_filename(test) +
+               " --store --output " + output)
+    shell_execute(command, output)
+
+
 #@step(r'I check that the time series has been created')
 def i_check_create_time_series(step):
     ts_file = "%s%stime_series" % (world.directory, os.sep)
@@ -140,3 +170,54 @@ def i_check_forecasts(step, check_file):
                             assert_equal(check_row[index], row[index])
     except Exception, exc:
         assert False, traceback.format_exc()
+
+
+#@step(r'the batch forecasts file is like "(.*)" and the local forecasts for "(.*)"')
+def i_check_batch_forecasts(step, check_file, test):
+    with UnicodeReader(res_filename(check_file)) as check_reader:
+        check_rows = list(check_reader)
+    local_time_series = TimeSeries(world.time_series['resource'],
+                                   api=world.api)
+    with open(res_filename(test)) as inputs_file:
+        inputs = [json.loads(line) for line in inputs_file if line.strip()]
+    rows = output_rows("%s.csv" % world.output, header=True)
+    expected = []
+    for index, input_data in enumerate(inputs):
+        forecast = local_time_series.forecast(input_data, by_name=False)
+        for objective_id in sorted(forecast.keys()):
+            for model_forecast in forecast[objective_id]:
+                for step_index, point in enumerate(
+                        model_forecast["point_forecast"]):
+                    expected.append([index, objective_id,
+                                     model_forecast["model"],
+                                     step_index + 1, point])
+    assert_equal(len(rows), len(expected))
+    for row, (index, objective_id, model, step_index, point) in zip(
+            rows, expected):
+        assert_equal(row[0], world.time_series['resource'])
+        assert_equal(row[1:5], [str(index), objective_id, model,
+                                str(step_index)])
+        assert_almost_equal(float(row[5]), point, places=5)
+        assert_equal(model, check_rows[0][0])
+        assert_almost_equal(float(row[5]),
+                            float(check_rows[step_index][0]), places=4)
+
+
+#@step(r'the local evaluation file is like "(.*)" for the holdout metrics')
+def i_check_local_ts_evaluation(step, check_file):
+    with open(res_filename(check_file)) as check_handler:
+        check = json.load(check_handler)
+    with open("%s.json" % world.output) as evaluation_handler:
+        evaluation = json.load(evaluation_handler)
+    # the scaled error and directional accuracy depend on the training data,
+    # which is not available in local evaluations
+    metrics = ["mean_absolute_error", "mean_squared_error",
+               "symmetric_mean_absolute_percentage_error", "r_squared"]
+    for field_id, check_models in check["mean"].items():
+        models = dict([(model["model"], model) for model in
+                       evaluation["mean"][field_id]])
+        for check_model in check_models:
+            model = models[check_model["model"]]
+            for metric in metrics:
+                assert_almost_equal(model[metric], check_model[metric],
+                                    places=4)
@@ -22,11 +22,13 @@ from bigmler.tests.world import world, res_filename
 from subprocess import check_call, CalledProcessError
 from bigml.api import check_resource
 from bigml.io import UnicodeReader
+from bigml.topicmodel import TopicModel
 from bigmler.processing.models import MONTECARLO_FACTOR
 from bigmler.checkpoint import file_number_of_lines
 from bigmler.utils import storage_file_name, open_mode, decode2
 from bigmler.utils import PYTHON3
-from bigmler.tests.common_steps import check_debug
+from bigmler.tests.common_steps import check_debug, local_results, \
+    output_rows
 from nose.tools import ok_, assert_equal, assert_not_equal, assert_almost_equal
 
 
@@ -195,6 +197,21 @@ def i_check_topic_distributions(step, check_file):
         assert False, traceback.format_exc()
 
 
+#@step(r'the local topic distributions file is like the local topic model distributions for "(.*)" with separator "(.*)"')
+def i_check_td_like_local(step, test, separator):
+    local_topic_model = TopicModel(world.topic_model['resource'],
+                                   api=world.api)
+    distributions = local_results(local_topic_model.distribution, test,
+                                  delimiter=separator)
+    rows = output_rows(world.output, header=True)
+    assert_equal(len(rows), len(distributions))
+    for row, distribution in zip(rows, distributions):
+        assert_equal(len(row), len(distribution))
+        for value, topic in zip(row, distribution):
+            assert_almost_equal(float(value), topic["probability"],
+                                places=5)
+
+
 #@step(r'I create BigML topic model from dataset"')
 def i_create_topic_model_from_dataset( \
     step, output=None):
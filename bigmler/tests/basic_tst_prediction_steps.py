@@ -21,9 +21,12 @@ import json
 from bigmler.tests.world import world, res_filename
 from subprocess import check_call, CalledProcessError
 from bigml.api import check_resource
-from bigml.io import UnicodeReader
+from bigml.io import UnicodeReader, UnicodeWriter
+from bigml.model import Model
+from bigml.fields import Fields
 from bigmler.processing.models import MONTECARLO_FACTOR
 from bigmler.checkpoint import file_number_of_lines
+from bigmler.tst_reader import TstReader
 from bigmler.utils import storage_file_name, open_mode, decode2
 from bigmler.utils import PYTHON3
 from bigmler.tests.ml_tst_prediction_steps import \
@@ -47,7 +50,8 @@ from bigmler.tests.basic_association_steps import \
     i_create_association, i_check_create_association
 from bigmler.tests.basic_logistic_r_steps import \
     i_create_all_lr_resources, i_check_create_lr_model
-from bigmler.tests.common_steps import check_debug
+from bigmler.tests.common_steps import check_debug, local_results, \
+    output_rows
 from bigmler.reports import REPORTS_DIR
 from nose.tools import ok_, assert_equal, assert_not_equal, assert_almost_equal
 
@@ -1266,6 +1270,120 @@ def i_check_predictions(step, check_file):
         assert False, traceback.format_exc()
 
 
+#@step(r'I create BigML resources using model to test "(.*)" and log predictions in "(.*)" using the "(.*)" format')
+def i_create_resources_from_model_with_format(step, test=None, output=None,
+                                              predictions_format=None):
+    ok_(test is not None and output is not None and
+        predictions_format is not None)
+    test = res_filename(test)
+    command = ("bigmler --model " + world.model['resource'] + " --test " +
+               test + " --store --output " + output +
+               " --max-batch-models 1 --predictions-format " +
+               predictions_format)
+    shell_execute(command, output, test=test)
+
+
+def read_formatted_rows(predictions_file, predictions_format):
+    """Reads the rows stored in a parquet, arrow or npy predictions file
+       as lists of strings
+
+    """
+    if predictions_format == "npy":
+        import numpy
+        return [list(row) for row in numpy.load(predictions_file)]
+    import pyarrow
+    if predictions_format == "parquet":
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(predictions_file)
+    else:
+        table = pyarrow.RecordBatchFileReader(predictions_file).read_all()
+    columns = [table.column(index).to_pylist() for index in
+               range(table.num_columns)]
+    return [[u"" if value is None else u"%s" % value for value in row]
+            for row in zip(*columns)]
+
+
+#@step(r'the "(.*)" predictions file "(.*)" is like "(.*)"')
+def i_check_formatted_predictions(step, predictions_format, predictions_file,
+                                  check_file):
+    ok_(os.path.exists(predictions_file))
+    # the rows read back are stored as CSV to compare them with the file
+    csv_file = "%s.csv" % predictions_file
+    with UnicodeWriter(csv_file) as csv_handler:
+        for row in read_formatted_rows(predictions_file, predictions_format):
+            csv_handler.writerow(row)
+    i_check_predictions_file(step, csv_file, check_file)
+
+
+#@step(r'I create BigML resources using model to test "(.*)" and log predictions in "(.*)" with "(.*)" prediction info for fields "(.*)"')
+def i_create_resources_from_model_with_info(step, test=None, output=None,
+                                            prediction_info=None,
+                                            prediction_fields=None):
+    ok_(test is not None and output is not None and
+        prediction_info is not None and prediction_fields is not None)
+    test = res_filename(test)
+    options = " --prediction-header --prediction-info " + prediction_info
+    if prediction_fields:
+        options += " --prediction-fields \"" + prediction_fields + "\""
+    command = ("bigmler --model " + world.model['resource'] + " --test " +
+               test + " --store --output " + output +
+               " --max-batch-models 1" + options)
+    shell_execute(command, output, test=test, options=options)
+
+
+#@step(r'the predictions for "(.*)" with "(.*)" prediction info for fields
+# "(.*)" are like the local model ones')
+def i_check_prediction_info_like_local(step, test, prediction_info,
+                                       prediction_fields):
+    local_model = Model(world.model['resource'], api=world.api)
+    predictions = local_results(local_model.predict, test,
+                                add_confidence=True)
+    with UnicodeReader(res_filename(test)) as test_reader:
+        headers = test_reader.next()
+        inputs = list(test_reader)
+    # brief and full rows start with the chosen input columns
+    kept = []
+    if prediction_info != "normal":
+        fields = [field.strip() for field in prediction_fields.split(",")] \
+            if prediction_fields else headers
+        kept = [index for index, name in enumerate(headers)
+                if name in fields]
+    with_confidence = prediction_info != "brief"
+    objective_name = local_model.fields[local_model.objective_id]["name"]
+    expected_headers = [headers[index] for index in kept] + [objective_name]
+    if with_confidence:
+        expected_headers.append("confidence")
+    with UnicodeReader(world.output) as output_reader:
+        assert_equal(output_reader.next(), expected_headers)
+    rows = output_rows(world.output, header=True)
+    assert_equal(len(rows), len(predictions))
+    for row, input_data, prediction in zip(rows, inputs, predictions):
+        assert_equal(len(row), len(expected_headers))
+        assert_equal(row[0: len(kept)], [input_data[index] for index in kept])
+        assert_equal(row[len(kept)], prediction["prediction"])
+        if with_confidence:
+            assert_almost_equal(float(row[len(kept) + 1]),
+                                prediction["confidence"], places=5)
+
+
+#@step(r'the rows of the test file "(.*)" read in ranges of (\d+) rows are
+# like the ones read in sequence')
+def i_check_test_rows_ranges(step, test, range_rows):
+    range_rows = int(range_rows)
+    test_reader = TstReader(res_filename(test), True, Fields(world.model),
+                            world.model['object']['objective_field'])
+    try:
+        rows = list(test_reader)
+        assert_equal(test_reader.number_of_tests(), len(rows))
+        ranges_rows = []
+        for start in range(0, len(rows) + range_rows, range_rows):
+            ranges_rows.extend(test_reader.rows(start, start + range_rows))
+        assert_equal(ranges_rows, rows)
+        assert_equal(test_reader.rows(len(rows) - 1), rows[-1:])
+    finally:
+        test_reader.close()
+
+
 #@step(r'local predictions for different thresholds in "(.*)" and "(.*)"
 # are different')
 def i_check_predictions_with_different_thresholds(step, output2, output3):
@@ -17,11 +17,14 @@ from __future__ import absolute_import
 
 
 import os
+import csv
 
-from bigmler.tests.world import world
+from bigmler.tests.world import world, res_filename
 from bigmler.utils import SYSTEM_ENCODING, PYTHON3
 
 from bigml.api import HTTP_OK, HTTP_UNAUTHORIZED
+from bigml.io import UnicodeReader
+from nose.tools import eq_, assert_almost_equal
 
 def check_debug(command, project=True):
     """Adds verbosity level and command print.
@@ -82,3 +85,45 @@ def check_init_equals_final():
 
     """
     world.check_init_equals_final()
+
+
+def local_results(method, test, delimiter=",", **kwargs):
+    """Results of the local resource `method` for every row in the test
+       file, whose first row has the field names. Empty values are
+       not sent.
+
+    """
+    with UnicodeReader(res_filename(test),
+                       delimiter=delimiter) as test_reader:
+        headers = test_reader.next()
+        return [method(dict([(name, value) for name, value in
+                             zip(headers, row) if value != ""]), **kwargs)
+                for row in test_reader]
+
+
+def output_rows(output, header=False):
+    """Rows in the CSV output file, skipping the headers row if present
+
+    """
+    with open(output, "U") as output_handler:
+        rows = list(csv.reader(output_handler, lineterminator="\n"))
+    return rows[1:] if header else rows
+
+
+def check_local_predictions(output, predictions, key="probability",
+                            places=5):
+    """Checks that each row in the output file has the prediction and the
+       `key` value, if any, of the corresponding local prediction
+
+    """
+    rows = output_rows(output)
+    eq_(len(rows), len(predictions))
+    for row, prediction in zip(rows, predictions):
+        if isinstance(prediction["prediction"], basestring):
+            eq_(row[0], prediction["prediction"])
+        else:
+            assert_almost_equal(float(row[0]), prediction["prediction"],
+                                places=places)
+        if prediction.get(key) is not None:
+            assert_almost_equal(float(row[1]), prediction[key],
+                                places=places)
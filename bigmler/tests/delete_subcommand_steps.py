@@ -17,17 +17,25 @@ from __future__ import absolute_import
 
 
 import os
+import re
 import time
 import csv
 import json
+import shlex
+import signal
 from nose.tools import assert_equal, assert_not_equal, ok_
 from bigmler.tests.world import world, res_filename
-from subprocess import check_call, CalledProcessError
+from subprocess import check_call, CalledProcessError, Popen
+import bigml.api
 from bigml.api import check_resource, HTTP_NOT_FOUND
 from bigmler.checkpoint import file_number_of_lines
+import bigmler.utils as u
 from bigmler.tests.common_steps import (check_debug, store_init_resources,
                           store_final_resources, check_init_equals_final)
 from bigmler.tests.basic_tst_prediction_steps import shell_execute
+from bigmler.delete.dispatcher import DELETED_FILE, DELETE_LIST_FILE, \
+    DELETION_ORDER
+from bigmler.delete.scanner import RESOURCES_LOG_FILES
 
 
 #@step(r'I create a BigML source from file "(.*)" storing results in "(.*)"')
@@ -286,3 +294,230 @@ def i_store_the_number_of_resources(step):
 def i_check_equal_number_of_resources(step):
     store_final_resources()
     check_init_equals_final()
+
+
+#@step(r'I delete the resources from the output directory with "(.*)" parallel deletes$')
+def i_delete_resources_from_dir_in_parallel(step, parallel=None):
+    ok_(parallel is not None)
+    command = ("bigmler delete --from-dir " + world.directory +
+               " --output-dir " + world.directory +
+               " --max-parallel-deletes " + parallel)
+    shell_execute(command, os.path.join(world.directory, "p.csv"), test=None)
+
+
+#@step(r'the deletion journal and list have been removed$')
+def i_check_deletion_files_removed(step):
+    ok_(not os.path.exists(os.path.join(world.directory, DELETED_FILE)))
+    ok_(not os.path.exists(os.path.join(world.directory, DELETE_LIST_FILE)))
+
+
+#@step(r'I create "(.*)" sources from "(.*)" storing their ids in "(.*)"$')
+def i_create_sources_to_delete(step, number=None, data=None,
+                               output_dir=None):
+    ok_(number is not None and data is not None and output_dir is not None)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    world.directory = output_dir
+    world.folders.append(output_dir)
+    world.delete_ids = []
+    for _ in range(int(number)):
+        source = world.api.create_source(res_filename(data),
+                                         {"project": world.project_id})
+        world.delete_ids.append(source['resource'])
+    # the source log file is where --from-dir looks for the sources
+    with open(os.path.join(output_dir, "source"), "w") as source_file:
+        source_file.write("".join("%s\n" % resource_id for resource_id in
+                                  world.delete_ids))
+
+
+#@step(r'I delete them from the directory with "(.*)" parallel deletes and "(.*)" deletes per second and interrupt the deletion after "(.*)" deletions$')
+def i_interrupt_parallel_deletion(step, parallel=None, rate=None,
+                                  deletions=None):
+    ok_(parallel is not None and rate is not None and deletions is not None)
+    command = check_debug("bigmler delete --from-dir " + world.directory +
+                          " --output-dir " + world.directory +
+                          " --max-parallel-deletes " + parallel +
+                          " --deletes-per-second " + rate)
+    journal = os.path.join(world.directory, DELETED_FILE)
+    if os.path.exists(journal):
+        os.remove(journal)
+    process = Popen(shlex.split(command))
+    journaled = 0
+    while process.poll() is None and journaled < int(deletions):
+        time.sleep(0.1)
+        if os.path.exists(journal):
+            with open(journal) as journal_file:
+                journaled = len(journal_file.readlines())
+    ok_(process.poll() is None)
+    os.kill(process.pid, signal.SIGINT)
+    process.wait()
+    ok_(process.returncode != 0)
+
+
+#@step(r'the journal lists only part of the resources to delete$')
+def i_check_journal_lists_part(step):
+    ok_(os.path.exists(os.path.join(world.directory, DELETE_LIST_FILE)))
+    with open(os.path.join(world.directory, DELETED_FILE)) as journal:
+        world.journaled = [line.strip() for line in journal]
+    ok_(set(world.journaled).issubset(set(world.delete_ids)))
+    ok_(0 < len(world.journaled) < len(world.delete_ids))
+
+
+#@step(r'I resume the deletion$')
+def i_resume_deletion(step):
+    shell_execute("bigmler delete --resume",
+                  os.path.join(world.directory, "p.csv"), test=None)
+
+
+#@step(r'the resumed deletion only deletes the pending resources$')
+def i_check_resumed_deletion(step):
+    with open(os.path.join(world.directory, "bigmler_sessions")) as log:
+        session = log.read()
+    ok_("Resuming deletion." in session)
+    ok_("Deleting %s objects." % (len(world.delete_ids) -
+                                  len(world.journaled)) in session)
+
+
+#@step(r'all the resources have been deleted$')
+def i_check_all_deleted(step):
+    for resource_id in world.delete_ids:
+        source = world.api.get_source(resource_id)
+        assert_equal(source['code'], HTTP_NOT_FOUND)
+
+
+#@step(r'I create "(.*)" sources from "(.*)" with tag "(.*)" storing their ids in "(.*)"$')
+def i_create_tagged_sources_to_delete(step, number=None, data=None, tag=None,
+                                      output_dir=None):
+    ok_(number is not None and data is not None and tag is not None and
+        output_dir is not None)
+    # the tag is made unique for the test run, as listings see every source
+    world.delete_tag = "%s_%s" % (tag, world.project_id.split("/")[1])
+    world.directory = output_dir
+    world.folders.append(output_dir)
+    world.delete_ids = []
+    for _ in range(int(number)):
+        source = world.api.create_source(res_filename(data),
+                                         {"project": world.project_id,
+                                          "tags": [world.delete_tag]})
+        world.delete_ids.append(source['resource'])
+    # only finished sources are listed
+    for resource_id in world.delete_ids:
+        check_resource(resource_id, world.api.get_source)
+
+
+#@step(r'I list the sources with the tag in pages of "(.*)" sources$')
+def i_list_tagged_sources_in_pages(step, page_length=None):
+    ok_(page_length is not None)
+    page_length, u.PAGE_LENGTH = u.PAGE_LENGTH, int(page_length)
+    try:
+        world.listed_ids = u.list_ids(world.api.list_sources,
+                                      "tags__in=%s" % world.delete_tag)
+        world.limited_ids = u.list_ids(world.api.list_sources,
+                                       "tags__in=%s" % world.delete_tag,
+                                       limit=len(world.listed_ids) - 1)
+    finally:
+        u.PAGE_LENGTH = page_length
+
+
+#@step(r'the listed sources are the created ones$')
+def i_check_listed_sources(step):
+    assert_equal(len(world.listed_ids), len(world.delete_ids))
+    assert_equal(set(world.listed_ids), set(world.delete_ids))
+    assert_equal(world.limited_ids, world.listed_ids[:-1])
+
+
+#@step(r'I delete the sources with the tag storing results in "(.*)"$')
+def i_delete_tagged_sources(step, output_dir=None):
+    ok_(output_dir is not None)
+    command = ("bigmler delete --source-tag " + world.delete_tag +
+               " --output-dir " + output_dir)
+    shell_execute(command, os.path.join(output_dir, "p.csv"), test=None)
+
+
+#@step(r'I create BigML resources uploading train "(.*)" and remotely predicting "(.*)" storing results in "(.*)"$')
+def i_create_all_resources_with_batch_prediction_in_output_dir(
+        step, data=None, test=None, output_dir=None):
+    ok_(data is not None and test is not None and output_dir is not None)
+    command = ("bigmler --train " + res_filename(data) +
+               " --test " + res_filename(test) +
+               " --remote --output-dir " + output_dir)
+    shell_execute(command, os.path.join(output_dir, "p.csv"), test=None)
+
+
+#@step(r'I list the resources to delete from the output directory using --dry-run$')
+def i_dry_run_delete_resources_from_dir(step):
+    command = ("bigmler delete --from-dir " + world.directory +
+               " --output-dir " + world.directory + " --dry-run")
+    shell_execute(command, os.path.join(world.directory, "p.csv"), test=None)
+
+
+def listed_deletions():
+    """Ids listed by the last deletion in the output directory session log
+
+    """
+    with open(os.path.join(world.directory, "bigmler_sessions")) as log:
+        session = log.read().split("Retrieving objects to delete.")[-1]
+    return re.findall(r"[a-z]+/[a-f0-9]{24}", session)
+
+
+#@step(r'the resources are listed so that the derived ones are deleted before their origins$')
+def i_check_deletion_order(step):
+    resource_types = [bigml.api.get_resource_type(resource_id) for
+                      resource_id in listed_deletions()]
+    for resource_type in ["batchprediction", "model", "dataset", "source"]:
+        ok_(resource_type in resource_types)
+    layers = [DELETION_ORDER[resource_type] for resource_type in
+              resource_types]
+    assert_equal(layers, sorted(layers))
+    ok_(resource_types.index("batchprediction") <
+        resource_types.index("model") <
+        resource_types.index("dataset") <
+        resource_types.index("source"))
+
+
+#@step(r'I list the resources to delete from the output directory using --dry-run and the scan index "(.*)"$')
+def i_dry_run_delete_resources_from_dir_with_index(step, index=None):
+    ok_(index is not None)
+    command = ("bigmler delete --from-dir " + world.directory +
+               " --output-dir " + world.directory + " --dry-run" +
+               " --scan-index " + os.path.join(world.directory, index))
+    shell_execute(command, os.path.join(world.directory, "p.csv"), test=None)
+    world.listed_ids = listed_deletions()
+
+
+#@step(r'the scan index "(.*)" has the ids in the resource log files$')
+def i_check_scan_index(step, index=None):
+    ok_(index is not None)
+    logged_ids = set()
+    for path, _, file_names in os.walk(os.path.abspath(world.directory)):
+        for file_name in file_names:
+            if file_name in RESOURCES_LOG_FILES:
+                with open(os.path.join(path, file_name)) as log_file:
+                    logged_ids.update(
+                        bigml.api.get_resource_id(line.strip())
+                        for line in log_file if
+                        bigml.api.get_resource_id(line.strip()))
+    ok_(logged_ids)
+    with open(os.path.join(world.directory, index)) as index_file:
+        directories = json.load(index_file)["directories"]
+    indexed_ids = set(resource_id for entry in directories.values()
+                      for _, _, ids in entry["files"].values()
+                      for resource_id in ids)
+    assert_equal(indexed_ids, logged_ids)
+    assert_equal(set(world.listed_ids), logged_ids)
+
+
+#@step(r'the resources listed using the scan index "(.*)" again are the same$')
+def i_check_dry_run_with_index_again(step, index=None):
+    listed_ids = world.listed_ids
+    i_dry_run_delete_resources_from_dir_with_index(step, index=index)
+    assert_equal(world.listed_ids, listed_ids)
+
+
+#@step(r'I delete the resources from the output directory using the scan index "(.*)"$')
+def i_delete_resources_from_dir_with_index(step, index=None):
+    ok_(index is not None)
+    command = ("bigmler delete --from-dir " + world.directory +
+               " --output-dir " + world.directory +
+               " --scan-index " + os.path.join(world.directory, index))
+    shell_execute(command, os.path.join(world.directory, "p.csv"), test=None)
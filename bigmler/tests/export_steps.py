@@ -17,14 +17,21 @@ from __future__ import absolute_import
 
 
 import os
+import re
 import time
 import csv
 import json
+import sqlite3
 
-from nose.tools import assert_equal, assert_not_equal, ok_, eq_
+from nose.tools import (assert_equal, assert_not_equal, ok_, eq_,
+                        assert_almost_equal)
 from bigmler.tests.world import world, res_filename
-from subprocess import check_call, CalledProcessError
+from subprocess import check_call, check_output, CalledProcessError
 from bigml.api import check_resource
+from bigml.model import Model
+from bigml.ensemble import Ensemble
+from bigml.io import UnicodeReader
+from bigml.tree_utils import sort_fields
 from bigmler.checkpoint import file_number_of_lines
 from bigmler.tests.common_steps import check_debug
 from bigmler.export.dispatcher import EXTENSIONS
@@ -118,3 +125,207 @@ def i_check_if_the_output_is_like_expected_file(step, language, expected_file):
     eq_(output.strip(), expected_content.strip(), "Found: %s\nExpected:%s" % \
         (world.directory + "/" + world.model["resource"],
          expected_file))
+
+
+#@step(r'I export the model as a function in "(.*)" with "(.*)" to "(.*)"$')
+def i_export_model_with_options(step, language=None, options=None,
+                                output=None):
+    ok_(language is not None and options is not None and output is not None)
+    output_dir = world.directory
+    command = ("bigmler export --language " + language +
+               " --output-dir " + output_dir + " --model " +
+               world.model['resource'] + " " + options)
+    shell_execute(command, output)
+
+
+#@step(r'I create BigML resources uploading train "(.*)" file with "(.*)" and log in "(.*)"$')
+def i_create_all_resources_to_model_with_options( \
+    self, data=None, options=None, output=None):
+    ok_(data is not None and options is not None and output is not None)
+    command = ("bigmler --train " + res_filename(data) +
+               " --output " + output + " " + options +
+               " --store --max-batch-models 1 --no-fast")
+    shell_execute(command, output)
+
+
+def typed_value(field, value):
+    """Casts the value read from a CSV file to the type of the field
+
+    """
+    if value is None or value == "":
+        return None
+    if field['optype'] == 'numeric':
+        return float(value)
+    return value
+
+
+def python_predictions(code_file, inputs, field_names):
+    """Predictions of the exported python function for the list of inputs
+
+    """
+    namespace = {"__file__": code_file}
+    with open(code_file) as file_handler:
+        exec(compile(file_handler.read(), code_file, "exec"), namespace)
+    function = [value for name, value in namespace.items()
+                if name.startswith("predict_")][0]
+    predictions = []
+    for input_data in inputs:
+        prediction = function(*input_data)
+        if prediction is not None and not isinstance(prediction, dict):
+            prediction = {"prediction": prediction}
+        predictions.append(prediction)
+    return predictions
+
+
+def javascript_predictions(code_file, inputs, field_names):
+    """Predictions of the exported javascript function for the list of
+       inputs, computed with node
+
+    """
+    with open(code_file) as file_handler:
+        code = file_handler.read()
+    function = re.search(r"function (predict\w*)\(", code).group(1)
+    script = ("%s\nvar inputs = %s;\n"
+              "console.log(JSON.stringify(inputs.map(function (input) {\n"
+              "    return %s.apply(null, input);\n"
+              "})));\n") % (code, json.dumps(inputs), function)
+    script_file = os.path.join(world.directory, "predictions.js")
+    with open(script_file, "w") as file_handler:
+        file_handler.write(script)
+    return json.loads(check_output(["node", script_file]))
+
+
+def numpy_predictions(code_file, inputs, field_names):
+    """Predictions of the exported numpy module's predict_batch for the list
+       of inputs, passed as columns
+
+    """
+    namespace = {"__file__": code_file}
+    with open(code_file) as file_handler:
+        exec(compile(file_handler.read(), code_file, "exec"), namespace)
+    columns = dict([(name, [input_data[index] for input_data in inputs])
+                    for index, name in enumerate(namespace.get( \
+                        "FIELDS", field_names))])
+    results = namespace["predict_batch"](columns)
+    return [dict([(key, values[index]) for key, values in results.items()])
+            for index in range(len(inputs))]
+
+
+def mysql_predictions(code_file, inputs, field_names):
+    """Predictions of the exported MySQL rules table for the list of inputs.
+       The script is run in an in-memory SQLite database. ISNULL is a
+       keyword there, so the MySQL ISNULL function is renamed.
+
+    """
+    with open(code_file) as file_handler:
+        code = file_handler.read()
+    if not PY3:
+        code = code.decode("utf8")
+    code = re.sub(r"\bISNULL\(", "IS_NULL(", code)
+    # the scoring query is the last statement in the script
+    statements = [statement for statement in code.split(";\n")
+                  if statement.strip()]
+    connection = sqlite3.connect(":memory:")
+    connection.create_function("IS_NULL", 1, lambda value: value is None)
+    columns = ["`%s`" % name for name in ["row"] + field_names]
+    connection.execute("CREATE TABLE `input_data` (%s)" % ", ".join(columns))
+    connection.executemany( \
+        "INSERT INTO `input_data` VALUES (%s)" % ", ".join( \
+            ["?"] * len(columns)),
+        [[index] + input_data for index, input_data in enumerate(inputs)])
+    connection.executescript(";\n".join(statements[:-1]) + ";")
+    rows = sorted(connection.execute(statements[-1]).fetchall())
+    connection.close()
+    return [None if row[-2] is None else
+            {"prediction": row[-2], "confidence": row[-1]} for row in rows]
+
+
+def exported_inputs(local_resource, test):
+    """Rows in the test file, as input data dicts and as lists of the
+       exported functions' arguments
+
+    """
+    field_ids = [field_id for field_id, _ in
+                 sort_fields(local_resource.fields)
+                 if field_id != local_resource.objective_id]
+    with UnicodeReader(res_filename(test)) as test_reader:
+        headers = test_reader.next()
+        rows = [dict(zip(headers, row)) for row in test_reader]
+    inputs = [[typed_value(local_resource.fields[field_id],
+                           row.get(local_resource.fields[field_id]['name']))
+               for field_id in field_ids] for row in rows]
+    return [dict([(name, value) for name, value in row.items()
+                  if value != ""]) for row in rows], inputs
+
+
+def field_names(local_resource):
+    """Names of the input fields, in the order of the exported functions'
+       arguments
+
+    """
+    return [field['name'] for field_id, field in
+            sort_fields(local_resource.fields)
+            if field_id != local_resource.objective_id]
+
+
+EXPORTED_PREDICTIONS = {
+    "python": python_predictions,
+    "javascript": javascript_predictions,
+    "numpy": numpy_predictions,
+    "mysql": mysql_predictions}
+
+
+#@step(r'the predictions of the exported "(.*)" code for "(.*)" are like the local model ones$')
+def i_check_exported_predictions(step, language=None, test=None):
+    ok_(language is not None and test is not None)
+    local_model = Model(world.model['resource'], api=world.api)
+    rows, inputs = exported_inputs(local_model, test)
+    expected = [local_model.predict(row) for row in rows]
+    code_file = os.path.join(world.directory, "%s.%s" % ( \
+        world.model['resource'].replace("/", "_"), EXTENSIONS[language]))
+    predictions = [None if prediction is None else prediction["prediction"]
+                   for prediction in EXPORTED_PREDICTIONS[language]( \
+                       code_file, inputs, field_names(local_model))]
+    eq_(len(predictions), len(expected))
+    for prediction, expected_prediction in zip(predictions, expected):
+        if local_model.regression:
+            assert_almost_equal(prediction, expected_prediction, places=5)
+        else:
+            eq_(prediction, expected_prediction)
+
+
+#@step(r'I export the ensemble as a function in "(.*)" with method "(.*)" to "(.*)"$')
+def i_export_ensemble_with_method(step, language=None, method=None,
+                                  output=None):
+    ok_(language is not None and method is not None and output is not None)
+    output_dir = world.directory
+    command = ("bigmler export --language " + language +
+               " --output-dir " + output_dir + " --ensemble " +
+               world.ensemble['resource'] + " --method " + method)
+    shell_execute(command, output)
+
+
+#@step(r'the predictions of the exported "(.*)" ensemble for "(.*)" are like the local ensemble ones with method "(.*)"$')
+def i_check_combined_predictions(step, language=None, test=None,
+                                 method=None):
+    ok_(language is not None and test is not None and method is not None)
+    local_ensemble = Ensemble(world.ensemble['resource'], api=world.api)
+    rows, inputs = exported_inputs(local_ensemble, test)
+    expected = [local_ensemble.predict(row, method=int(method),
+                                       add_confidence=True)
+                for row in rows]
+    code_file = os.path.join(world.directory, "%s.%s" % ( \
+        world.ensemble['resource'].replace("/", "_"), EXTENSIONS[language]))
+    predictions = EXPORTED_PREDICTIONS[language]( \
+        code_file, inputs, field_names(local_ensemble))
+    eq_(len(predictions), len(expected))
+    # the combined confidence of regressions is their error
+    key = "error" if local_ensemble.regression else "confidence"
+    for prediction, expected_prediction in zip(predictions, expected):
+        if local_ensemble.regression:
+            assert_almost_equal(prediction["prediction"],
+                                expected_prediction["prediction"], places=5)
+        else:
+            eq_(prediction["prediction"], expected_prediction["prediction"])
+        assert_almost_equal(prediction[key],
+                            expected_prediction["confidence"], places=5)
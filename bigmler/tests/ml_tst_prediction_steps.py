@@ -20,6 +20,7 @@ import os
 import time
 import csv
 import json
+import gzip
 from bigmler.tests.world import world, res_filename
 from subprocess import check_call, CalledProcessError
 from bigmler.checkpoint import file_number_of_lines
@@ -165,7 +166,8 @@ def i_check_local_file(step, path=None):
     if path is None:
         assert False
     try:
-        handler = open(path, "r")
+        handler = (gzip.open(path, "r") if path.endswith(".gz")
+                   else open(path, "r"))
         world.headers = handler.readline().strip()
         world.first_row = handler.readline().strip()
     except IOError:
@@ -20,7 +20,7 @@ import os
 import time
 import re
 
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 from bigmler.tests.world import world, res_filename
 from subprocess import check_call, CalledProcessError
@@ -51,7 +51,7 @@ def python3_contents(filename, prior_contents, alternative=""):
 
 #@step(r'I create a reify output for the resource in "(.*)" for "(.*)')
 def i_create_output(step, output=None, language=None, resource_type='source',
-                    add_fields=False):
+                    add_fields=False, cache_file=None):
     if output is None and language is None:
         assert False
     world.directory = os.path.dirname(output)
@@ -62,6 +62,8 @@ def i_create_output(step, output=None, language=None, resource_type='source',
                    u" --store --output " + output)
         if add_fields:
             command += u' --add-fields'
+        if cache_file is not None:
+            command += u' --reify-cache ' + cache_file
         command = check_debug(command)
         if not PYTHON3:
             command.encode(SYSTEM_ENCODING)
@@ -135,6 +137,22 @@ def i_check_output_file(step, output=None, check_file=None):
         eq_(check_contents, output_file_contents)
 
 
+#@step(r'the "(.*)" file contains "(.*)" but not "(.*)"')
+def i_check_output_contents(step, output=None, text=None, old_text=None):
+    if output is None or text is None or old_text is None:
+        assert False
+    with open(output, open_mode("r")) as output_file:
+        output_file_contents = output_file.read()
+    ok_(text in output_file_contents)
+    ok_(old_text not in output_file_contents)
+
+
+#@step(r'I update the dataset with params "(.*)"')
+def update_dataset(args=None):
+    world.dataset = world.api.update_dataset(world.dataset, args)
+    world.api.ok(world.dataset)
+
+
 #@step(r'I create a BigML source with data "(.*)" and params "(.*)"')
 def create_source(filename, output=None, args=None):
     args.update({"project": world.project_id})
@@ -743,3 +743,93 @@ class TestPrediction(object):
                 test=example[6], output=example[7], operating_point=example[9])
             test_pred.i_check_create_predictions(self)
             test_pred.i_check_predictions(self, example[8])
+
+    def test_scenario27(self):
+        """
+        Scenario: Successfully building test predictions from model in columnar formats
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML resources using model to test "<test>" and log predictions in "<output>" using the "<format>" format
+            Then the "<format>" predictions file "<predictions>" is like "<predictions_file>"
+
+            Examples:
+            |scenario    | kwargs                                                  | test                    | output                        | format | predictions | predictions_file           |
+
+        """
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'scenario27/predictions.csv', 'parquet', 'scenario27/predictions.parquet', 'check_files/predictions_iris.csv'],
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'scenario27/predictions.csv', 'arrow', 'scenario27/predictions.arrow', 'check_files/predictions_iris.csv'],
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'scenario27/predictions.csv', 'npy', 'scenario27/predictions.npy', 'check_files/predictions_iris.csv']]
+        show_doc(self.test_scenario27, examples)
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            test_pred.i_create_resources_from_model_with_format(self, test=example[2], output=example[3], predictions_format=example[4])
+            test_pred.i_check_formatted_predictions(self, example[4], example[5], example[6])
+
+    def test_scenario28(self):
+        """
+        Scenario: Successfully building test predictions from model with different prediction info formats
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML resources using model to test "<test>" and log predictions in "<output>" with "<prediction_info>" prediction info for fields "<prediction_fields>"
+            And I check that the predictions are ready
+            Then the predictions for "<test>" with "<prediction_info>" prediction info for fields "<prediction_fields>" are like the local model ones
+
+            Examples:
+            |scenario    | kwargs                                                  | test                    | output                        | prediction_info | prediction_fields |
+
+        """
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'scenario28/predictions_brief.csv', 'brief', 'petal length'],
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'scenario28/predictions_normal.csv', 'normal', ''],
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'scenario28/predictions_full.csv', 'full', ''],
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'scenario28/predictions_fields.csv', 'full', 'sepal width,petal width']]
+        show_doc(self.test_scenario28, examples)
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            test_pred.i_create_resources_from_model_with_info(self, test=example[2], output=example[3], prediction_info=example[4], prediction_fields=example[5])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_prediction_info_like_local(self, example[2], example[4], example[5])
+
+    def test_scenario29(self):
+        """
+        Scenario: Successfully reading ranges of rows of a test file
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            Then the rows of the test file "<test>" read in ranges of <range_rows> rows are like the ones read in sequence
+
+            Examples:
+            |scenario    | kwargs                                                  | test                    | range_rows |
+
+        """
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', '1'],
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', '7'],
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/iris.csv', '64']]
+        show_doc(self.test_scenario29, examples)
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            test_pred.i_check_test_rows_ranges(self, example[2], example[3])
+
+    def test_scenario30(self):
+        """
+        Scenario: Successfully building test predictions from model for compressed test files
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML resources using model to test "<test>" and log predictions in "<output>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+
+            Examples:
+            |scenario    | kwargs                                                  | test                    | output                        |predictions_file           |
+
+        """
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv.gz', 'scenario30/predictions_gz.csv', 'check_files/predictions_iris.csv'],
+            ['scenario1', '{"data": "data/iris.csv", "output": "scenario1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv.bz2', 'scenario30/predictions_bz2.csv', 'check_files/predictions_iris.csv']]
+        show_doc(self.test_scenario30, examples)
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            test_pred.i_create_resources_from_model(self, test=example[2], output=example[3])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example[4])
@@ -294,3 +294,27 @@ class TestBatchPrediction(object):
                 self, test=example[2], output=example[3])
             test_pred.i_check_create_predictions(self)
             test_pred.i_check_predictions(self, example[4])
+
+    def test_scenario9(self):
+        """
+        Scenario: Successfully streaming remote batch predictions to an output sink
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML remote batch predictions using model to test "<test>" with output sink "<sink>" and log predictions in "<output>"
+            Then the local prediction file is like "<predictions_file>"
+
+            Examples:
+            |scenario    | kwargs                                                  | test                    | sink   | output                        |predictions_file           |
+
+        """
+        examples = [
+            ['scenario_r1', '{"data": "data/iris.csv", "output": "scenario_r1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'gzip', 'scenario_r9/predictions.csv', 'check_files/predictions_iris.csv'],
+            ['scenario_r1', '{"data": "data/iris.csv", "output": "scenario_r1/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'stdout', 'scenario_r10/predictions.csv', 'check_files/predictions_iris.csv']]
+
+        print self.test_scenario9.__doc__
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it( \
+                self, example[0], example[1])
+            test_batch_pred.i_create_resources_from_model_remote_to_sink( \
+                self, test=example[2], sink=example[3], output=example[4])
+            test_pred.i_check_predictions(self, example[5])
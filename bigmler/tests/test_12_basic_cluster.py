@@ -270,3 +270,52 @@ class TestCluster(object):
             test_cluster.i_create_cluster_from_dataset_with_summary_fields(self, summary_fields=example[3], output_dir=example[2])
             test_pred.i_check_create_cluster(self)
             test_cluster.i_check_cluster_has_summary_fields(self, example[3])
+
+    def test_scenario10(self):
+        """
+            Scenario: Successfully building test centroids when a numeric value cannot be cast
+                Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+                And I create BigML resources using cluster to find centroids for "<test>" and log predictions in "<output>"
+                And I check that the centroids are ready
+                Then the local centroids file is like "<predictions_file>" but for row "<row>", which has no centroid
+
+                Examples:
+                |scenario    | kwargs                                                  | test                    | output                        |predictions_file           | row
+                | scenario_c_1| {"data": "../data/diabetes.csv", "output": "./scenario_c_1/centroids.csv", "test": "../data/diabetes.csv"}   | ../data/diabetes_wrong_numeric.csv   | ./scenario_c_10/centroids.csv   | ./check_files/centroids_diabetes.csv   | 4
+
+        """
+        print self.test_scenario10.__doc__
+        examples = [
+            ['scenario_c_1', '{"data": "data/diabetes.csv", "output": "scenario_c_1/centroids.csv", "test": "data/diabetes.csv"}', 'data/diabetes_wrong_numeric.csv', 'scenario_c_10/centroids.csv', 'check_files/centroids_diabetes.csv', '4']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            test_cluster.i_create_cluster_resources_from_cluster(self, test=example[2], output=example[3])
+            test_cluster.i_check_create_centroids(self)
+            test_cluster.i_check_centroids_with_no_centroid_row(self, example[4], example[5])
+
+    def test_scenario11(self):
+        """
+            Scenario: Successfully building local centroids that match the local cluster ones:
+                Given I create BigML resources uploading train "<data>" file to create centroids for "<test>" and log predictions in "<output>"
+                And I check that the source has been created
+                And I check that the dataset has been created
+                And I check that the cluster has been created
+                And I check that the centroids are ready
+                Then the local centroids file has the centroids of the local cluster for "<test>"
+
+                Examples:
+                | data               | test               | output                           |
+                | ../data/grades.csv | ../data/grades.csv | ./scenario_c_11/centroids.csv |
+        """
+        print self.test_scenario11.__doc__
+        examples = [
+            ['data/grades.csv', 'data/grades.csv', 'scenario_c_11/centroids.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_cluster.i_create_all_cluster_resources(self, data=example[0], test=example[1], output=example[2])
+            test_pred.i_check_create_source(self)
+            test_pred.i_check_create_dataset(self, suffix=None)
+            test_pred.i_check_create_cluster(self)
+            test_cluster.i_check_create_centroids(self)
+            test_cluster.i_check_centroids_like_local_cluster(self, example[1])
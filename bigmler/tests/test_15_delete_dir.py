@@ -75,3 +75,33 @@ class TestDeleteDir(object):
             test_delete.i_check_changed_number_of_resources(self)
             test_delete.i_delete_resources_from_dir(self)
             test_delete.i_check_equal_number_of_resources(self)
+
+    def test_scenario2(self):
+        """
+            Scenario: Sucessfully deleting resources from a directory using a scan index:
+                Given I store the number of existing resources
+                And I create BigML resources uploading train "<data>" storing results in "<output_dir>"
+                And I check that the number of resources has changed
+                And I list the resources to delete from the output directory using --dry-run and the scan index "<index>"
+                And the scan index "<index>" has the ids in the resource log files
+                And the resources listed using the scan index "<index>" again are the same
+                And I delete the resources from the output directory using the scan index "<index>"
+                Then the number of resources has not changed
+
+                Examples:
+                | data               | output_dir        | index
+                | ../data/iris.csv   | ./scenario_del_15 | scan_index.json
+        """
+        print self.test_scenario2.__doc__
+        examples = [
+            ['data/iris.csv', 'scenario_del_15', 'scan_index.json']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_delete.i_store_the_number_of_resources(self)
+            test_delete.i_create_all_resources_in_output_dir(self, data=example[0], output_dir=example[1])
+            test_delete.i_check_changed_number_of_resources(self)
+            test_delete.i_dry_run_delete_resources_from_dir_with_index(self, index=example[2])
+            test_delete.i_check_scan_index(self, index=example[2])
+            test_delete.i_check_dry_run_with_index_again(self, index=example[2])
+            test_delete.i_delete_resources_from_dir_with_index(self, index=example[2])
+            test_delete.i_check_equal_number_of_resources(self)
@@ -236,3 +236,50 @@ class TestAnomaly(object):
             test_anomaly.i_check_top_anomalies(self, example[3])
             test_anomaly.i_check_forest_size(self, example[4])
             test_anomaly.i_check_dataset_lines_number(self, example[3])
+
+    def test_scenario8(self):
+        """
+            Scenario: Successfully building local anomaly scores that match the local anomaly detector ones:
+                Given I create BigML resources uploading train "<data>" file to create anomaly scores for "<test>" and log predictions in "<output>"
+                And I check that the source has been created
+                And I check that the dataset has been created
+                And I check that the anomaly detector has been created
+                And I check that the anomaly scores are ready
+                Then the local anomaly scores file has the scores of the local anomaly detector for "<test>"
+
+                Examples:
+                | data                 | test               | output                           |
+                | ../data/tiny_kdd.csv | ../data/test_kdd.csv | ./scenario_an_8/anomaly_scores.csv |
+        """
+        print self.test_scenario8.__doc__
+        examples = [
+            ['data/tiny_kdd.csv', 'data/test_kdd.csv', 'scenario_an_8/anomaly_scores.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_anomaly.i_create_all_anomaly_resources(self, data=example[0], test=example[1], output=example[2])
+            test_pred.i_check_create_source(self)
+            test_pred.i_check_create_dataset(self)
+            test_anomaly.i_check_create_anomaly(self)
+            test_anomaly.i_check_create_anomaly_scores(self)
+            test_anomaly.i_check_anomaly_scores_like_local_anomaly(self, example[1])
+
+    def test_scenario9(self):
+        """
+            Scenario: Successfully building the top local anomaly scores from anomaly detector
+                Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+                And I create BigML resources using anomaly detector to find the top "<top_k>" anomaly scores for "<test>" and log predictions in "<output>"
+                Then the local anomaly scores file has the top "<top_k>" scores in "<predictions_file>"
+
+                Examples:
+                |scenario    | kwargs                                                  | top_k | test                    | output                        |predictions_file           |
+                | scenario_an_1| {"data": "../data/tiny_kdd.csv", "output": "./scenario_an_1/anomaly_scores.csv", "test": "../data/test_kdd.csv"}   | 5 | ../data/test_kdd.csv   | ./scenario_an_9/anomaly_scores.csv   | ./check_files/anomaly_scores_kdd.csv   |
+
+        """
+        print self.test_scenario9.__doc__
+        examples = [
+            ['scenario_an_1', '{"data": "data/tiny_kdd.csv", "output": "scenario_an_1/anomaly_scores.csv", "test": "data/test_kdd.csv"}', '5', 'data/test_kdd.csv', 'scenario_an_9/anomaly_scores.csv', 'check_files/anomaly_scores_kdd.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            test_anomaly.i_create_top_k_anomaly_scores_from_anomaly_detector(self, top_k=example[2], test=example[3], output=example[4])
+            test_anomaly.i_check_top_k_anomaly_scores(self, top_k=example[2], check_file=example[5])
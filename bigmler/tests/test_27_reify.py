@@ -632,3 +632,34 @@ class TestReify(object):
                 self, example[1], example[4], resource_type='dataset')
             test_reify.i_check_output_file(self, output=example[1],
                                            check_file=example[3])
+
+    def test_scenario21(self):
+        """
+            Scenario: Successfully rebuilding a reify output from the cache when the dataset has been updated
+                Given I create a BigML dataset from a source with data "<data>" and params "<params>"
+                And I create a reify output in "<output>" for "<language>" using the cache in "<cache>"
+                And the "<output>" file is like "<check_file>"
+                When I update the dataset with params "<update>"
+                And I create a reify output in "<output>" for "<language>" using the cache in "<cache>"
+                Then the "<output>" file contains "<name>" but not "<old_name>"
+
+                Examples:
+                | data | output | params | cache | check_file | language | update | name | old_name
+                | data/iris.csv | scenario_re21/reify.py | {"name": "my_dataset_name"} | scenario_re21/reify_cache | ../check_files/reify_dataset.py | python | {"name": "my_updated_dataset_name"} | my_updated_dataset_name | 'my_dataset_name'
+        """
+        print self.test_scenario21.__doc__
+        examples = [
+            ['data/iris.csv', 'scenario_re21/reify.py', {"name": "my_dataset_name"}, 'scenario_re21/reify_cache', 'check_files/reify_dataset.py', 'python', {"name": "my_updated_dataset_name"}, 'my_updated_dataset_name', "'my_dataset_name'"]]
+
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_reify.create_dataset(example[0], output=example[1],
+                                      args=example[2])
+            test_reify.i_create_output(self, example[1], example[5], resource_type='dataset', cache_file=example[3])
+            test_reify.i_check_output_file(self, output=example[1],
+                                           check_file=example[4])
+            test_reify.update_dataset(args=example[6])
+            test_reify.i_create_output(self, example[1], example[5], resource_type='dataset', cache_file=example[3])
+            test_reify.i_check_output_contents(self, output=example[1],
+                                               text=example[7],
+                                               old_text=example[8])
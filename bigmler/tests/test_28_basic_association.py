@@ -124,3 +124,26 @@ class TestAssociation(object):
             test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
             test_association.i_create_association_from_dataset(self, output_dir=example[2])
             test_pred.i_check_create_association(self)
+
+    def test_scenario4(self):
+        """
+            Scenario: Successfully building local association sets from dataset
+                Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+                And I create BigML association sets using dataset to test "<test>" with options "<options>" and log predictions in "<output>"
+                And I check that the association has been created
+                Then the local association sets file is like the local association sets for "<test>" with k "<k>"
+
+                Examples:
+                |scenario    | kwargs                                                  | test                    | options | output                        | k
+                | scenario_ass_1| {"data": "../data/iris.csv", "output_dir": "./scenario_ass_1"}   | ../data/test_iris.csv   | --prediction-header --association-set-k 5 | ./scenario_ass_4/association_sets.csv   | 5
+
+        """
+        print self.test_scenario4.__doc__
+        examples = [
+            ['scenario_ass_1', '{"data": "data/iris.csv", "output_dir": "scenario_ass_1"}', 'data/test_iris.csv', '--prediction-header --association-set-k 5', 'scenario_ass_4/association_sets.csv', '5']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            test_association.i_create_association_sets_from_dataset(self, test=example[2], options=example[3], output=example[4])
+            test_pred.i_check_create_association(self)
+            test_association.i_check_association_sets_like_local(self, example[2], example[5])
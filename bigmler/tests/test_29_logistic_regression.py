@@ -236,3 +236,49 @@ class TestPrediction(object):
             lr_pred.i_create_lr_resources_from_model_with_op(self, test=example[2], output=example[3], operating_point=example[5])
             test_pred.i_check_create_predictions(self)
             test_pred.i_check_predictions(self, example[4])
+
+    def test_scenario08(self):
+        """
+        Scenario: Successfully building test predictions in batches from model
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML logistic regression resources using model to test "<test>" and log predictions in "<output>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+            And the predictions are like the local logistic regression ones for "<test>"
+
+            Examples:
+            |scenario    | kwargs                                                  | test                    | output                        |predictions_file           |
+
+        """
+        print self.test_scenario08.__doc__
+        examples = [
+            ['scenario1_lr', '{"data": "data/iris.csv", "output": "scenario1_lr/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'scenario8_lr/predictions.csv', 'check_files/predictions_iris_lr.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            lr_pred.i_create_lr_resources_from_model(self, test=example[2], output=example[3])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example[4])
+            lr_pred.i_check_lr_predictions_like_local(self, test=example[2])
+
+    def test_scenario09(self):
+        """
+        Scenario: Successfully building test predictions in batches from model with missing values
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML logistic regression resources using model to test "<test>" and log predictions in "<output>"
+            And I check that the predictions are ready
+            Then the predictions are like the local logistic regression ones for "<test>"
+
+            Examples:
+            |scenario    | kwargs                                                  | test                    | output                        |
+
+        """
+        print self.test_scenario09.__doc__
+        examples = [
+            ['scenario1_lr', '{"data": "data/iris.csv", "output": "scenario1_lr/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris_missing.csv', 'scenario9_lr/predictions.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            lr_pred.i_create_lr_resources_from_model(self, test=example[2], output=example[3])
+            test_pred.i_check_create_predictions(self)
+            lr_pred.i_check_lr_predictions_like_local(self, test=example[2])
@@ -206,3 +206,35 @@ class TestTopicModel(object):
             topic_pred.i_create_topic_distribution_from_model_remote(self, test=example[0], options=example[1], output=example[2])
             topic_pred.i_check_create_topic_distributions(self)
             topic_pred.i_check_topic_distributions(self, example[3])
+
+
+    def test_scenario06(self):
+        """
+        Scenario: Successfully building local batch topic distributions like the local topic model
+            Given I created the dataset in setup_scenario02
+            And I create topic model from dataset
+            And I create BigML topic model resources from model to test "<test>" with options "<options>" and log predictions in "<output>"
+            And I check that the topic distributions are ready
+            Then the local topic distribution file is like "<topic_distribution_file>"
+            And the local topic distributions file is like the local topic model distributions for "<test>" with separator "<separator>"
+
+            Examples:
+            | test                    | options                  | output                                   |topic_distribution_file           | separator
+            | ../data/spam.csv        | --test-separator="\t --prediction-header"     |./scenario6_td/topic_distributions.csv   | ./check_files/topic_distributions_spam.csv   | \t
+
+
+        """
+        print self.test_scenario06.__doc__
+        examples = [
+            ['data/spam.csv', '--test-separator="\t" --prediction-header',
+             'scenario6_td/topic_distributions.csv',
+             'check_files/topic_distributions_spam.csv', '\t']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            topic_pred.i_create_topic_model_from_dataset(self, example[2])
+            topic_pred.i_check_create_topic_model(self)
+            topic_pred.i_create_all_td_resources_from_model( \
+                self, example[0], example[1], example[2])
+            topic_pred.i_check_create_topic_distributions(self)
+            topic_pred.i_check_topic_distributions(self, example[3])
+            topic_pred.i_check_td_like_local(self, example[0], example[4])
@@ -90,3 +90,89 @@ class TestExport(object):
             export.i_export_model(self, language=example[3], output=example[2])
             export.i_check_if_the_output_is_like_expected_file( \
                 self, language=example[3], expected_file=example[4])
+
+    def test_scenario2(self):
+        """
+            Scenario: Successfully exporting models with missing splits that predict like the local model:
+                Given I create BigML resources uploading train "<data>" file with "<model_options>" and log in "<output>"
+                And I check that the source has been created
+                And I check that the dataset has been created
+                And I check that the model has been created
+                And I export the model as a function in "<language>" with "<options>" to "<output>"
+                Then the predictions of the exported "<language>" code for "<test>" are like the local model ones
+
+                Examples:
+                | data                   | model_options                        | output                 | language   | options        | test
+                | ../data/iris_missing.csv | --missing-splits                   | ./scenario_exp_2_a/model | python     | --lookup-table | ../data/test_iris_missing.csv
+                | ../data/iris_missing.csv | --missing-splits                   | ./scenario_exp_2_b/model | javascript | --lookup-table | ../data/test_iris_missing.csv
+                | ../data/iris_missing.csv | --missing-splits                   | ./scenario_exp_2_c/model | javascript |                | ../data/test_iris_missing.csv
+                | ../data/iris_missing.csv | --missing-splits --objective 000000 | ./scenario_exp_2_d/model | python     | --lookup-table | ../data/test_iris_missing.csv
+                | ../data/iris_missing.csv | --missing-splits --objective 000000 | ./scenario_exp_2_e/model | javascript | --lookup-table | ../data/test_iris_missing.csv
+                | ../data/iris_missing.csv | --missing-splits                   | ./scenario_exp_2_f/model | numpy      |                | ../data/test_iris_missing.csv
+                | ../data/iris_missing.csv | --missing-splits --objective 000000 | ./scenario_exp_2_g/model | numpy      |                | ../data/test_iris_missing.csv
+                | ../data/iris_missing.csv | --missing-splits                   | ./scenario_exp_2_h/model | mysql      | --lookup-table | ../data/test_iris_missing.csv
+                | ../data/iris_missing.csv | --missing-splits --objective 000000 | ./scenario_exp_2_i/model | mysql      | --lookup-table | ../data/test_iris_missing.csv
+
+        """
+        print self.test_scenario2.__doc__
+        examples = [
+            ['data/iris_missing.csv', '--missing-splits', 'scenario_exp_2_a/model', 'python', '--lookup-table', 'data/test_iris_missing.csv'],
+            ['data/iris_missing.csv', '--missing-splits', 'scenario_exp_2_b/model', 'javascript', '--lookup-table', 'data/test_iris_missing.csv'],
+            ['data/iris_missing.csv', '--missing-splits', 'scenario_exp_2_c/model', 'javascript', '', 'data/test_iris_missing.csv'],
+            ['data/iris_missing.csv', '--missing-splits --objective 000000', 'scenario_exp_2_d/model', 'python', '--lookup-table', 'data/test_iris_missing.csv'],
+            ['data/iris_missing.csv', '--missing-splits --objective 000000', 'scenario_exp_2_e/model', 'javascript', '--lookup-table', 'data/test_iris_missing.csv'],
+            ['data/iris_missing.csv', '--missing-splits', 'scenario_exp_2_f/model', 'numpy', '', 'data/test_iris_missing.csv'],
+            ['data/iris_missing.csv', '--missing-splits --objective 000000', 'scenario_exp_2_g/model', 'numpy', '', 'data/test_iris_missing.csv'],
+            ['data/iris_missing.csv', '--missing-splits', 'scenario_exp_2_h/model', 'mysql', '--lookup-table', 'data/test_iris_missing.csv'],
+            ['data/iris_missing.csv', '--missing-splits --objective 000000', 'scenario_exp_2_i/model', 'mysql', '--lookup-table', 'data/test_iris_missing.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            export.i_create_all_resources_to_model_with_options( \
+                self, data=example[0], options=example[1], output=example[2])
+            test_pred.i_check_create_source(self)
+            test_pred.i_check_create_dataset(self)
+            test_pred.i_check_create_model(self)
+            export.i_export_model_with_options(self, language=example[3], options=example[4], output=example[2])
+            export.i_check_exported_predictions(self, language=example[3], test=example[5])
+
+    def test_scenario3(self):
+        """
+            Scenario: Successfully exporting ensembles whose combined predictions are like the local ensemble ones:
+                Given I create BigML resources uploading train "<data>" file with "<ensemble_options>" and log in "<output>"
+                And I check that the source has been created
+                And I check that the dataset has been created
+                And I check that the ensemble has been created
+                And I export the ensemble as a function in "<language>" with method "<method>" to "<output>"
+                Then the predictions of the exported "<language>" ensemble for "<test>" are like the local ensemble ones with method "<method>"
+
+                Examples:
+                | data             | ensemble_options                             | output                   | language   | method | test
+                | ../data/iris.csv | --number-of-models 3                         | ./scenario_exp_3_a/model | python     | 0      | ../data/test_iris.csv
+                | ../data/iris.csv | --number-of-models 3                         | ./scenario_exp_3_b/model | python     | 1      | ../data/test_iris.csv
+                | ../data/iris.csv | --number-of-models 3                         | ./scenario_exp_3_c/model | javascript | 1      | ../data/test_iris.csv
+                | ../data/iris.csv | --number-of-models 3                         | ./scenario_exp_3_d/model | numpy      | 1      | ../data/test_iris.csv
+                | ../data/iris.csv | --number-of-models 3 --objective 000000      | ./scenario_exp_3_e/model | python     | 0      | ../data/test_iris.csv
+                | ../data/iris.csv | --number-of-models 3 --objective 000000      | ./scenario_exp_3_f/model | python     | 1      | ../data/test_iris.csv
+                | ../data/iris.csv | --number-of-models 3 --objective 000000      | ./scenario_exp_3_g/model | javascript | 1      | ../data/test_iris.csv
+                | ../data/iris.csv | --number-of-models 3 --objective 000000      | ./scenario_exp_3_h/model | numpy      | 1      | ../data/test_iris.csv
+
+        """
+        print self.test_scenario3.__doc__
+        examples = [
+            ['data/iris.csv', '--number-of-models 3', 'scenario_exp_3_a/model', 'python', '0', 'data/test_iris.csv'],
+            ['data/iris.csv', '--number-of-models 3', 'scenario_exp_3_b/model', 'python', '1', 'data/test_iris.csv'],
+            ['data/iris.csv', '--number-of-models 3', 'scenario_exp_3_c/model', 'javascript', '1', 'data/test_iris.csv'],
+            ['data/iris.csv', '--number-of-models 3', 'scenario_exp_3_d/model', 'numpy', '1', 'data/test_iris.csv'],
+            ['data/iris.csv', '--number-of-models 3 --objective 000000', 'scenario_exp_3_e/model', 'python', '0', 'data/test_iris.csv'],
+            ['data/iris.csv', '--number-of-models 3 --objective 000000', 'scenario_exp_3_f/model', 'python', '1', 'data/test_iris.csv'],
+            ['data/iris.csv', '--number-of-models 3 --objective 000000', 'scenario_exp_3_g/model', 'javascript', '1', 'data/test_iris.csv'],
+            ['data/iris.csv', '--number-of-models 3 --objective 000000', 'scenario_exp_3_h/model', 'numpy', '1', 'data/test_iris.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            export.i_create_all_resources_to_model_with_options( \
+                self, data=example[0], options=example[1], output=example[2])
+            test_pred.i_check_create_source(self)
+            test_pred.i_check_create_dataset(self)
+            test_pred.i_check_create_ensemble(self)
+            export.i_export_ensemble_with_method(self, language=example[3], method=example[4], output=example[2])
+            export.i_check_combined_predictions(self, language=example[3], test=example[5], method=example[4])
@@ -109,3 +109,48 @@ class TestPrediction(object):
             test_pred.i_check_create_dataset(self, suffix=None)
             ts_pred.i_check_create_time_series(self)
             ts_pred.i_check_forecasts(self, example[3])
+
+    def test_scenario03(self):
+        """
+        Scenario: Successfully building batch forecasts from a time series:
+            Given I created the time series in setup_scenario02
+            And I create BigML forecasts from the time series to test "<test>" and log forecasts in "<output>"
+            Then the batch forecasts file is like "<forecasts_file>" and the local forecasts for "<test>"
+
+            Examples:
+            | test                          | output                        |forecasts_file
+            | ../data/test_grades_lines.json   | ./scenario3_ts/forecasts   | ./check_files/forecasts_grades_final.csv
+        """
+        print self.test_scenario03.__doc__
+        examples = [
+            ['data/test_grades_lines.json', 'scenario3_ts/forecasts', 'check_files/forecasts_grades_final.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            ts_pred.i_create_forecasts_from_time_series(self, example[0], example[1])
+            ts_pred.i_check_batch_forecasts(self, example[2], example[0])
+
+    def test_scenario04(self):
+        """
+        Scenario: Successfully evaluating a time series locally with a holdout file:
+            Given I create BigML time series uploading train "<data>" file and log resources in "<output_dir>"
+            And I check that the source has been created
+            And I check that the dataset has been created
+            And I check that the time series has been created
+            And I evaluate the time series locally with holdout "<test>" and log evaluation in "<output>"
+            Then the local evaluation file is like "<json_evaluation_file>" for the holdout metrics
+
+            Examples:
+            | data                        | output_dir      | test                          | output                      | json_evaluation_file
+            | ../data/grades_ts_train.csv | ./scenario4_ts  | ../data/grades_ts_holdout.csv | ./scenario4_ts/evaluation   | ./check_files/evaluation_grades_ts.json
+        """
+        print self.test_scenario04.__doc__
+        examples = [
+            ['data/grades_ts_train.csv', 'scenario4_ts', 'data/grades_ts_holdout.csv', 'scenario4_ts/evaluation', 'check_files/evaluation_grades_ts.json']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            ts_pred.i_create_time_series(self, example[0], example[1])
+            test_pred.i_check_create_source(self)
+            test_pred.i_check_create_dataset(self, suffix=None)
+            ts_pred.i_check_create_time_series(self)
+            ts_pred.i_evaluate_time_series_locally(self, example[2], example[3])
+            ts_pred.i_check_local_ts_evaluation(self, example[4])
@@ -213,3 +213,53 @@ class TestPrediction(object):
             batch_pred.i_check_create_batch_prediction(self)
             test_pred.i_check_create_predictions(self)
             test_pred.i_check_predictions(self, example[4])
+
+    def test_scenario07(self):
+        """
+        Scenario: Successfully building test predictions in batches from model
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML deepnet resources using model to test "<test>" and log predictions in "<output>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+            And the predictions are like the local deepnet ones for "<test>"
+
+            Examples:
+            |scenario    | kwargs                                                  | test                    | output                        |predictions_file           |
+
+        """
+        print self.test_scenario07.__doc__
+        examples = [
+            ['scenario1_dn', '{"data": "data/iris.csv", "output": "scenario1_dn/predictions.csv", "test": "data/test_iris.csv"}', 'data/test_iris.csv', 'scenario7_dn/predictions.csv', 'check_files/predictions_iris_dn.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_pred.i_have_previous_scenario_or_reproduce_it(self, example[0], example[1])
+            dn_pred.i_create_dn_resources_from_model(self, test=example[2], output=example[3])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example[4])
+            dn_pred.i_check_dn_predictions_like_local(self, test=example[2])
+
+    def test_scenario08(self):
+        """
+        Scenario: Successfully building regression test predictions in batches from start
+            Given I create BigML deepnet resources uploading train "<data>" file to test "<test>" and log predictions in "<output>"
+            And I check that the source has been created
+            And I check that the dataset has been created
+            And I check that the deepnet model has been created
+            And I check that the predictions are ready
+            Then the predictions are like the local deepnet ones for "<test>"
+
+            Examples:
+            | data               | test                    | output                        |
+
+        """
+        print self.test_scenario08.__doc__
+        examples = [
+            ['data/grades.csv', 'data/test_grades.csv', 'scenario8_dn/predictions.csv']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            dn_pred.i_create_all_dn_resources(self, example[0], example[1], example[2])
+            test_pred.i_check_create_source(self)
+            test_pred.i_check_create_dataset(self, suffix=None)
+            dn_pred.i_check_create_dn_model(self)
+            test_pred.i_check_create_predictions(self)
+            dn_pred.i_check_dn_predictions_like_local(self, test=example[1])
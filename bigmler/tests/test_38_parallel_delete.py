@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+#
+# Copyright 2018 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+""" Testing delete subcommand, --max-parallel-deletes option and resuming
+
+"""
+from bigmler.tests.world import (world, common_setup_module,
+                                 common_teardown_module, teardown_class)
+
+import bigmler.tests.delete_subcommand_steps as test_delete
+
+
+def setup_module():
+    """Setup for the module
+
+    """
+    common_setup_module()
+
+def teardown_module():
+    """Teardown for the module
+
+    """
+    common_teardown_module()
+
+class TestParallelDelete(object):
+
+    def teardown(self):
+        """Calling generic teardown for every method
+
+        """
+        print "\nEnd of tests in: %s\n-------------------\n" % __name__
+        teardown_class()
+
+    def setup(self):
+        """
+            Debug information
+        """
+        print "\n-------------------\nTests in: %s\n" % __name__
+
+    def test_scenario1(self):
+        """
+            Scenario: Sucessfully deleting resources from a directory in parallel:
+                Given I store the number of existing resources
+                And I create BigML resources uploading train "<data>" storing results in "<output_dir>"
+                And I check that the number of resources has changed
+                And I delete the resources from the output directory with "<parallel>" parallel deletes
+                Then the number of resources has not changed
+                And the deletion journal and list have been removed
+
+                Examples:
+                | data               | output_dir      | parallel
+                | ../data/iris.csv   | ./scenario_del_11 | 4
+        """
+        print self.test_scenario1.__doc__
+        examples = [
+            ['data/iris.csv', 'scenario_del_11', '4']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_delete.i_store_the_number_of_resources(self)
+            test_delete.i_create_all_resources_in_output_dir(self, data=example[0], output_dir=example[1])
+            test_delete.i_check_changed_number_of_resources(self)
+            test_delete.i_delete_resources_from_dir_in_parallel(self, parallel=example[2])
+            test_delete.i_check_equal_number_of_resources(self)
+            test_delete.i_check_deletion_files_removed(self)
+
+    def test_scenario2(self):
+        """
+            Scenario: Interrupting a parallel deletion and resuming it:
+                Given I create "<number>" sources from "<data>" storing their ids in "<output_dir>"
+                When I delete them from the directory with "<parallel>" parallel deletes and "<rate>" deletes per second and interrupt the deletion after "<deletions>" deletions
+                Then the journal lists only part of the resources to delete
+                And I resume the deletion
+                And the resumed deletion only deletes the pending resources
+                And the deletion journal and list have been removed
+                And all the resources have been deleted
+
+                Examples:
+                | number | data             | output_dir        | parallel | rate | deletions
+                | 10     | ../data/iris.csv | ./scenario_del_12 | 2        | 1    | 2
+        """
+        print self.test_scenario2.__doc__
+        examples = [
+            ['10', 'data/iris.csv', 'scenario_del_12', '2', '1', '2']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_delete.i_create_sources_to_delete(self, number=example[0], data=example[1], output_dir=example[2])
+            test_delete.i_interrupt_parallel_deletion(self, parallel=example[3], rate=example[4], deletions=example[5])
+            test_delete.i_check_journal_lists_part(self)
+            test_delete.i_resume_deletion(self)
+            test_delete.i_check_resumed_deletion(self)
+            test_delete.i_check_deletion_files_removed(self)
+            test_delete.i_check_all_deleted(self)
+
+    def test_scenario3(self):
+        """
+            Scenario: Listing tagged resources in parallel pages and deleting them by tag:
+                Given I create "<number>" sources from "<data>" with tag "<tag>" storing their ids in "<output_dir>"
+                When I list the sources with the tag in pages of "<page_length>" sources
+                Then the listed sources are the created ones
+                And I delete the sources with the tag storing results in "<output_dir>"
+                And all the resources have been deleted
+
+                Examples:
+                | number | data             | tag          | output_dir        | page_length
+                | 7      | ../data/iris.csv | my_list_tag  | ./scenario_del_13 | 2
+        """
+        print self.test_scenario3.__doc__
+        examples = [
+            ['7', 'data/iris.csv', 'my_list_tag', 'scenario_del_13', '2']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_delete.i_create_tagged_sources_to_delete(self, number=example[0], data=example[1], tag=example[2], output_dir=example[3])
+            test_delete.i_list_tagged_sources_in_pages(self, page_length=example[4])
+            test_delete.i_check_listed_sources(self)
+            test_delete.i_delete_tagged_sources(self, output_dir=example[3])
+            test_delete.i_check_all_deleted(self)
+
+    def test_scenario4(self):
+        """
+            Scenario: Sucessfully deleting derived resources before their origins in parallel:
+                Given I store the number of existing resources
+                And I create BigML resources uploading train "<data>" and remotely predicting "<test>" storing results in "<output_dir>"
+                And I check that the number of resources has changed
+                And I list the resources to delete from the output directory using --dry-run
+                And the resources are listed so that the derived ones are deleted before their origins
+                And I delete the resources from the output directory with "<parallel>" parallel deletes
+                Then the number of resources has not changed
+                And the deletion journal and list have been removed
+
+                Examples:
+                | data               | test                  | output_dir        | parallel
+                | ../data/iris.csv   | ../data/test_iris.csv | ./scenario_del_14 | 4
+        """
+        print self.test_scenario4.__doc__
+        examples = [
+            ['data/iris.csv', 'data/test_iris.csv', 'scenario_del_14', '4']]
+        for example in examples:
+            print "\nTesting with:\n", example
+            test_delete.i_store_the_number_of_resources(self)
+            test_delete.i_create_all_resources_with_batch_prediction_in_output_dir(self, data=example[0], test=example[1], output_dir=example[2])
+            test_delete.i_check_changed_number_of_resources(self)
+            test_delete.i_dry_run_delete_resources_from_dir(self)
+            test_delete.i_check_deletion_order(self)
+            test_delete.i_delete_resources_from_dir_in_parallel(self, parallel=example[3])
+            test_delete.i_check_equal_number_of_resources(self)
+            test_delete.i_check_deletion_files_removed(self)
@@ -36,7 +36,7 @@ from bigmler.defaults import DEFAULTS_FILE
 from bigmler.forecast import forecast, remote_forecast
 from bigmler.reports import clear_reports, upload_reports
 from bigmler.command import get_context
-from bigmler.tsevaluation import evaluate
+from bigmler.tsevaluation import evaluate, local_evaluate
 from bigmler.dispatcher import SESSIONS_LOG, clear_log_files, \
     get_test_dataset, get_objective_id
 
@@ -193,8 +193,9 @@ def compute_output(api, args):
     if fields and args.export_fields:
         fields.summary_csv(os.path.join(path, args.export_fields))
 
-    # If forecasting
-    if time_series_set and a.has_ts_test(args):
+    # If forecasting (the --test file is the holdout in local evaluations)
+    if time_series_set and a.has_ts_test(args) and not (
+            args.evaluate and args.local_evaluation):
         if args.remote:
             forecast_args = r.set_forecast_args(
                 args, fields=fields)
@@ -204,12 +205,21 @@ def compute_output(api, args):
                 session_file=session_file, path=path, log=log)
 
         else:
-            forecast(time_series, args,
+            forecast(time_series_set, args,
                      session_file=session_file)
 
+    # If evaluate and local evaluation flags are on, evaluate using the
+    # --test file as holdout and save results in json and human-readable
+    # format.
+    if args.evaluate and args.local_evaluation:
+        if not time_series_set or args.test_set is None:
+            sys.exit("Local evaluations need a time series and a --test file"
+                     " with the holdout values.")
+        local_evaluate(time_series_set, args, session_file=session_file)
+
     # If evaluate flag is on, create remote evaluation and save results in
     # json and human-readable format.
-    if args.evaluate:
+    elif args.evaluate:
         # When we resume evaluation and models were already completed, we
         # should use the datasets array as test datasets
         if args.has_test_datasets_:
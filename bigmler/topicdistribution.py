@@ -20,6 +20,9 @@ from __future__ import absolute_import
 
 
 import sys
+import random
+
+from collections import OrderedDict
 
 import bigml.api
 
@@ -27,15 +30,28 @@ import bigmler.utils as u
 import bigmler.checkpoint as c
 
 
-from bigml.topicmodel import TopicModel
-from bigml.io import UnicodeWriter
+from bigml.topicmodel import TopicModel, SAMPLES_PER_TOPIC, \
+    MIN_UPDATES, MAX_UPDATES
+
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
 
 from bigmler.tst_reader import TstReader as TestReader
 from bigmler.resources import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resources import create_batch_topic_distribution
+from bigmler.columnar import output_writer, format_file_name
 
 # symbol used in failing topic distribution
 NO_DISTRIBUTION = "-"
+# number of documents whose topics are inferred at once in batch mode
+BATCH_SIZE = 1000
+# maximum number of stemmed terms kept in the stems cache
+STEM_CACHE_SIZE = 100000
+# maximum number of (draw, topic) cells computed at once by the sampler
+MAX_SAMPLING_CELLS = 2 ** 22
 
 
 def use_prediction_headers(test_reader, fields, args):
@@ -116,6 +132,189 @@ def topic_distribution_to_row(topic_distribution_resource):
     return [topic_distribution_resource['object']['topic_distribution']]
 
 
+class StemCache(object):
+    """Bounded least recently used cache around a stemmer's stemWord method
+
+    """
+    def __init__(self, stemmer, size=STEM_CACHE_SIZE):
+        self.stemmer = stemmer
+        self.size = size
+        self.stems = OrderedDict()
+
+    def stemWord(self, term):
+        """Returns the stem of the term, stemming it only on cache misses
+
+        """
+        try:
+            stem = self.stems.pop(term)
+        except KeyError:
+            stem = self.stemmer.stemWord(term)
+            if len(self.stems) >= self.size:
+                self.stems.popitem(last=False)
+        self.stems[term] = stem
+        return stem
+
+
+class BatchTopicModel(object):
+    """Batch topic inference for local topic models
+
+       Documents are tokenized with the topic model's tokenizer (using a
+       cache for the stems of their terms) and their topics are inferred
+       together. The Gibbs sampler in TopicModel.infer uses a new random
+       generator with the model seed for every document, so all documents
+       share the same sequence of random values, and the topic assignments
+       used in each sampling round are fixed during the round. Thus, every
+       round is computed for a chunk of documents as numpy arrays: the
+       cumulative topic weights of each (document, term) pair and a topic
+       per draw, found by comparing them with the corresponding random
+       value. Results are identical to the TopicModel.distribution method.
+
+    """
+    def __init__(self, local_topic_model, stem_cache_size=STEM_CACHE_SIZE):
+        """Prepares the topic-term matrices of a TopicModel object
+
+        """
+        self.local_topic_model = local_topic_model
+        if local_topic_model.stemmer is not None and \
+                not isinstance(local_topic_model.stemmer, StemCache):
+            local_topic_model.stemmer = StemCache(local_topic_model.stemmer,
+                                                  stem_cache_size)
+        self.ntopics = local_topic_model.ntopics
+        self.alpha = local_topic_model.alpha
+        # term x topic matrix and its cumulative sums for uniform rounds
+        self.term_topics = numpy.array(local_topic_model.phi,
+                                       dtype=float).T
+        self.uniform_weights = numpy.cumsum(self.term_topics, axis=1)
+        self.rng = random.Random(local_topic_model.seed)
+        self.random_values = numpy.zeros(0)
+
+    def _random_values(self, length):
+        """First `length` values of the random sequence used by the sampler
+
+        """
+        if length > len(self.random_values):
+            new_values = [self.rng.random() for _ in
+                          range(length - len(self.random_values))]
+            self.random_values = numpy.concatenate(
+                [self.random_values, numpy.array(new_values)])
+        return self.random_values
+
+    def document(self, input_data, by_name=True):
+        """Sorted list of term indices for the text fields in input data,
+           or None when the input text cannot be tokenized
+
+        """
+        local = self.local_topic_model
+        input_data = local.filter_input_data(input_data, by_name=by_name)
+        try:
+            return sorted(local.tokenize("\n\n".join(input_data.values())))
+        except (TypeError, ValueError):
+            return None
+
+    def _round_counts(self, documents, updates, sampling_round, weights):
+        """Topic counts of a sampling round for every document. Uniform
+           topic weights are used when `weights` is None.
+
+        """
+        counts = numpy.zeros((len(documents), self.ntopics), dtype=int)
+        group = []
+        cells = 0
+        for index, document in enumerate(documents):
+            draws = len(document) * updates[index]
+            if not draws:
+                continue
+            if group and (cells + draws) * self.ntopics > MAX_SAMPLING_CELLS:
+                self._group_counts(counts, group, documents, updates,
+                                   sampling_round, weights)
+                group = []
+                cells = 0
+            group.append(index)
+            cells += draws
+        if group:
+            self._group_counts(counts, group, documents, updates,
+                               sampling_round, weights)
+        return counts
+
+    def _group_counts(self, counts, group, documents, updates,
+                      sampling_round, weights):
+        """Adds the topic counts of a round for a group of documents
+
+        """
+        document_ids = []
+        pairs = []
+        random_indexes = []
+        cumulative = []
+        offset = 0
+        for index in group:
+            terms = numpy.array(documents[index], dtype=int)
+            draws = len(terms) * updates[index]
+            positions = numpy.tile(numpy.arange(len(terms)), updates[index])
+            document_ids.append(numpy.repeat(index, draws))
+            random_indexes.append(sampling_round * draws +
+                                  numpy.arange(draws))
+            if weights is None:
+                pairs.append(terms[positions])
+            else:
+                pairs.append(offset + positions)
+                cumulative.append(numpy.cumsum(
+                    self.term_topics[terms] * weights[index], axis=1))
+                offset += len(terms)
+        document_ids = numpy.concatenate(document_ids)
+        pairs = numpy.concatenate(pairs)
+        random_indexes = numpy.concatenate(random_indexes)
+        if weights is None:
+            cumulative = self.uniform_weights[pairs]
+        else:
+            cumulative = numpy.concatenate(cumulative)[pairs]
+        thresholds = self._random_values(random_indexes.max() + 1)[
+            random_indexes] * cumulative[:, -1]
+        topics = (cumulative < thresholds[:, None]).sum(axis=1)
+        numpy.add.at(counts, (document_ids, topics), 1)
+
+    def infer(self, documents):
+        """Topic probabilities for a list of documents given as term indices,
+           as computed by TopicModel.infer
+
+        """
+        updates = []
+        normalizers = []
+        for document in documents:
+            document_updates = 0
+            if document:
+                document_updates = SAMPLES_PER_TOPIC * self.ntopics // \
+                    len(document)
+                document_updates = int(min(MAX_UPDATES,
+                                           max(MIN_UPDATES,
+                                               document_updates)))
+            updates.append(document_updates)
+            normalizers.append((len(document) * document_updates) +
+                               self.local_topic_model.ktimesalpha)
+        normalizers = numpy.array(normalizers, dtype=float)[:, None]
+        # initialization, burn-in and sampling rounds
+        counts = self._round_counts(documents, updates, 0, None)
+        for sampling_round in [1, 2]:
+            counts = self._round_counts(documents, updates, sampling_round,
+                                        (counts + self.alpha) / normalizers)
+        return ((counts + self.alpha) / normalizers).tolist()
+
+    def distributions(self, input_data_list, by_name=True):
+        """Returns the topic distribution for each input data in the list,
+           in the format of the TopicModel.distribution method, or an empty
+           list for the documents that cannot be tokenized
+
+        """
+        topics = self.local_topic_model.topics
+        documents = [self.document(input_data, by_name=by_name)
+                     for input_data in input_data_list]
+        probabilities = self.infer([document for document in documents
+                                    if document is not None])
+        probabilities.reverse()
+        return [[] if document is None else
+                [{"name": topic["name"], "probability": probability}
+                 for topic, probability in zip(topics, probabilities.pop())]
+                for document in documents]
+
+
 def local_topic_distribution(topic_models, test_reader, output, args,
                              exclude=None, headers=None):
     """Get local topic model and issue topic distribution prediction
@@ -126,17 +325,45 @@ def local_topic_distribution(topic_models, test_reader, output, args,
     if args.prediction_header:
         headers.extend([topic['name'] for topic in local_topic_model.topics])
         output.writerow(headers)
-    test_set_header = test_reader.has_headers()
+    if not NUMPY:
+        for input_data in test_reader:
+            input_data_dict = test_reader.dict(input_data, filtering=False)
+            try:
+                topic_distribution_info = local_topic_model.distribution(
+                    input_data_dict, by_name=False)
+            except Exception:
+                topic_distribution_info = []
+            write_topic_distribution(topic_distribution_info,
+                                     output,
+                                     args.prediction_info, input_data,
+                                     exclude)
+        return
+    batch_topic_model = BatchTopicModel(local_topic_model)
+    input_data_list = []
     for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        try:
-            topic_distribution_info = local_topic_model.distribution(
-                input_data_dict, by_name=test_set_header)
-        except Exception:
-            topic_distribution_info = []
-        write_topic_distribution(topic_distribution_info,
-                                 output,
-                                 args.prediction_info, input_data, exclude)
+        input_data_list.append(input_data)
+        if len(input_data_list) == BATCH_SIZE:
+            write_topic_distributions(batch_topic_model, input_data_list,
+                                      test_reader, output, args, exclude)
+            input_data_list = []
+    write_topic_distributions(batch_topic_model, input_data_list,
+                              test_reader, output, args, exclude)
+
+
+def write_topic_distributions(batch_topic_model, input_data_list,
+                              test_reader, output, args, exclude=None):
+    """Infers the topics of a chunk of test rows and writes them
+
+    """
+    if not input_data_list:
+        return
+    distributions = batch_topic_model.distributions(
+        [test_reader.dict(input_data, filtering=False)
+         for input_data in input_data_list],
+        by_name=False)
+    for distribution, input_data in zip(distributions, input_data_list):
+        write_topic_distribution(distribution, output, args.prediction_info,
+                                 input_data, exclude)
 
 
 def topic_distribution(topic_models, fields, args, session_file=None):
@@ -145,11 +372,12 @@ def topic_distribution(topic_models, fields, args, session_file=None):
     """
     test_set = args.test_set
     test_set_header = args.test_header
-    output = args.predictions
+    output = format_file_name(args.predictions, args)
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, headers=args.prediction_header,
+                       lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude, headers = use_prediction_headers(
             test_reader, fields, args)
@@ -184,9 +412,10 @@ def remote_topic_distribution( \
             topic_model_id, test_dataset, batch_topic_distribution_args,
             args, api, session_file=session_file, path=path, log=log)
     if not args.no_csv:
-        file_name = api.download_batch_topic_distribution( \
-            batch_topic_distribution,
-            prediction_file)
+        file_name = u.download_to_sink( \
+            api.download_batch_topic_distribution,
+            batch_topic_distribution, prediction_file,
+            sink=args.output_sink)
         if file_name is None:
             sys.exit("Failed downloading CSV.")
     if args.to_dataset:
@@ -31,6 +31,8 @@ from bigmler.labels import get_label_field
 from bigmler.utils import PYTHON3, SYSTEM_ENCODING, FILE_ENCODING
 from bigmler.utils import encode2, decode2
 from bigmler.utf8recoder import UTF8Recoder
+from bigmler.mapped_rows import MappedRows
+from bigmler.compressed import compression, compressed_recoder
 
 
 AGGREGATES = {
@@ -57,7 +59,9 @@ class TrainReader(object):
            `labels`: Fields object with the expected fields structure.
         """
         self.training_set = training_set
-
+        # path of the training file, used to count its rows
+        self.training_file = training_set
+        self.compression = compression(training_set)
         if training_set.__class__.__name__ == "StringIO":
             self.encode = None
             self.training_set = UTF8Recoder(training_set, SYSTEM_ENCODING)
@@ -65,6 +69,7 @@ class TrainReader(object):
             self.encode = None if PYTHON3 else FILE_ENCODING
         self.training_set_header = training_set_header
         self.training_reader = None
+        self.mapped_rows = None
         self.multi_label = multi_label
         self.objective = objective
         if label_aggregates is None:
@@ -169,12 +174,18 @@ class TrainReader(object):
             self.training_set.close()
         except (IOError, AttributeError):
             pass
+        if self.compression is not None:
+            # compressed files are decompressed again from the beginning
+            if isinstance(self.training_set, UTF8Recoder):
+                self.training_set.reader.close()
+            self.training_set = compressed_recoder(
+                self.training_file, self.compression, encoding=FILE_ENCODING)
         try:
             self.training_reader = UnicodeReader(
                 self.training_set, delimiter=self.training_separator,
                 lineterminator="\n").open_reader()
         except IOError:
-            sys.exit("Error: cannot read training %s" % self.training_set)
+            sys.exit("Error: cannot read training %s" % self.training_file)
 
     def next(self):
         """Iterator method for next item
@@ -214,11 +225,32 @@ class TrainReader(object):
             row = [encode2(item) for item in row]
         return row
 
+    def rows(self, start=0, stop=None):
+        """Returns the training rows from `start` (included) to `stop`
+           (excluded), as returned by `get_next`. The file is memory-mapped
+           the first time, so only the rows in the range are read.
+
+        """
+        if self.mapped_rows is None:
+            if isinstance(self.training_set, UTF8Recoder):
+                sys.exit("Row ranges can only be read from uncompressed"
+                         " training files.")
+            self.mapped_rows = MappedRows(self.training_set,
+                                          header=self.training_set_header,
+                                          separator=self.training_separator)
+        rows = []
+        for row in self.mapped_rows.rows(start, stop):
+            row = [value.strip() for value in row]
+            if not PYTHON3:
+                row = [encode2(item) for item in row]
+            rows.append(row)
+        return rows
+
     def number_of_rows(self):
         """Returns the number of rows in the test file
 
         """
-        rows = file_number_of_lines(self.training_set)
+        rows = file_number_of_lines(self.training_file)
         if self.training_set_header:
             rows -= 1
         return rows
@@ -317,3 +349,7 @@ class TrainReader(object):
 
         """
         self.training_reader.close_reader()
+        if self.compression is not None:
+            self.training_set.reader.close()
+        if self.mapped_rows is not None:
+            self.mapped_rows.close()
@@ -21,6 +21,7 @@ from __future__ import absolute_import
 
 import os
 import json
+import sys
 import numbers
 import math
 
@@ -28,7 +29,18 @@ import bigmler.utils as u
 import bigmler.resources as r
 import bigmler.checkpoint as c
 
-from bigml.util import slugify
+from bigml.util import slugify, get_csv_delimiter
+from bigml.io import UnicodeReader
+from bigml.timeseries import TimeSeries
+
+from bigmler.utils import PYTHON3, decode2
+from bigmler.forecast import compute_forecasts
+
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
 
 
 def evaluate(time_series_set, datasets, api, args, resume,
@@ -91,3 +103,136 @@ def evaluations_process(time_series_set, datasets,
             log=log, existing_evaluations=existing_evaluations))
 
     return evaluations, resume
+
+
+def read_holdout(test_set, local_time_series, separator=None):
+    """Reads the objective fields values in the holdout CSV file. The
+       columns are matched by the field names in the headers row.
+
+    """
+    if separator and not PYTHON3:
+        separator = decode2(separator, encoding="string_escape")
+    if separator is None:
+        separator = get_csv_delimiter()
+    fields = local_time_series.fields
+    with UnicodeReader(test_set, delimiter=separator) as reader:
+        headers = reader.next()
+        columns = {}
+        for field_id in local_time_series.objective_fields:
+            name = fields[field_id]["name"]
+            if name in headers:
+                columns[field_id] = headers.index(name)
+        if not columns:
+            sys.exit("Failed to find the objective fields of the time series"
+                     " in the headers of %s." % test_set)
+        holdout = dict([(field_id, []) for field_id in columns])
+        for row in reader:
+            if not row:
+                continue
+            for field_id, column in columns.items():
+                try:
+                    value = float(row[column])
+                except (IndexError, ValueError):
+                    value = numpy.nan
+                holdout[field_id].append(value)
+    return dict([(field_id, numpy.array(values)) for field_id, values in
+                 holdout.items()])
+
+
+def safe_ratio(numerators, denominators):
+    """Element-wise ratio that is None where the denominator is zero
+
+    """
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        ratios = numpy.true_divide(numerators, denominators)
+    return [None if not numpy.isfinite(ratio) else float(ratio) for
+            ratio in ratios]
+
+
+def error_metrics(actuals, points, period=1):
+    """Computes the error metrics of the forecasts of all the models at
+       once. `points` is a matrix with one row of forecast points per
+       model. The mean absolute scaled error uses the seasonal naive
+       forecast errors in the holdout as scale.
+
+    """
+    errors = actuals - points
+    absolute_errors = numpy.abs(errors)
+    mae = absolute_errors.mean(axis=1)
+    mse = (errors ** 2).mean(axis=1)
+    variance = numpy.mean((actuals - actuals.mean()) ** 2)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        smape_terms = numpy.where( \
+            numpy.abs(actuals) + numpy.abs(points) > 0,
+            2 * absolute_errors / (numpy.abs(actuals) + numpy.abs(points)),
+            0)
+    smape = smape_terms.mean(axis=1)
+    if len(actuals) > period:
+        naive_error = numpy.abs(actuals[period:] - actuals[:-period]).mean()
+    else:
+        naive_error = 0
+    if len(actuals) > 1:
+        directions = numpy.sign(actuals[1:] - actuals[:-1]) == \
+            numpy.sign(points[:, 1:] - points[:, :-1])
+        mda = directions.mean(axis=1).tolist()
+    else:
+        mda = [None] * len(points)
+    nmse = safe_ratio(mse, variance)
+    return {
+        "mean_absolute_error": mae.tolist(),
+        "mean_squared_error": mse.tolist(),
+        "normalized_mean_squared_error": nmse,
+        "r_squared": [None if value is None else 1 - value for value in
+                      nmse],
+        "symmetric_mean_absolute_percentage_error": smape.tolist(),
+        "mean_absolute_scaled_error": safe_ratio(mae, naive_error),
+        "mean_directional_accuracy": mda}
+
+
+def local_evaluation(local_time_series, holdout):
+    """Evaluates every ETS model of the time series against the holdout
+       values of each objective field. The result has the structure of the
+       remote evaluations result: a list of metrics per model and field.
+
+    """
+    result = {}
+    for field_id, actuals in holdout.items():
+        submodels = local_time_series.ets_models.get(field_id, [])
+        if not submodels:
+            continue
+        forecasts = compute_forecasts(submodels, len(actuals))
+        points = numpy.array([forecast["point_forecast"] for forecast in
+                              forecasts], dtype=float)
+        # missing holdout values are left out of the comparison
+        observed = ~numpy.isnan(actuals)
+        metrics = error_metrics(actuals[observed], points[:, observed],
+                                period=local_time_series.period)
+        result[field_id] = []
+        for index, forecast in enumerate(forecasts):
+            model_metrics = {"model": forecast["model"]}
+            for metric, values in metrics.items():
+                model_metrics[metric] = values[index]
+            result[field_id].append(model_metrics)
+    return {"result": {"mean": result}}
+
+
+def local_evaluate(time_series_set, args, session_file=None):
+    """Evaluates a list of time-series locally with the holdout values in
+       the --test file. No evaluation resources are created.
+
+    """
+    if not NUMPY:
+        sys.exit("Failed to find the numpy library needed to evaluate"
+                 " time series locally. Please, install it manually")
+    message = u.dated("Creating local evaluations.\n")
+    u.log_message(message, log_file=session_file, console=args.verbosity)
+    api = args.retrieve_api_
+    for index, time_series in enumerate(time_series_set):
+        local_time_series = TimeSeries(time_series, api=api)
+        holdout = read_holdout(args.test_set, local_time_series,
+                               separator=args.test_separator)
+        file_name = args.predictions
+        if index > 0:
+            file_name = "%s_%s" % (file_name, index)
+        r.save_evaluation(local_evaluation(local_time_series, holdout),
+                          file_name, api)
@@ -30,6 +30,8 @@ from bigmler.utils import PYTHON3, FILE_ENCODING, SYSTEM_ENCODING
 from bigmler.utils import decode2
 from bigmler.checkpoint import file_number_of_lines
 from bigmler.utf8recoder import UTF8Recoder
+from bigmler.mapped_rows import MappedRows
+from bigmler.compressed import compression, compressed_recoder
 
 
 class TstReader(object):
@@ -47,9 +49,17 @@ class TstReader(object):
            `objective_field`: field_id of the objective field
         """
         self.test_set = test_set
+        # path of the test file, used to count its rows
+        self.test_file = test_set
+        file_compression = compression(test_set)
+        self.compressed = file_compression is not None
         if test_set.__class__.__name__ == "StringIO":
             self.encode = None
             self.test_set = UTF8Recoder(test_set, SYSTEM_ENCODING)
+        elif self.compressed:
+            self.encode = None
+            self.test_set = compressed_recoder(test_set, file_compression,
+                                               encoding=FILE_ENCODING)
         else:
             self.encode = None if PYTHON3 else FILE_ENCODING
         self.test_set_header = test_set_header
@@ -121,6 +131,11 @@ class TstReader(object):
             self.headers = [fields.fields_by_column_number[column] for
                             column in columns]
             self.raw_headers = self.headers
+        self.mapped_rows = None
+        # column index to input field triples, compiled per row length
+        # and filtering
+        self.adapters = {}
+        self.missing_tokens = set(fields.missing_tokens)
 
     def __iter__(self):
         """Iterator method
@@ -135,27 +150,84 @@ class TstReader(object):
         row = self.test_reader.next()
         return row
 
-    def dict(self, row, filtering=True):
-        """Returns the row in a dict format according to the given headers
+    def adapter(self, row_length, filtering=True):
+        """Returns the list of (key, field id, column index) triples used to
+           build the input data dicts of rows with the given length. When
+           filtering, the keys and columns are the ones that `Fields.pair`
+           would use once the excluded columns are removed. Otherwise, every
+           column that holds a field is kept, as the local resources ignore
+           the ones they do not use. The triples are computed only once per
+           row length and without changing the shared Fields object.
 
         """
-        new_row = row[:]
-        if not filtering:
+        if (row_length, filtering) not in self.adapters:
+            fields = self.fields
+            excluded = set(self.exclude)
+            columns = [index for index in range(row_length)
+                       if index not in excluded]
             if self.test_set_header:
-                headers = self.raw_headers
+                keys = self.headers
+                row_ids = [fields.field_id(header) for header in keys]
+            elif len(columns) == len(fields.fields_columns):
+                # headerless rows that contain all the fields
+                keys = row_ids = [fields.fields_by_column_number[column]
+                                  for column in fields.fields_columns]
             else:
-                headers = [self.fields.fields_by_column_number[column] for
-                           column in self.fields.fields_columns]
-            return dict(zip(headers, new_row))
-        for index in self.exclude:
-            del new_row[index]
-        return self.fields.pair(new_row, self.headers, self.objective_field)
+                keys = row_ids = self.headers
+            if filtering:
+                objective_id = self.objective_field
+                if objective_id is None and \
+                        fields.objective_field is not None:
+                    objective_id = fields.field_id(fields.objective_field)
+                positions = dict([(field_id, index) for index, field_id in
+                                  enumerate(row_ids)])
+                adapter = [(keys[positions[field_id]], field_id,
+                            columns[positions[field_id]])
+                           for field_id in fields.filtered_fields
+                           if field_id != objective_id and
+                           field_id in positions]
+            else:
+                adapter = list(zip(keys, row_ids, columns))
+            self.adapters[(row_length, filtering)] = adapter
+        return self.adapters[(row_length, filtering)]
+
+    def dict(self, row, filtering=True):
+        """Returns the row in a dict format according to the given headers.
+           With no filtering, the dict is keyed by field id and keeps the
+           values as found in the row, to be used with `by_name=False` in
+           the local resources.
+
+        """
+        if not filtering:
+            return {field_id: row[index] for _, field_id, index in
+                    self.adapter(len(row), filtering=False)}
+        missing_tokens = self.missing_tokens
+        if not PYTHON3:
+            row = [value if isinstance(value, unicode) else
+                   unicode(value, "utf-8") for value in row]
+        return {key: (None if row[index] in missing_tokens else row[index])
+                for key, _, index in self.adapter(len(row))}
+
+    def rows(self, start=0, stop=None):
+        """Returns the test rows from `start` (included) to `stop`
+           (excluded). The file is memory-mapped the first time, so
+           only the rows in the range are read.
+
+        """
+        if self.mapped_rows is None:
+            if isinstance(self.test_set, UTF8Recoder):
+                sys.exit("Row ranges can only be read from uncompressed"
+                         " test files.")
+            self.mapped_rows = MappedRows(self.test_set,
+                                          header=self.test_set_header,
+                                          separator=self.test_separator)
+        return self.mapped_rows.rows(start, stop)
 
     def number_of_tests(self):
         """Returns the number of tests in the test file
 
         """
-        tests = file_number_of_lines(self.test_set)
+        tests = file_number_of_lines(self.test_file)
         if self.test_set_header:
             tests -= 1
         return tests
@@ -171,3 +243,7 @@ class TstReader(object):
 
         """
         self.test_reader.close_reader()
+        if self.compressed:
+            self.test_set.reader.close()
+        if self.mapped_rows is not None:
+            self.mapped_rows.close()
@@ -25,6 +25,12 @@ import glob
 import os
 import sys
 import datetime
+import gzip
+import time
+import threading
+
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
 
 try:
     import simplejson as json
@@ -33,14 +39,31 @@ except ImportError:
 
 import bigml.api
 from bigml.util import console_log, empty_resource
+from bigml.bigmlconnection import HTTP_NO_CONTENT, HTTP_NOT_FOUND, \
+    HTTP_TOO_MANY_REQUESTS, HTTP_INTERNAL_SERVER_ERROR
 from bigml.fields import get_fields_structure, Fields
 from bigml.io import UnicodeReader
 
 PYTHON3 = sys.version_info[0] == 3
 PAGE_LENGTH = 200
+MAX_PARALLEL_PAGES = 4
 ATTRIBUTE_NAMES = ['name', 'label', 'description']
 NEW_DIRS_LOG = u".bigmler_dirs"
 BRIEF_MODEL_QS = "exclude=root,fields"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+FILE_SINK = "file"
+STDOUT_SINK = "stdout"
+GZIP_SINK = "gzip"
+OUTPUT_SINKS = [FILE_SINK, STDOUT_SINK, GZIP_SINK]
+# deletions are retried on these codes, waiting DELETE_RETRY_WAIT seconds
+# the first time and doubling the wait in each retry
+TRANSIENT_CODES = [HTTP_TOO_MANY_REQUESTS, HTTP_INTERNAL_SERVER_ERROR]
+DELETED_CODES = [HTTP_NO_CONTENT, HTTP_NOT_FOUND]
+DELETE_RETRIES = 3
+DELETE_RETRY_WAIT = 2
+DELETE_PROGRESS_STEP = 100
+# seconds between checks for interruptions while waiting for deletions
+DELETE_WAIT = 0.5
 
 # Base Domain
 BIGML_DOMAIN = os.environ.get('BIGML_DOMAIN', 'bigml.io')
@@ -294,50 +317,194 @@ def read_local_resource(path, csv_properties=None):
     return resource, csv_properties, fields
 
 
-def list_ids(api_function, query_string, status_code=bigml.api.FINISHED,
-             limit=None):
-    """Lists BigML resources filtered by `query_string`.
+def iter_listed(api_function, query_string, status_code=bigml.api.FINISHED,
+                limit=None, max_parallel=MAX_PARALLEL_PAGES):
+    """Generates the listing information of the BigML resources filtered
+       by `query_string`. The first page tells the total number of
+       resources, so the rest of pages are retrieved `max_parallel` at a
+       time. Resources are generated in the listing order as soon as their
+       page is retrieved.
 
     """
-    limit_s = 'limit=%s' % (PAGE_LENGTH if limit is None else limit)
-    q_s = 'status.code=%s;%s;%s' % (
-        status_code, limit_s, query_string)
+    page_length = PAGE_LENGTH if limit is None else limit
+    q_s = 'status.code=%s;limit=%s;%s' % (
+        status_code, page_length, query_string)
     resources = api_function(q_s)
-    ids = [obj['resource'] for obj in (resources['objects'] or [])]
-    while (resources['objects'] and (limit is None or len(ids) < limit) and
-           (resources['meta']['total_count'] > (resources['meta']['offset'] +
-                                                resources['meta']['limit']))):
-        offset = resources['meta']['offset'] + PAGE_LENGTH
+    ids_count = 0
+    for obj in resources['objects'] or []:
+        if limit is not None and ids_count >= limit:
+            return
+        ids_count += 1
+        yield obj
+    if not resources['objects'] or (limit is not None and
+                                    ids_count >= limit):
+        return
+    meta = resources['meta']
+    end = meta['total_count']
+    if limit is not None:
+        end = min(end, meta['offset'] + limit)
+    offsets = range(meta['offset'] + meta['limit'], end, meta['limit'])
+
+    def get_page(offset):
+        """Retrieves the page of resources that starts at `offset`
+
+        """
         q_s = 'status.code=%s;offset=%s;limit=%s;%s' % (
-            status_code, offset, limit_s, query_string)
-        resources = api_function(q_s)
-        if resources['objects']:
-            ids.extend([obj['resource'] for obj in resources['objects']])
-    return ids
+            status_code, offset, meta['limit'], query_string)
+        return api_function(q_s)['objects'] or []
+
+    pool = None
+    if max_parallel > 1 and len(offsets) > 1:
+        pool = ThreadPool(min(max_parallel, len(offsets)))
+        pages = pool.imap(get_page, offsets)
+    else:
+        pages = (get_page(offset) for offset in offsets)
+    try:
+        for objects in pages:
+            for obj in objects:
+                if limit is not None and ids_count >= limit:
+                    return
+                ids_count += 1
+                yield obj
+    finally:
+        if pool is not None:
+            pool.terminate()
 
 
-def delete(api, delete_list, exe_outputs=True):
-    """ Deletes the resources given in the list. If the exe_outputs is set,
-        deleting an execution causes the deletion of any outpur resource.
+def iter_ids(api_function, query_string, status_code=bigml.api.FINISHED,
+             limit=None, max_parallel=MAX_PARALLEL_PAGES):
+    """Generates the ids of the BigML resources filtered by `query_string`,
+       in the listing order.
+
+    """
+    for obj in iter_listed(api_function, query_string,
+                           status_code=status_code, limit=limit,
+                           max_parallel=max_parallel):
+        yield obj['resource']
+
+
+def list_ids(api_function, query_string, status_code=bigml.api.FINISHED,
+             limit=None, max_parallel=MAX_PARALLEL_PAGES):
+    """Lists BigML resources filtered by `query_string`.
+
+    """
+    return list(iter_ids(api_function, query_string, status_code=status_code,
+                         limit=limit, max_parallel=max_parallel))
+
+
+class RateLimiter(object):
+    """Spaces the calls made for each key to a maximum number of calls per
+       second. Calls are not limited when no rate is given.
 
     """
-    for resource_id in delete_list:
-        resource_type = None
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_calls = {}
+        self.lock = threading.Lock()
+
+    def wait(self, key):
+        """Waits till the next call for the key is allowed
+
+        """
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.time()
+            call_time = max(now, self.next_calls.get(key, now))
+            self.next_calls[key] = call_time + self.interval
+        if call_time > now:
+            time.sleep(call_time - now)
+
+
+def delete_resource(api, resource_id, exe_outputs=True, rate_limiter=None):
+    """Deletes a resource, retrying when the error is transient. Returns
+       True if the resource has been deleted or is not found.
+
+    """
+    try:
+        resource_type = bigml.api.get_resource_type(resource_id)
+        kwargs = {}
+        if resource_type == "execution" and exe_outputs:
+            kwargs.update(query_string="delete_all=true")
+        wait_time = DELETE_RETRY_WAIT
+        for retry in range(0, DELETE_RETRIES + 1):
+            if rate_limiter is not None:
+                rate_limiter.wait(resource_type)
+            response = api.deleters[resource_type](resource_id, **kwargs)
+            code = response.get("code")
+            if code in DELETED_CODES:
+                return True
+            if code not in TRANSIENT_CODES or retry == DELETE_RETRIES:
+                break
+            time.sleep(wait_time)
+            wait_time *= 2
+    except (ValueError, KeyError):
+        pass
+    console_log("Failed to delete resource %s\n" % resource_id)
+    return False
+
+
+def delete(api, delete_list, exe_outputs=True, max_parallel=1,
+           rate=None, journal=None, verbosity=0):
+    """ Deletes the resources given in the list. If the exe_outputs is set,
+        deleting an execution causes the deletion of any outpur resource.
+        Up to `max_parallel` resources are deleted at once, and no more
+        than `rate` deletions per second are sent for each resource type.
+        The ids of the deleted resources are appended to the `journal`
+        file, if given. The list can also be an iterator, so that deletion
+        starts while the ids are being listed. Returns the list of deleted
+        ids.
+
+    """
+    rate_limiter = RateLimiter(rate)
+    lock = threading.Lock()
+    deleted = []
+    total = len(delete_list) if hasattr(delete_list, "__len__") else None
+
+    def delete_one(resource_id):
+        """Deletes a resource and registers it in the journal
+
+        """
+        if not delete_resource(api, resource_id, exe_outputs=exe_outputs,
+                               rate_limiter=rate_limiter):
+            return
+        with lock:
+            deleted.append(resource_id)
+            if journal is not None:
+                with open(journal, "a") as journal_file:
+                    journal_file.write("%s\n" % resource_id)
+            if verbosity and (len(deleted) % DELETE_PROGRESS_STEP == 0 or
+                              len(deleted) == total):
+                console_log("Deleted %s%s resources" % (
+                    len(deleted), "" if total is None else " of %s" % total),
+                            reset=True)
+
+    if max_parallel > 1 and (total is None or total > 1):
+        pool = ThreadPool(max_parallel if total is None else
+                          min(max_parallel, total))
+        results = pool.imap_unordered(delete_one, delete_list)
         try:
-            for resource_type in bigml.api.RESOURCE_RE:
+            while True:
                 try:
-                    bigml.api.get_resource(resource_type, resource_id)
+                    # waiting with a timeout keeps the wait interruptible
+                    results.next(DELETE_WAIT)
+                except TimeoutError:
+                    continue
+                except StopIteration:
                     break
-                except ValueError:
-                    pass
-            if resource_type == "execution" and exe_outputs:
-                query_string = "delete_all=true"
-                api.deleters[resource_type](resource_id,
-                                            query_string=query_string)
-            else:
-                api.deleters[resource_type](resource_id)
-        except ValueError:
-            console_log("Failed to delete resource %s" % resource_id)
+        except:
+            # on interruption, the pending deletions are discarded. Only
+            # the ones in progress are finished and journaled
+            pool.terminate()
+            raise
+        pool.close()
+        pool.join()
+    else:
+        for resource_id in delete_list:
+            delete_one(resource_id)
+    if verbosity and deleted:
+        console_log("\n")
+    return deleted
 
 
 def check_dir(path):
@@ -656,6 +823,42 @@ def storage_file_name(directory, resource_id):
         os.path.join(directory, resource_id.replace("/", "_")))
 
 
+def download_to_sink(download_function, resource, file_name,
+                     sink=FILE_SINK):
+    """Downloads the CSV output of a batch resource and pipes it to the
+       chosen sink: a local file, the standard output or a gzip-compressed
+       local file. Unless the output is stored in a plain file, the
+       contents are read from the response stream in chunks and written
+       as they arrive. Returns the name of the generated file or None if
+       the download failed.
+
+    """
+    if sink == FILE_SINK:
+        return download_function(resource, file_name)
+    # with no file name, the download functions return the response stream
+    stream = download_function(resource)
+    if stream is None:
+        return None
+    if sink == STDOUT_SINK:
+        output = getattr(sys.stdout, "buffer", sys.stdout)
+    else:
+        file_name = "%s.gz" % file_name
+        output = gzip.open(file_name, "wb")
+    try:
+        while True:
+            # the raw response stream is not decompressed unless asked to
+            chunk = stream.read(DOWNLOAD_CHUNK_SIZE, decode_content=True)
+            if not chunk:
+                break
+            output.write(chunk)
+    finally:
+        if sink == STDOUT_SINK:
+            output.flush()
+        else:
+            output.close()
+    return file_name
+
+
 def get_objective_id(fields, objective):
     """Checks if the objective given by the user in the --objective flag
        is in the list of fields. Returns its column number or None otherwise.